@@ -0,0 +1,94 @@
+"""Archive files holding the tastings of cold themes, outside the hot database file.
+
+Snapshots and backups carry each archive's tastings as a table named
+``archive-<id>/tastings``, keyed by tasting id; ``split_archives`` takes
+them back out of such a state.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any
+
+from app import compression
+from app.columns import TastingColumns
+from app.storage import atomic_write
+
+ARCHIVE_FORMAT = "wt-archive/1"
+_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+_ARCHIVE_TABLE = re.compile(r"archive-(\d+)/tastings")
+
+State = dict[str, Any]
+
+
+def archive_dir(db_path: Path) -> Path:
+    """Directory of the archive files of the database at ``db_path``."""
+    return db_path.with_name(f"{db_path.stem}.archive")
+
+
+def archive_name(theme_id: int, method: str) -> str:
+    """File name of a theme's archive written with compression ``method``."""
+    return f"theme-{theme_id}.json{_SUFFIXES[method]}"
+
+
+def archive_method(name: str) -> str:
+    """Compression method of an archive file, from its name (see ``archive_name``)."""
+    for method, suffix in _SUFFIXES.items():
+        if suffix and name.endswith(suffix):
+            return method
+    return "none"
+
+
+def archive_table(theme_id: int) -> str:
+    """Name of the table holding a theme's archived tastings in a snapshot state."""
+    return f"archive-{theme_id}/tastings"
+
+
+def split_archives(state: State) -> tuple[State, dict[int, list[dict[str, Any]]]]:
+    """``state`` without its archive tables, and the archived tastings by theme id."""
+    rest: State = {}
+    archives: dict[int, list[dict[str, Any]]] = {}
+    for table, documents in state.items():
+        match = _ARCHIVE_TABLE.fullmatch(table)
+        if match:
+            archives[int(match.group(1))] = list(documents.values())
+        else:
+            rest[table] = documents
+    return rest, archives
+
+
+def summarize(tastings: list[dict[str, Any]]) -> dict[str, Any]:
+    """Aggregates kept in the hot store: per-whiskey count and average, and the tasters.
+
+    Averages are computed as the scoreboard does: the mean of each
+    tasting's rounded average of its three scores.
+    """
+    columns = TastingColumns.from_documents((tasting["id"], tasting) for tasting in tastings)
+    return {
+        "tastings": len(tastings),
+        "user_ids": sorted(set(columns.user_ids)),
+        "whiskeys": {
+            str(whiskey_id): {"tastings": count, "average_score": average}
+            for whiskey_id, count, average in columns.whiskey_averages(columns.by_whiskey)
+        },
+    }
+
+
+def write_archive(path: Path, theme_id: int, tastings: list[dict[str, Any]], method: str) -> None:
+    """Write (or replace) the archive of one theme, fsynced before it is relied on."""
+    payload = {"format": ARCHIVE_FORMAT, "theme_id": theme_id, "tastings": tastings}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(path, compression.compress(json.dumps(payload).encode("utf-8"), method))
+
+
+def read_archive(path: Path) -> list[dict[str, Any]]:
+    """Tastings stored in an archive file."""
+    return decode_archive(path.read_bytes(), path.name)
+
+
+def decode_archive(data: bytes, name: str = "archive") -> list[dict[str, Any]]:
+    """Tastings stored in the contents of an archive file."""
+    payload = json.loads(compression.decompress(data))
+    if payload.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"{name} is not a {ARCHIVE_FORMAT} archive")
+    return payload["tastings"]
@@ -0,0 +1,281 @@
+"""Online backups: consistent snapshots, incremental deltas, retention and restore.
+
+A backup is either a full copy of the database state or a delta holding
+the documents added, changed and removed since the previous backup. Each
+delta names the backup it applies to, so a chain can be verified before
+it is restored. Backups are (optionally compressed) JSON whatever the
+database's own codec, kept in one directory per database:
+
+    20261019T120000000000Z-full.json.gz
+    20261019T130000000000Z-delta.json.gz
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from app import compression, metrics
+from app.config import settings
+from app.shards import decode_snapshot
+from app.storage import atomic_write
+
+if TYPE_CHECKING:
+    from app.database import Database
+
+logger = logging.getLogger(__name__)
+
+BACKUP_FORMAT = "wt-backup/1"
+_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+_NAME = re.compile(r"\d{8}T\d{12}Z-(full|delta)\.json(\.gz|\.zst)?")
+
+# Digests of every document as of the newest backup, which deltas diff against
+DIGESTS_FILE = ".digests.json"
+
+# Per table, document id -> hex digest of the document
+Digests = dict[str, dict[str, str]]
+
+
+class BackupError(Exception):
+    """A backup is missing, unreadable or does not continue its chain."""
+
+
+@dataclass
+class BackupInfo:
+    """One backup file."""
+
+    name: str
+    kind: str
+    size_bytes: int
+    # Documents stored: all of them for a full backup, changes for a delta
+    documents: int = 0
+    seconds: float = 0.0
+
+
+def _digests(state: dict[str, Any]) -> Digests:
+    return {
+        table: {
+            doc_id: hashlib.blake2b(json.dumps(doc, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+            for doc_id, doc in documents.items()
+        }
+        for table, documents in state.items()
+    }
+
+
+def _changes(state: dict[str, Any], digests: Digests, previous: Digests) -> tuple[dict[str, Any], int]:
+    """Per-table puts and deletes turning the ``previous`` state into ``state``."""
+    tables: dict[str, Any] = {}
+    count = 0
+    for table in previous.keys() - digests.keys():
+        tables[table] = None
+    for table, current in digests.items():
+        before = previous.get(table)
+        if before is None:
+            tables[table] = {"put": state[table], "delete": []}
+            count += len(current)
+            continue
+        put = {doc_id: state[table][doc_id] for doc_id, digest in current.items() if before.get(doc_id) != digest}
+        delete = [doc_id for doc_id in before if doc_id not in current]
+        if put or delete:
+            tables[table] = {"put": put, "delete": delete}
+            count += len(put) + len(delete)
+    return tables, count
+
+
+def _load_digests(directory: Path, base: str) -> Digests | None:
+    try:
+        saved = json.loads((directory / DIGESTS_FILE).read_bytes())
+    except (OSError, ValueError):
+        return None
+    return saved["digests"] if saved.get("backup") == base else None
+
+
+def _build_backup(
+    snapshot: bytes, directory: Path, stamp: str, base: str | None, method: str
+) -> tuple[str, str, int]:
+    """Write a delta against backup ``base``, or a full backup; returns its name, kind and document count.
+
+    Runs in a worker process: parsing and diffing a large database holds
+    the GIL for long stretches, which would stall the event loop. The
+    digests stay on disk for the same reason. Without digests matching
+    ``base`` a full backup is written instead.
+    """
+    state = decode_snapshot(snapshot)
+    digests = _digests(state)
+    previous = _load_digests(directory, base) if base else None
+    payload: dict[str, Any] = {"format": BACKUP_FORMAT, "created": datetime.now(timezone.utc).isoformat()}
+    if previous is None:
+        kind = "full"
+        payload.update(kind=kind, state=state)
+        documents = sum(len(table) for table in digests.values())
+    else:
+        kind = "delta"
+        tables, documents = _changes(state, digests, previous)
+        payload.update(kind=kind, base=base, tables=tables)
+    name = f"{stamp}-{kind}.json{_SUFFIXES[method]}"
+    atomic_write(directory / name, compression.compress(json.dumps(payload).encode("utf-8"), method))
+    atomic_write(directory / DIGESTS_FILE, json.dumps({"backup": name, "digests": digests}).encode("utf-8"))
+    return name, kind, documents
+
+
+def list_backups(directory: Path) -> list[BackupInfo]:
+    """Backups in ``directory``, oldest first."""
+    if not directory.is_dir():
+        return []
+    backups = []
+    for path in sorted(directory.iterdir()):
+        match = _NAME.fullmatch(path.name)
+        if match:
+            backups.append(BackupInfo(name=path.name, kind=match.group(1), size_bytes=path.stat().st_size))
+    return backups
+
+
+def read_backup(path: Path) -> dict[str, Any]:
+    """Load one backup file."""
+    try:
+        data = json.loads(compression.decompress(path.read_bytes()))
+    except (OSError, ValueError) as e:
+        raise BackupError(f"Cannot read backup {path.name}: {e}") from e
+    if data.get("format") != BACKUP_FORMAT:
+        raise BackupError(f"{path.name} is not a {BACKUP_FORMAT} backup")
+    return data
+
+
+def restore_state(directory: Path, until: str | None = None) -> dict[str, Any]:
+    """Database state as of backup ``until`` (default the newest).
+
+    Starts from the last full backup at or before ``until`` and applies the
+    deltas after it in order, checking each continues the one before.
+    """
+    backups = list_backups(directory)
+    if until is not None:
+        names = [b.name for b in backups]
+        if until not in names:
+            raise BackupError(f"No backup named {until} in {directory}")
+        backups = backups[: names.index(until) + 1]
+    fulls = [i for i, b in enumerate(backups) if b.kind == "full"]
+    if not fulls:
+        raise BackupError(f"No full backup in {directory}")
+
+    chain = backups[fulls[-1]:]
+    state = read_backup(directory / chain[0].name)["state"]
+    previous = chain[0].name
+    for backup in chain[1:]:
+        delta = read_backup(directory / backup.name)
+        if delta.get("base") != previous:
+            raise BackupError(f"{backup.name} applies to {delta.get('base')}, not {previous}")
+        for table, changes in delta["tables"].items():
+            if changes is None:
+                state.pop(table, None)
+                continue
+            documents = state.setdefault(table, {})
+            for doc_id in changes["delete"]:
+                documents.pop(doc_id, None)
+            documents.update(changes["put"])
+        previous = backup.name
+    return state
+
+
+class BackupManager:
+    """Backs up one database into ``directory``.
+
+    The first backup, and every one after ``full_every`` deltas, is a full
+    snapshot; the rest are deltas against the previous backup, found by
+    comparing per-document digests saved next to the backups. The chain
+    is read back from the directory, so it continues across restarts.
+    Only the newest ``keep_full`` full backups and the deltas after them
+    are kept. Unset options come from the ``BACKUP_*`` settings.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        full_every: int | None = None,
+        keep_full: int | None = None,
+        compression_method: str | None = None,
+    ):
+        self.directory = directory
+        self.full_every = max(0, settings.backup_full_every if full_every is None else full_every)
+        self.keep_full = max(1, settings.backup_keep_full if keep_full is None else keep_full)
+        self.compression = compression_method or settings.backup_compression
+        self._lock = asyncio.Lock()
+
+    async def backup(self, db: "Database", full: bool = False) -> BackupInfo:
+        """Take a backup of ``db``; a delta unless ``full`` or a full one is due.
+
+        The snapshot is opened on the event loop between two database
+        operations, which makes it consistent. Writes then carry on while
+        a worker process parses, diffs and writes the backup.
+        """
+        async with self._lock:
+            start = time.perf_counter()
+            with db.open_snapshot() as handle:
+                snapshot = await asyncio.to_thread(handle.read)
+
+            base = None if full else await asyncio.to_thread(self._delta_base)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+            # spawn: forking a process that runs threads is unsafe
+            pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            try:
+                name, kind, documents = await asyncio.get_running_loop().run_in_executor(
+                    pool, _build_backup, snapshot, self.directory, stamp, base, self.compression
+                )
+            except Exception:
+                metrics.backup_failures_total.inc()
+                raise
+            finally:
+                pool.shutdown(wait=False)
+
+            metrics.backups_total.inc(kind=kind)
+            metrics.backup_last_success_timestamp_seconds.set(time.time())
+            removed = await asyncio.to_thread(self._prune)
+            info = BackupInfo(
+                name=name,
+                kind=kind,
+                size_bytes=(self.directory / name).stat().st_size,
+                documents=documents,
+                seconds=round(time.perf_counter() - start, 3),
+            )
+            logger.info(
+                "Backup %s: %s documents, %s bytes in %.2fs (%s old backups removed)",
+                name, documents, info.size_bytes, info.seconds, removed,
+            )
+            return info
+
+    async def run_periodically(self, db: "Database", interval: float) -> None:
+        """Back up ``db`` every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.backup(db)
+            except Exception:
+                logger.exception("Scheduled backup into %s failed", self.directory)
+
+    def _delta_base(self) -> str | None:
+        """Backup the next delta applies to, or None when a full one is due."""
+        backups = list_backups(self.directory)
+        fulls = [i for i, b in enumerate(backups) if b.kind == "full"]
+        if not fulls or len(backups) - 1 - fulls[-1] >= self.full_every:
+            return None
+        return backups[-1].name
+
+    def _prune(self) -> int:
+        """Delete backups older than the newest ``keep_full`` full ones."""
+        backups = list_backups(self.directory)
+        fulls = [i for i, b in enumerate(backups) if b.kind == "full"]
+        if len(fulls) <= self.keep_full:
+            return 0
+        expired = backups[: fulls[-self.keep_full]]
+        for backup in expired:
+            (self.directory / backup.name).unlink(missing_ok=True)
+        return len(expired)
@@ -0,0 +1,109 @@
+"""Columnar copy of a tastings table, for score aggregation."""
+
+from array import array
+from bisect import insort
+from itertools import compress
+from typing import Container, Iterable, Iterator, Mapping
+
+
+def _average(doc: Mapping) -> float:
+    return round((doc["aroma_score"] + doc["flavor_score"] + doc["finish_score"]) / 3, 1)
+
+
+class TastingColumns:
+    """Tastings as parallel typed arrays, one per field, in table order.
+
+    ``averages`` holds each row's average of its three scores, rounded as
+    the scoreboards show it, so aggregating a whiskey only sums a slice of
+    it. ``by_whiskey`` holds each whiskey's row numbers, so one theme's
+    tastings are read without walking everyone else's. Selection and sums
+    run over the arrays with ``map``, ``compress`` and ``sum`` rather than
+    a Python loop per row.
+
+    Rows are added by ``append`` and updated in place by ``put``; the owner
+    rebuilds the columns after anything else changes the table (see
+    ``version``).
+    """
+
+    def __init__(self) -> None:
+        self.doc_ids = array("q")
+        self.user_ids = array("q")
+        self.whiskey_ids = array("q")
+        self.aroma = array("d")
+        self.flavor = array("d")
+        self.finish = array("d")
+        # Stored as submitted: the API accepts it as a float
+        self.rank = array("d")
+        self.averages = array("d")
+        self.by_whiskey: dict[int, array] = {}
+        self._row_of: dict[int, int] = {}
+        # Version of the table these columns mirror
+        self.version = -1
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[tuple[int, Mapping]]) -> "TastingColumns":
+        """Columns of ``(doc_id, tasting)`` pairs, in the order given."""
+        columns = cls()
+        for doc_id, doc in documents:
+            columns.append(doc_id, doc)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def append(self, doc_id: int, doc: Mapping) -> None:
+        """Add a tasting as the last row."""
+        row = len(self.doc_ids)
+        self._row_of[doc_id] = row
+        self.doc_ids.append(doc_id)
+        self.user_ids.append(doc["user_id"])
+        self.whiskey_ids.append(doc["whiskey_id"])
+        self.aroma.append(doc["aroma_score"])
+        self.flavor.append(doc["flavor_score"])
+        self.finish.append(doc["finish_score"])
+        self.rank.append(doc["personal_rank"])
+        self.averages.append(_average(doc))
+        self.by_whiskey.setdefault(doc["whiskey_id"], array("q")).append(row)
+
+    def put(self, doc_id: int, doc: Mapping) -> None:
+        """Overwrite the row holding ``doc_id``, or append one if there is none."""
+        row = self._row_of.get(doc_id)
+        if row is None:
+            self.append(doc_id, doc)
+            return
+        if doc["whiskey_id"] != self.whiskey_ids[row]:
+            self.by_whiskey[self.whiskey_ids[row]].remove(row)
+            # Keep each whiskey's rows in table order
+            insort(self.by_whiskey.setdefault(doc["whiskey_id"], array("q")), row)
+        self.user_ids[row] = doc["user_id"]
+        self.whiskey_ids[row] = doc["whiskey_id"]
+        self.aroma[row] = doc["aroma_score"]
+        self.flavor[row] = doc["flavor_score"]
+        self.finish[row] = doc["finish_score"]
+        self.rank[row] = doc["personal_rank"]
+        self.averages[row] = _average(doc)
+
+    def select(self, whiskey_id: int, user_ids: Container[int] | None = None) -> array:
+        """Row numbers of a whiskey's tastings in table order, only ``user_ids``' if given."""
+        rows = self.by_whiskey.get(whiskey_id)
+        if rows is None:
+            return array("q")
+        if user_ids is None:
+            return rows
+        kept = map(user_ids.__contains__, map(self.user_ids.__getitem__, rows))
+        return array("q", compress(rows, kept))
+
+    def mean_average(self, rows: array) -> float:
+        """Mean of the rows' averages, rounded as the scoreboards show it; 0.0 without rows."""
+        if not rows:
+            return 0.0
+        return round(sum(map(self.averages.__getitem__, rows)) / len(rows), 1)
+
+    def whiskey_averages(
+        self, whiskey_ids: Iterable[int], user_ids: Container[int] | None = None
+    ) -> Iterator[tuple[int, int, float]]:
+        """``(whiskey_id, tastings, average)`` of each whiskey that has tastings (see ``select``)."""
+        for whiskey_id in whiskey_ids:
+            rows = self.select(whiskey_id, user_ids)
+            if rows:
+                yield whiskey_id, len(rows), self.mean_average(rows)
@@ -0,0 +1,91 @@
+"""Optional gzip/zstd compression of the database file, detected by magic bytes."""
+
+import gzip
+import shutil
+import zlib
+from pathlib import Path
+from typing import BinaryIO
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# Fast levels: the file is rewritten on every change, so CPU matters more
+# than the last few percent of size
+DEFAULT_LEVELS = {"gzip": 3, "zstd": 3}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression needs the zstandard package (pip install -e .[fast])") from None
+    return zstandard
+
+
+def detect(head: bytes) -> str:
+    """Compression of data starting with ``head``: ``gzip``, ``zstd`` or ``none``."""
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return "none"
+
+
+def detect_file(path: Path) -> str:
+    """Compression of the file at ``path`` (``none`` if it is missing or empty)."""
+    try:
+        with open(path, "rb") as handle:
+            return detect(handle.read(4))
+    except FileNotFoundError:
+        return "none"
+
+
+def compress(data: bytes, method: str, level: int | None = None) -> bytes:
+    """Compress ``data`` with ``method`` (``none`` returns it unchanged)."""
+    if method == "none":
+        return data
+    level = DEFAULT_LEVELS[method] if level is None else level
+    if method == "gzip":
+        # mtime=0 keeps output deterministic for identical data
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if method == "zstd":
+        return _zstd().ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unknown compression {method!r}; expected one of {', '.join(COMPRESSIONS)}")
+
+
+def decompress(data: bytes | memoryview) -> bytes | memoryview:
+    """Decompress ``data`` according to its magic bytes; plain data is returned as is."""
+    method = detect(bytes(data[:4]))
+    if method == "gzip":
+        # zlib with gzip framing accepts any buffer, gzip.decompress needs bytes
+        return zlib.decompress(data, wbits=31)
+    if method == "zstd":
+        # Frames written by the streaming writer carry no content size
+        return _zstd().ZstdDecompressor().stream_reader(data).read()
+    return data
+
+
+def open_reader(path: Path) -> BinaryIO:
+    """Open ``path`` for streaming reads of its decompressed content."""
+    method = detect_file(path)
+    if method == "gzip":
+        return gzip.open(path, "rb")
+    handle = open(path, "rb")
+    if method == "zstd":
+        return _zstd().ZstdDecompressor().stream_reader(handle, closefd=True)
+    return handle
+
+
+def copy_stream(source: BinaryIO, destination: BinaryIO, method: str, level: int | None = None) -> None:
+    """Copy ``source`` into ``destination``, compressing it with ``method`` on the way."""
+    level = DEFAULT_LEVELS.get(method) if level is None else level
+    if method == "none":
+        shutil.copyfileobj(source, destination)
+    elif method == "gzip":
+        with gzip.GzipFile(fileobj=destination, mode="wb", compresslevel=level, mtime=0) as writer:
+            shutil.copyfileobj(source, writer)
+    elif method == "zstd":
+        with _zstd().ZstdCompressor(level=level).stream_writer(destination, closefd=False) as writer:
+            shutil.copyfileobj(source, writer)
+    else:
+        raise ValueError(f"Unknown compression {method!r}; expected one of {', '.join(COMPRESSIONS)}")
@@ -3,9 +3,7 @@
 import logging
 from pathlib import Path
 
-import requests
-from pydantic import field_validator, model_validator
-from requests.auth import HTTPBasicAuth
+from pydantic import ValidationInfo, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 logger = logging.getLogger(__name__)
@@ -24,6 +22,12 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8010
 
+    # Logging: root level, "text" or "json", and per-module overrides
+    # such as "app.database=WARNING,uvicorn.access=ERROR"
+    log_level: str = "INFO"
+    log_format: str = "text"
+    log_levels: str = ""
+
     # CORS Configuration
     cors_origins_str: str = ""
     cors_origins_str_additional: str = ""
@@ -39,7 +43,6 @@ class Settings(BaseSettings):
             "http://127.0.0.1",
             "http://127.0.0.1:80",
         ]
-        logger.info(f"CORS_ORIGINS_STR_ADDITIONAL: {self.cors_origins_str_additional}")
         if self.cors_origins_str:
             origins.extend(self.cors_origins_str.split(","))
         if self.cors_origins_str_additional:
@@ -54,6 +57,81 @@ class Settings(BaseSettings):
         """Path to TinyDB database file."""
         return self.data_dir / "database.json"
 
+    # Multi-tenant mode: each club gets data_dir/tenants/<name>.json, selected
+    # by an X-Tenant header or a /t/<name>/ path prefix. TENANTS_STR is an
+    # optional comma-separated allowlist; when empty any valid name is served.
+    tenant_mode: bool = False
+    tenants_str: str = ""
+    # Open tenant databases kept in the LRU; idle ones beyond this are closed
+    max_open_tenants: int = 16
+
+    @property
+    def tenants(self) -> list[str]:
+        """Allowed tenant names (empty allows any)."""
+        return [name.strip() for name in self.tenants_str.split(",") if name.strip()]
+
+    @property
+    def tenants_dir(self) -> Path:
+        """Directory holding one database file per tenant."""
+        return self.data_dir / "tenants"
+
+    # Database file codec: "json" (stdlib), "orjson" (faster, same file
+    # format, needs orjson) or "msgpack" (compact binary records, needs
+    # msgpack); DB_MMAP parses the file in place from a memory map
+    db_storage: str = "json"
+    db_mmap: bool = False
+    # Compress the database file on write: "none", "gzip" or "zstd" (needs
+    # zstandard). Compressed files are detected on open whatever this says.
+    db_compression: str = "none"
+    # How far a write is on disk before the request returns: "fsync" (every
+    # commit), "group" (fsync every DB_GROUP_COMMIT_MS, losing at most that
+    # window on a crash) or "os" (left to the OS page cache). Writes always
+    # go through a temp file and an atomic rename.
+    db_durability: str = "fsync"
+    db_group_commit_ms: float = 50.0
+    # "single" keeps everything in database.json. "sharded" keeps users and
+    # themes in database.json and each theme's whiskeys and tastings in
+    # data/database.shards/theme-<id>.json, so a write rewrites one theme;
+    # at most DB_OPEN_SHARDS shards stay open (convert with
+    # scripts/shard_database.py)
+    db_layout: str = "single"
+    db_open_shards: int = 8
+
+    # Archived themes keep their tastings in data/database.archive/ (next to
+    # each tenant's file in multi-tenant mode), compressed with this method;
+    # the most recently read archives stay in memory, as parsed tastings and
+    # as scoreboard columns, up to ARCHIVE_CACHE_SIZE of each
+    archive_compression: str = "gzip"
+    archive_cache_size: int = 4
+
+    # Online backups into data_dir/backups (per tenant in multi-tenant mode):
+    # every BACKUP_INTERVAL seconds (0 = only on POST /admin/backups), a full
+    # snapshot followed by up to BACKUP_FULL_EVERY incremental deltas, keeping
+    # the newest BACKUP_KEEP_FULL full snapshots and their deltas
+    backup_interval: float = 0.0
+    backup_full_every: int = 23
+    backup_keep_full: int = 7
+    backup_compression: str = "gzip"
+
+    @property
+    def backup_dir(self) -> Path:
+        """Directory holding backup snapshots and deltas."""
+        return self.data_dir / "backups"
+
+    # Database calls slower than this many milliseconds are logged
+    slow_db_op_ms: float = 100.0
+
+    # Requests carrying this token in the X-Profile header are profiled; empty disables
+    profiling_token: str = ""
+    # Number of saved profiles to keep under data_dir/profiles
+    profile_retention: int = 20
+
+    # Gzip responses of at least this many bytes for clients that accept it (0 disables)
+    gzip_min_size: int = 1024
+
+    # Seconds between checks of config.json for changes made outside the app
+    config_check_interval: float = 1.0
+
     # ntfy Configuration
     ntfy_url: str = ""
     ntfy_topic: str = ""
@@ -61,6 +139,55 @@ class Settings(BaseSettings):
     ntfy_auth_user: str = ""
     ntfy_auth_pass: str = ""
 
+    # ntfy delivery: bounded queue drained by a background worker
+    ntfy_queue_size: int = 100
+    ntfy_max_retries: int = 3
+    ntfy_backoff_base: float = 0.5
+    ntfy_backoff_max: float = 30.0
+    # Durable outbox (a table in the database file) drained in batches
+    ntfy_outbox_batch_size: int = 50
+    ntfy_outbox_retry_interval: float = 60.0
+    # Failed delivery rounds after which an outbox entry is dropped
+    ntfy_outbox_max_attempts: int = 10
+    # Merge notifications arriving within this many seconds into one digest (0 = off)
+    ntfy_coalesce_window: float = 0.0
+
+    @field_validator("db_storage")
+    @classmethod
+    def validate_db_storage(cls, value: str) -> str:
+        """Accept only storage codecs the database layer implements."""
+        value = value.strip().lower()
+        if value not in ("json", "orjson", "msgpack"):
+            raise ValueError("DB_STORAGE must be 'json', 'orjson' or 'msgpack'")
+        return value
+
+    @field_validator("db_durability")
+    @classmethod
+    def validate_db_durability(cls, value: str) -> str:
+        """Accept only durability modes the storage implements."""
+        value = value.strip().lower()
+        if value not in ("fsync", "group", "os"):
+            raise ValueError("DB_DURABILITY must be 'fsync', 'group' or 'os'")
+        return value
+
+    @field_validator("db_layout")
+    @classmethod
+    def validate_db_layout(cls, value: str) -> str:
+        """Accept only database layouts the database layer implements."""
+        value = value.strip().lower()
+        if value not in ("single", "sharded"):
+            raise ValueError("DB_LAYOUT must be 'single' or 'sharded'")
+        return value
+
+    @field_validator("db_compression", "backup_compression", "archive_compression")
+    @classmethod
+    def validate_compression(cls, value: str, info: ValidationInfo) -> str:
+        """Accept only compression methods the storage implements."""
+        value = value.strip().lower()
+        if value not in ("none", "gzip", "zstd"):
+            raise ValueError(f"{info.field_name.upper()} must be 'none', 'gzip' or 'zstd'")
+        return value
+
     @model_validator(mode='after')
     def validate_ntfy_config(self) -> 'Settings':
         """Validate ntfy configuration consistency."""
@@ -78,25 +205,4 @@ class Settings(BaseSettings):
         return self.ntfy_topic or self.ntfy_default_topic
 
 
-def send_delete_notification(message: str, settings: Settings) -> None:
-    """Send a delete notification via ntfy if configured."""
-    topic = settings.ntfy_topic or settings.ntfy_default_topic
-    if not settings.ntfy_url or not topic:
-        return
-
-    url = f"{settings.ntfy_url}/{topic}"
-
-    headers = {"Content-Type": "text/plain"}
-
-    auth = None
-    if settings.ntfy_auth_user and settings.ntfy_auth_pass:
-        auth = HTTPBasicAuth(settings.ntfy_auth_user, settings.ntfy_auth_pass)
-
-    try:
-        response = requests.post(url, data=message, headers=headers, auth=auth, timeout=10)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        logger.warning(f"Failed to send ntfy notification: {e}")
-
-
 settings = Settings()
@@ -0,0 +1,87 @@
+"""Cached, atomically written store for runtime configuration (config.json)."""
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from app.config import settings
+from app.storage import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigStore:
+    """In-memory copy of a JSON config file.
+
+    Reads are served from memory. The file's mtime and size are re-checked
+    at most every ``check_interval`` seconds so edits made outside the app
+    are still picked up. Writes go through a temp file and rename so a
+    concurrent reader never sees a half-written file, and subscribers are
+    called with the new config whenever it changes.
+    """
+
+    def __init__(self, path: Path, check_interval: float | None = None):
+        self.path = path
+        self.check_interval = settings.config_check_interval if check_interval is None else check_interval
+        self._data: dict[str, Any] = {}
+        self._signature: tuple[int, int] | None = None
+        self._checked_at: float | None = None
+        self._lock = threading.Lock()
+        self._subscribers: list[Callable[[dict[str, Any]], None]] = []
+
+    def get(self) -> dict[str, Any]:
+        """Return a copy of the current config."""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._refresh(now)
+        return dict(self._data)
+
+    def update(self, changes: dict[str, Any]) -> dict[str, Any]:
+        """Merge ``changes`` into the config, persist it and return the result."""
+        with self._lock:
+            self._refresh(time.monotonic())
+            config = {**self._data, **changes}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.path, json.dumps(config, indent=2).encode("utf-8"))
+            self._data = config
+            self._signature = self._stat()
+        self._notify(config)
+        return dict(config)
+
+    def subscribe(self, callback: Callable[[dict[str, Any]], None]) -> Callable[[], None]:
+        """Call ``callback(config)`` on every change; returns an unsubscribe function."""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self, now: float) -> None:
+        self._checked_at = now
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        data = json.loads(self.path.read_text()) if signature is not None else {}
+        changed = data != self._data
+        self._data, self._signature = data, signature
+        if changed:
+            logger.info("Reloaded config from %s", self.path)
+            self._notify(data)
+
+    def _notify(self, config: dict[str, Any]) -> None:
+        for callback in list(self._subscribers):
+            try:
+                callback(dict(config))
+            except Exception as e:
+                logger.error("Config change subscriber failed: %s", e)
+
+
+# Global config store
+config_store = ConfigStore(settings.data_dir / "config.json")
@@ -1,48 +1,109 @@
 """TinyDB database layer for whiskey tasting data."""
 
+import io
+import json
 import logging
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Callable, Iterator
+from weakref import WeakKeyDictionary
 
-from tinydb import Query, TinyDB
-from tinydb.table import Table
+from tinydb import Query, TinyDB, where
+from tinydb.storages import MemoryStorage
+from tinydb.table import Document, Table
 
+from app import compression, metrics
+from app.archive import archive_dir, archive_name, read_archive, summarize, write_archive
+from app.columns import TastingColumns
 from app.config import settings
+from app.shards import SHARD_TABLES, WHISKEY_INDEX, ShardedSnapshot, shard_dir, shard_files, shard_name
+from app.storage import InstrumentedTinyDB, TransactionalMiddleware, storage_for
+from app.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 
 class Database:
-    """TinyDB wrapper for whiskey tasting data."""
-
-    def __init__(self, db_path: Path | None = None):
+    """TinyDB wrapper for whiskey tasting data.
+
+    With ``layout="sharded"`` the TinyDB at ``db_path`` is a catalog of
+    users and themes, and each theme's whiskeys and tastings are kept in a
+    shard of their own (see ``app.shards``). Theme operations go to one
+    shard; cross-theme ones fan out over all of them. A transaction
+    covers the catalog and every shard it touches; on commit the shards
+    are written first, then the catalog, so an interrupted commit leaves
+    at worst a user without their scores, never scores of a deleted user
+    waiting for the recycled id.
+    """
+
+    def __init__(
+        self,
+        db_path: Path | None = None,
+        in_memory: bool = False,
+        storage: str | None = None,
+        use_mmap: bool | None = None,
+        compression: str | None = None,
+        durability: str | None = None,
+        layout: str | None = None,
+    ):
+        # Cheap on purpose: nothing touches the filesystem until first use.
+        # An in-memory database never touches it at all and vanishes on close.
         self.db_path = db_path or settings.db_path
-        logger.info(f"Initializing database at path: {self.db_path}")
-        logger.info(f"Database directory exists: {self.db_path.parent.exists()}")
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Database directory created/exists: {self.db_path.parent.exists()}")
-        logger.info(f"Database file exists: {self.db_path.exists()}")
-
-        # Check permissions
-        try:
-            # Try to write a test file to check if directory is writable
-            test_file = self.db_path.parent / ".write_test"
-            test_file.write_text("test")
-            test_file.unlink()
-            logger.info("Database directory is writable")
-        except Exception as e:
-            logger.error(f"Database directory is not writable: {e}")
-
+        self.in_memory = in_memory
+        self.storage = storage or settings.db_storage
+        self.use_mmap = settings.db_mmap if use_mmap is None else use_mmap
+        self.compression = compression or settings.db_compression
+        self.durability = durability or settings.db_durability
+        self.layout = layout or settings.db_layout
         self._db: TinyDB | None = None
+        # Open theme shards, least recently used first, and the tasting
+        # counts of closed ones (sharded layout)
+        self._shards: OrderedDict[int, TinyDB] = OrderedDict()
+        self._shard_sizes: dict[int, int] = {}
+        # Shards written in the current transaction, and what runs once it commits
+        self._depth = 0
+        self._transaction_shards: list[TinyDB] = []
+        self._after_commit: list[Callable[[], None]] = []
+        # Tastings of recently read archived themes, least recently used first
+        self._archive_cache: OrderedDict[int, list[dict[str, Any]]] = OrderedDict()
+        # Columns of recently scored archived themes, least recently used
+        # first: what scoreboards read, far smaller than the parsed tastings
+        self._archive_columns: OrderedDict[int, TastingColumns] = OrderedDict()
+        # Columnar copies of tasting tables, dropped with a closed shard's tables
+        self._columns: WeakKeyDictionary[Table, TastingColumns] = WeakKeyDictionary()
 
     @property
     def db(self) -> TinyDB:
-        """Lazy initialization of TinyDB instance."""
+        """Lazy initialization of TinyDB instance (the catalog in the sharded layout)."""
         if self._db is None:
-            self._db = TinyDB(self.db_path)
+            if not self.in_memory:
+                logger.info("Opening database at path: %s", self.db_path)
+            db = self._open(self.db_path)
+            if self.sharded and db.tables() & set(SHARD_TABLES):
+                db.close()
+                raise RuntimeError(
+                    f"{self.db_path} is a single-file database; convert it with scripts/shard_database.py"
+                )
+            self._db = db
         return self._db
 
+    def _open(self, path: Path) -> TinyDB:
+        if self.in_memory:
+            return InstrumentedTinyDB(storage=TransactionalMiddleware(MemoryStorage))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        storage_cls, options = storage_for(
+            self.storage, self.compression, self.use_mmap, self.durability, settings.db_group_commit_ms
+        )
+        return InstrumentedTinyDB(path, storage=TransactionalMiddleware(storage_cls), **options)
+
+    @property
+    def sharded(self) -> bool:
+        """Whether each theme's whiskeys and tastings live in a shard of their own."""
+        return self.layout == "sharded"
+
     @property
     def themes(self) -> Table:
         """Themes table."""
@@ -50,7 +111,9 @@ class Database:
 
     @property
     def whiskeys(self) -> Table:
-        """Whiskeys table."""
+        """Whiskeys table (single layout; see ``_whiskeys_of``)."""
+        if self.sharded:
+            raise RuntimeError("Whiskeys are kept per theme in the sharded layout")
         return self.db.table("whiskeys")
 
     @property
@@ -60,19 +123,250 @@ class Database:
 
     @property
     def tastings(self) -> Table:
-        """Tastings table."""
+        """Tastings table (single layout; see ``_tastings_of``)."""
+        if self.sharded:
+            raise RuntimeError("Tastings are kept per theme in the sharded layout")
         return self.db.table("tastings")
 
+    @property
+    def outbox(self) -> Table:
+        """Pending notification outbox table."""
+        return self.db.table("outbox")
+
+    @property
+    def archives(self) -> Table:
+        """Archived themes: the file holding their tastings and cached aggregates."""
+        return self.db.table("archives")
+
+    @property
+    def whiskey_index(self) -> Table:
+        """Theme of every whiskey, whose shard holds it (sharded layout)."""
+        return self.db.table(WHISKEY_INDEX)
+
+    # Shards
+    @property
+    def shard_dir(self) -> Path:
+        """Directory holding the theme shards of this database."""
+        return shard_dir(self.db_path)
+
+    def _shard(self, theme_id: int) -> TinyDB:
+        """Open (or reuse) a theme's shard, joining the current transaction."""
+        shard = self._shards.get(theme_id)
+        if shard is None:
+            shard = self._open(self.shard_dir / shard_name(theme_id))
+            self._shards[theme_id] = shard
+            metrics.db_shards_open.inc()
+            self._evict_shards()
+        else:
+            self._shards.move_to_end(theme_id)
+        if self._depth and not shard.storage.in_transaction:
+            shard.storage.begin()
+            self._transaction_shards.append(shard)
+        return shard
+
+    def _evict_shards(self) -> None:
+        """Close least recently used shards beyond ``DB_OPEN_SHARDS``, except those in a transaction."""
+        if self.in_memory:
+            # Closing an in-memory shard would lose it
+            return
+        excess = len(self._shards) - max(1, settings.db_open_shards)
+        idle = [theme_id for theme_id, shard in self._shards.items() if not shard.storage.in_transaction]
+        for theme_id in idle[:max(0, excess)]:
+            self._close_shard(theme_id)
+            metrics.db_shard_evictions_total.inc()
+
+    def _close_shard(self, theme_id: int) -> None:
+        shard = self._shards.pop(theme_id)
+        count = shard.table("tastings").cached_len
+        if count is not None:
+            self._shard_sizes[theme_id] = count
+        shard.close()
+        metrics.db_shards_open.dec()
+
+    def _drop_shard(self, theme_id: int) -> None:
+        """Close and delete a theme's shard."""
+        if theme_id in self._shards:
+            self._close_shard(theme_id)
+        self._shard_sizes.pop(theme_id, None)
+        if not self.in_memory:
+            (self.shard_dir / shard_name(theme_id)).unlink(missing_ok=True)
+
+    def _shard_files(self) -> dict[int, Path]:
+        return {} if self.in_memory else shard_files(self.db_path)
+
+    def _whiskeys_of(self, theme_id: int) -> Table:
+        """Table holding a theme's whiskeys."""
+        return self._shard(theme_id).table("whiskeys") if self.sharded else self.whiskeys
+
+    def _tastings_of(self, theme_id: int) -> Table:
+        """Table holding the tastings of a theme's whiskeys."""
+        return self._shard(theme_id).table("tastings") if self.sharded else self.tastings
+
+    def _tasting_tables(self) -> Iterator[Table]:
+        """Every table holding tastings: one per theme in the sharded layout."""
+        if not self.sharded:
+            yield self.tastings
+            return
+        for theme_id in self._theme_ids():
+            yield self._tastings_of(theme_id)
+
+    def _theme_ids(self) -> list[int]:
+        # A cached query, unlike themes.all(): answered from memory until the themes change
+        return [theme["id"] for theme in self.themes.search(where("id").exists())]
+
+    def _theme_of_whiskey(self, whiskey_id: int) -> int | None:
+        """Theme of a whiskey, from the catalog's index (sharded layout)."""
+        Whiskey = Query()
+        entry = self.whiskey_index.search(Whiskey.id == whiskey_id)
+        return entry[0]["theme_id"] if entry else None
+
+    def _whiskey_table(self, whiskey_id: int) -> Table | None:
+        """Table holding a whiskey, or None if the index does not know it."""
+        if not self.sharded:
+            return self.whiskeys
+        theme_id = self._theme_of_whiskey(whiskey_id)
+        return None if theme_id is None else self._whiskeys_of(theme_id)
+
+    def _columns_of(self, tastings: Table) -> TastingColumns:
+        """Columnar copy of a tasting table, rebuilt if a write has made it stale."""
+        columns = self._columns.get(tastings)
+        if columns is None or columns.version != tastings.version:
+            columns = TastingColumns.from_documents(tastings.raw_items())
+            columns.version = tastings.version
+            self._columns[tastings] = columns
+        return columns
+
+    def _tasting_count(self, theme_id: int) -> int:
+        """Tastings in a theme's shard, remembered across the shard being closed."""
+        shard = self._shards.get(theme_id)
+        if shard is None and theme_id in self._shard_sizes:
+            return self._shard_sizes[theme_id]
+        return len(self._tastings_of(theme_id))
+
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        """Group several operations into a single storage write.
+
+        Everything inside the block is committed together when it exits
+        normally and discarded if it raises. In the sharded layout that
+        is one write per file touched.
+        """
+        storage = self.db.storage
+        storage.begin()
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._abort()
+            raise
+        if not self._depth:
+            # A nested transaction failed and rolled everything back
+            raise RuntimeError("commit() called outside a transaction")
+        self._depth -= 1
+        if self._depth:
+            storage.commit()
+            return
+        try:
+            while self._transaction_shards:
+                self._transaction_shards.pop(0).storage.commit()
+            storage.commit()
+        except BaseException:
+            self._abort()
+            raise
+        actions, self._after_commit = self._after_commit, []
+        for action in actions:
+            action()
+        self._evict_shards()
+
+    def _abort(self) -> None:
+        """Discard the current transaction everywhere and forget what it cached."""
+        self._depth = 0
+        self.db.storage.rollback()
+        for shard in self._transaction_shards:
+            shard.storage.rollback()
+        self._transaction_shards.clear()
+        self._after_commit.clear()
+        for db in (self.db, *self._shards.values()):
+            for table in db._tables.values():
+                table.invalidate()
+        self._shard_sizes.clear()
+        self._archive_cache.clear()
+        self._archive_columns.clear()
+
+    def _on_commit(self, action: Callable[[], None]) -> None:
+        """Run ``action`` once the current transaction commits, or now outside one."""
+        if self._depth:
+            self._after_commit.append(action)
+        else:
+            action()
+
+    def open_snapshot(self) -> BinaryIO:
+        """Open a consistent point-in-time copy of the stored data (see ``decode_snapshot``).
+
+        Take it between database operations, e.g. on the event loop where the
+        routers run them; reading the handle afterwards never blocks writers.
+        """
+        storage = self.db.storage
+        if storage.in_transaction:
+            raise RuntimeError("Cannot snapshot the database inside a transaction")
+        if self.sharded:
+            return self._open_sharded_snapshot()
+        if self.in_memory:
+            return io.BytesIO(json.dumps(storage.read() or {}).encode("utf-8"))
+        if len(self.archives):
+            return self._open_archived_snapshot()
+        return storage.storage.open_snapshot()
+
+    def _open_archived_snapshot(self) -> ShardedSnapshot:
+        """Snapshot of the database file together with its archive files."""
+        catalog = self.db.storage.storage.open_snapshot()
+        archives: dict[int, BinaryIO] = {}
+        try:
+            for archive in self.list_archives():
+                try:
+                    archives[archive["theme_id"]] = open(self.archive_dir / archive["file"], "rb")
+                except FileNotFoundError:
+                    logger.warning("Archive file %s is missing; leaving it out of the snapshot", archive["file"])
+        except BaseException:
+            ShardedSnapshot(catalog, {}, archives).close()
+            raise
+        return ShardedSnapshot(catalog, {}, archives)
+
+    def _open_sharded_snapshot(self) -> ShardedSnapshot:
+        def open_handle(db: TinyDB) -> BinaryIO:
+            if self.in_memory:
+                return io.BytesIO(json.dumps(db.storage.read() or {}).encode("utf-8"))
+            return db.storage.storage.open_snapshot()
+
+        catalog = open_handle(self.db)
+        shards: dict[int, BinaryIO] = {}
+        try:
+            themes = set(self._theme_ids())
+            for theme_id in sorted(themes & (self._shards.keys() | self._shard_files().keys())):
+                shard = self._shards.get(theme_id)
+                if shard is not None:
+                    shards[theme_id] = open_handle(shard)
+                else:
+                    shards[theme_id] = open(self.shard_dir / shard_name(theme_id), "rb")
+        except BaseException:
+            ShardedSnapshot(catalog, shards).close()
+            raise
+        return ShardedSnapshot(catalog, shards)
+
     def close(self) -> None:
         """Close database connection."""
+        for theme_id in list(self._shards):
+            self._close_shard(theme_id)
+        self._shard_sizes.clear()
         if self._db is not None:
             self._db.close()
             self._db = None
 
     # Theme operations
+    @traced
     def create_theme(self, name: str, notes: str = "") -> dict[str, Any]:
         """Create a new tasting theme."""
-        logger.info(f"Creating theme: name='{name}', notes='{notes}'")
+        logger.debug("Creating theme: name=%r", name)
         now = datetime.now(timezone.utc).isoformat()
 
         doc = {
@@ -83,21 +377,25 @@ class Database:
         }
         try:
             theme_id = self.themes.insert(doc)
-            logger.info(f"Theme inserted with ID: {theme_id}")
             doc["id"] = theme_id
             self.themes.update({"id": theme_id}, doc_ids=[theme_id])
-            logger.info(f"Theme creation successful: {doc}")
+            if self.sharded:
+                # TinyDB recycles the highest id; a crash may have left its old shard
+                self._drop_shard(theme_id)
+            logger.debug("Theme created with ID %s", theme_id)
             return doc
         except Exception as e:
-            logger.error(f"Failed to create theme: {e}")
+            logger.error("Failed to create theme: %s", e)
             raise
 
+    @traced
     def get_theme(self, theme_id: int) -> dict[str, Any] | None:
         """Get theme by ID."""
         Theme = Query()
         result = self.themes.search(Theme.id == theme_id)
         return result[0] if result else None
 
+    @traced
     def get_current_theme(self) -> dict[str, Any] | None:
         """Get the most recent theme."""
         all_themes = self.themes.all()
@@ -106,46 +404,59 @@ class Database:
         # Sort by created_at descending and return the first (most recent)
         return sorted(all_themes, key=lambda x: x.get("created_at", ""), reverse=True)[0]
 
+    @traced
     def list_themes(self) -> list[dict[str, Any]]:
         """List all themes."""
         return list(self.themes.all())
 
+    @traced
     def get_active_theme(self) -> dict[str, Any] | None:
         """Get the active theme (alias for get_current_theme)."""
         return self.get_current_theme()
 
+    @traced
     def set_active_theme(self, theme_id: int) -> bool:
         """Set a theme as active by updating its timestamp."""
         theme = self.get_theme(theme_id)
         if not theme:
             return False
 
+        # The active theme is scored again, so bring it back from the archive
+        self.restore_theme(theme_id)
         # Update the theme's created_at to make it the most recent
         now = datetime.now(timezone.utc).isoformat()
         Theme = Query()
         self.themes.update({"created_at": now}, Theme.id == theme_id)
         return True
 
+    @traced
     def update_theme(self, theme_id: int, updates: dict[str, Any]) -> dict[str, Any] | None:
         """Update theme by ID."""
         Theme = Query()
         self.themes.update(updates, Theme.id == theme_id)
         return self.get_theme(theme_id)
 
+    @traced
     def delete_theme(self, theme_id: int) -> bool:
         """Delete theme by ID."""
         Theme = Query()
-        removed = self.themes.remove(Theme.id == theme_id)
-        if removed:
-            # Also delete associated whiskeys and tastings
-            self.delete_whiskeys_by_theme(theme_id)
-            # Note: tastings are deleted via cascade when whiskeys are deleted
+        with self.transaction():
+            removed = self.themes.remove(Theme.id == theme_id)
+            if removed and self.sharded:
+                # The shard goes as a whole, once the catalog no longer lists it
+                self.whiskey_index.remove(Theme.theme_id == theme_id)
+                self._on_commit(lambda: self._drop_shard(theme_id))
+            elif removed:
+                # Also delete associated whiskeys and tastings
+                self.delete_whiskeys_by_theme(theme_id)
+                # Note: tastings are deleted via cascade when whiskeys are deleted
         return len(removed) > 0
 
     # Whiskey operations
+    @traced
     def create_whiskey(self, theme_id: int, name: str, proof: float | None = None) -> dict[str, Any]:
         """Create a new whiskey."""
-        logger.info(f"Creating whiskey: theme_id={theme_id}, name='{name}', proof={proof}")
+        logger.debug("Creating whiskey: theme_id=%s, name=%r", theme_id, name)
         now = datetime.now(timezone.utc).isoformat()
 
         doc = {
@@ -156,33 +467,47 @@ class Database:
             "created_at": now,
         }
         try:
-            whiskey_id = self.whiskeys.insert(doc)
-            logger.info(f"Whiskey inserted with ID: {whiskey_id}")
-            doc["id"] = whiskey_id
-            self.whiskeys.update({"id": whiskey_id}, doc_ids=[whiskey_id])
-            logger.info(f"Whiskey creation successful: {doc}")
+            if self.sharded:
+                # The catalog allocates the id, and is written first: a crash
+                # in between leaves an index entry no whiskey uses
+                whiskey_id = self.whiskey_index.insert({"theme_id": theme_id})
+                self.whiskey_index.update({"id": whiskey_id}, doc_ids=[whiskey_id])
+                doc["id"] = whiskey_id
+                self._whiskeys_of(theme_id).upsert(Document(doc, doc_id=whiskey_id))
+            else:
+                whiskey_id = self.whiskeys.insert(doc)
+                doc["id"] = whiskey_id
+                self.whiskeys.update({"id": whiskey_id}, doc_ids=[whiskey_id])
+            logger.debug("Whiskey created with ID %s", whiskey_id)
             return doc
         except Exception as e:
-            logger.error(f"Failed to create whiskey: {e}")
+            logger.error("Failed to create whiskey: %s", e)
             raise
 
+    @traced
     def get_whiskey(self, whiskey_id: int) -> dict[str, Any] | None:
         """Get whiskey by ID."""
         Whiskey = Query()
-        result = self.whiskeys.search(Whiskey.id == whiskey_id)
+        table = self._whiskey_table(whiskey_id)
+        result = table.search(Whiskey.id == whiskey_id) if table is not None else []
         return result[0] if result else None
 
+    @traced
     def get_whiskeys_by_theme(self, theme_id: int) -> list[dict[str, Any]]:
         """Get all whiskeys for a theme."""
         Whiskey = Query()
-        return self.whiskeys.search(Whiskey.theme_id == theme_id)
+        return self._whiskeys_of(theme_id).search(Whiskey.theme_id == theme_id)
 
+    @traced
     def update_whiskey(self, whiskey_id: int, updates: dict[str, Any]) -> dict[str, Any] | None:
         """Update whiskey by ID."""
         Whiskey = Query()
-        self.whiskeys.update(updates, Whiskey.id == whiskey_id)
+        table = self._whiskey_table(whiskey_id)
+        if table is not None:
+            table.update(updates, Whiskey.id == whiskey_id)
         return self.get_whiskey(whiskey_id)
 
+    @traced
     def delete_whiskeys_by_theme(self, theme_id: int) -> int:
         """Delete all whiskeys for a theme and their associated tastings.
 
@@ -192,15 +517,23 @@ class Database:
         id would silently re-attach to the new whiskey as a phantom score.
         """
         Whiskey = Query()
-        whiskeys_to_delete = self.whiskeys.search(Whiskey.theme_id == theme_id)
-        whiskey_ids = [w["id"] for w in whiskeys_to_delete]
-        if whiskey_ids:
-            Tasting = Query()
-            self.tastings.remove(Tasting.whiskey_id.one_of(whiskey_ids))
-        removed = self.whiskeys.remove(Whiskey.theme_id == theme_id)
+        archive = self.get_archive(theme_id)
+        with self.transaction():
+            whiskeys_to_delete = self._whiskeys_of(theme_id).search(Whiskey.theme_id == theme_id)
+            whiskey_ids = [w["id"] for w in whiskeys_to_delete]
+            if whiskey_ids:
+                Tasting = Query()
+                self._tastings_of(theme_id).remove(Tasting.whiskey_id.one_of(whiskey_ids))
+            if archive:
+                self.archives.remove(doc_ids=[archive.doc_id])
+                self._on_commit(lambda: self._delete_archive_file(archive))
+            if self.sharded:
+                self.whiskey_index.remove(Whiskey.theme_id == theme_id)
+            removed = self._whiskeys_of(theme_id).remove(Whiskey.theme_id == theme_id)
         return len(removed)
 
     # User operations
+    @traced
     def get_or_create_user(self, name: str) -> dict[str, Any]:
         """Get user by name or create if doesn't exist."""
         User = Query()
@@ -220,33 +553,56 @@ class Database:
         self.users.update({"id": user_id}, doc_ids=[user_id])
         return doc
 
+    @traced
     def get_user(self, user_id: int) -> dict[str, Any] | None:
         """Get user by ID."""
         User = Query()
         result = self.users.search(User.id == user_id)
         return result[0] if result else None
 
+    @traced
+    def get_user_names(self) -> dict[int, str]:
+        """Names of all users by ID."""
+        # A cached query: answered from memory until the users change
+        return {user["id"]: user["name"] for user in self.users.search(where("id").exists())}
+
+    @traced
     def get_user_by_name(self, name: str) -> dict[str, Any] | None:
         """Get user by name."""
         User = Query()
         result = self.users.search(User.name == name)
         return result[0] if result else None
 
+    @traced
     def list_users(self) -> list[str]:
         """List all user names."""
         return [user["name"] for user in self.users.all()]
 
+    @traced
     def delete_user(self, user_id: int) -> bool:
         """Delete user by ID and their associated tastings."""
         User = Query()
-        removed = self.users.remove(User.id == user_id)
-        if removed:
-            # Also delete associated tastings
-            Tasting = Query()
-            self.tastings.remove(Tasting.user_id == user_id)
+        with self.transaction():
+            removed = self.users.remove(User.id == user_id)
+            if removed:
+                # Also delete associated tastings, archived ones included;
+                # only tables holding some are written
+                Tasting = Query()
+                for tastings in self._tasting_tables():
+                    doc_ids = [t.doc_id for t in tastings.search(Tasting.user_id == user_id)]
+                    if doc_ids:
+                        tastings.remove(doc_ids=doc_ids)
+                for archive in self._archive_records():
+                    if user_id in archive["user_ids"]:
+                        kept = [t for t in self._archived_tastings(archive) if t["user_id"] != user_id]
+                        self.archives.update(summarize(kept), doc_ids=[archive.doc_id])
+                        # After the commit: a crash in between leaves orphan tastings, which
+                        # scoreboards skip, rather than archives missing a live user's scores
+                        self._on_commit(lambda archive=archive, kept=kept: self._rewrite_archive(archive, kept))
         return len(removed) > 0
 
     # Tasting operations
+    @traced
     def create_or_update_tasting(
         self,
         user_id: int,
@@ -256,13 +612,32 @@ class Database:
         finish_score: float,
         personal_rank: int,
     ) -> dict[str, Any]:
-        """Create or update a tasting entry."""
+        """Create or update a tasting entry.
+
+        In the sharded layout the whiskey must exist: its theme decides
+        the shard the tasting goes to.
+        """
+        if self.sharded:
+            theme_id = self._theme_of_whiskey(whiskey_id)
+            if theme_id is None:
+                raise ValueError(f"Whiskey {whiskey_id} does not exist")
+            tastings = self._tastings_of(theme_id)
+        else:
+            if len(self.archives):
+                whiskey = self.get_whiskey(whiskey_id)
+                if whiskey:
+                    self.restore_theme(whiskey["theme_id"])
+            tastings = self.tastings
         now = datetime.now(timezone.utc).isoformat()
 
         Tasting = Query()
-        existing = self.tastings.search(
+        existing = tastings.search(
             (Tasting.user_id == user_id) & (Tasting.whiskey_id == whiskey_id)
         )
+        # Columns in step with the table are patched rather than rebuilt
+        columns = self._columns.get(tastings)
+        if columns is not None and columns.version != tastings.version:
+            columns = None
 
         doc = {
             "user_id": user_id,
@@ -277,20 +652,30 @@ class Database:
         if existing:
             # Update existing
             tasting_id = existing[0].doc_id
-            self.tastings.update(doc, doc_ids=[tasting_id])
+            tastings.update(doc, doc_ids=[tasting_id])
             doc["id"] = tasting_id
             doc["created_at"] = existing[0]["created_at"]
+            if columns is not None:
+                columns.put(tasting_id, doc)
         else:
             # Create new
             doc["created_at"] = now
-            tasting_id = self.tastings.insert(doc)
+            tasting_id = tastings.insert(doc)
             doc["id"] = tasting_id
-            self.tastings.update({"id": tasting_id}, doc_ids=[tasting_id])
+            tastings.update({"id": tasting_id}, doc_ids=[tasting_id])
+            if columns is not None:
+                columns.append(tasting_id, doc)
+        if columns is not None:
+            columns.version = tastings.version
 
         return doc
 
+    @traced
     def get_tastings_by_theme(self, theme_id: int) -> list[dict[str, Any]]:
-        """Get all tastings for whiskeys in a theme."""
+        """Get all tastings for whiskeys in a theme, loading them from its archive if it has one."""
+        archive = self.get_archive(theme_id)
+        if archive:
+            return self._archived_tastings(archive)
         # First get all whiskey IDs for this theme
         whiskeys = self.get_whiskeys_by_theme(theme_id)
         whiskey_ids = [w["id"] for w in whiskeys]
@@ -299,10 +684,28 @@ class Database:
             return []
 
         Tasting = Query()
-        return self.tastings.search(Tasting.whiskey_id.one_of(whiskey_ids))
-
+        return self._tastings_of(theme_id).search(Tasting.whiskey_id.one_of(whiskey_ids))
+
+    @traced
+    def get_theme_columns(self, theme_id: int) -> TastingColumns:
+        """Columns holding a theme's tastings, and possibly other themes'; select rows by whiskey."""
+        archive = self.get_archive(theme_id)
+        if archive:
+            columns = self._archive_columns.get(theme_id)
+            if columns is None:
+                # Only the columns are kept: caching the parsed tastings as well would double the cost
+                tastings = self._load_archive(archive, keep=False)
+                columns = TastingColumns.from_documents((t["id"], t) for t in tastings)
+            self._remember_archive(self._archive_columns, theme_id, columns)
+            return columns
+        return self._columns_of(self._tastings_of(theme_id))
+
+    @traced
     def get_user_tastings_for_theme(self, user_id: int, theme_id: int) -> list[dict[str, Any]]:
         """Get all tastings by a user for a theme."""
+        archive = self.get_archive(theme_id)
+        if archive:
+            return [t for t in self._archived_tastings(archive) if t["user_id"] == user_id]
         whiskeys = self.get_whiskeys_by_theme(theme_id)
         whiskey_ids = [w["id"] for w in whiskeys]
 
@@ -310,27 +713,244 @@ class Database:
             return []
 
         Tasting = Query()
-        return self.tastings.search(
+        return self._tastings_of(theme_id).search(
             (Tasting.user_id == user_id) & (Tasting.whiskey_id.one_of(whiskey_ids))
         )
 
+    # Archive operations
+    @property
+    def archive_dir(self) -> Path:
+        """Directory holding the archive files of this database."""
+        return archive_dir(self.db_path)
+
+    def _archive_records(self) -> list[Document]:
+        # A cached query: answered from memory until the archives change
+        return self.archives.search(where("theme_id").exists())
+
+    def _archive_method(self, archive: dict[str, Any]) -> str:
+        return compression.detect_file(self.archive_dir / archive["file"])
+
+    @traced
+    def list_archives(self) -> list[dict[str, Any]]:
+        """Archive records of all archived themes, oldest theme first."""
+        return sorted(self._archive_records(), key=lambda archive: archive["theme_id"])
+
+    def get_archive(self, theme_id: int) -> Document | None:
+        """Archive record of a theme, or None while its tastings are in the hot store."""
+        if not len(self.archives):
+            return None
+        return next((archive for archive in self._archive_records() if archive["theme_id"] == theme_id), None)
+
+    def _archived_tastings(self, archive: dict[str, Any]) -> list[dict[str, Any]]:
+        """Copies of the tastings of an archived theme, so callers cannot change the cached ones."""
+        return [dict(tasting) for tasting in self._load_archive(archive)]
+
+    def _load_archive(self, archive: dict[str, Any], keep: bool = True) -> list[dict[str, Any]]:
+        """Tastings of an archived theme, read from its file unless still in memory.
+
+        The newest ``ARCHIVE_CACHE_SIZE`` archives read with ``keep`` stay
+        parsed in memory.
+        """
+        theme_id = archive["theme_id"]
+        tastings = self._archive_cache.get(theme_id)
+        if tastings is None:
+            metrics.archive_loads_total.inc()
+            tastings = read_archive(self.archive_dir / archive["file"])
+            if not keep:
+                return tastings
+        self._remember_archive(self._archive_cache, theme_id, tastings)
+        return tastings
+
+    @staticmethod
+    def _remember_archive(cache: OrderedDict, theme_id: int, value: Any) -> None:
+        """Make ``value`` the most recently used entry of ``cache``, evicting beyond ``ARCHIVE_CACHE_SIZE``."""
+        cache[theme_id] = value
+        cache.move_to_end(theme_id)
+        while len(cache) > max(1, settings.archive_cache_size):
+            cache.popitem(last=False)
+
+    def _forget_archive(self, theme_id: int) -> None:
+        self._archive_cache.pop(theme_id, None)
+        self._archive_columns.pop(theme_id, None)
+
+    def _delete_archive_file(self, archive: dict[str, Any]) -> None:
+        self._forget_archive(archive["theme_id"])
+        (self.archive_dir / archive["file"]).unlink(missing_ok=True)
+
+    def _rewrite_archive(self, archive: dict[str, Any], tastings: list[dict[str, Any]]) -> None:
+        write_archive(self.archive_dir / archive["file"], archive["theme_id"], tastings, self._archive_method(archive))
+        self._forget_archive(archive["theme_id"])
+
+    @traced
+    def archive_themes(self, before: datetime) -> list[int]:
+        """Move the tastings of themes created before ``before`` into archive files.
+
+        Each theme's tastings go to a compressed file of their own, written
+        and fsynced before they are removed from the hot store in a single
+        write. The theme and its whiskeys stay hot, as do the tasting count
+        and the tasters. The current theme is never archived. Returns the
+        archived theme ids.
+        """
+        if self.in_memory:
+            raise RuntimeError("An in-memory database has nowhere to archive to")
+        if self.sharded:
+            raise RuntimeError("The sharded layout already keeps old themes out of every write")
+        if before.tzinfo is None:
+            before = before.replace(tzinfo=timezone.utc)
+        current = self.get_current_theme()
+        candidates = set()
+        for theme in self.list_themes():
+            created = datetime.fromisoformat(theme["created_at"])
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=timezone.utc)
+            if created < before and theme["id"] != current["id"]:
+                candidates.add(theme["id"])
+        candidates -= {archive["theme_id"] for archive in self._archive_records()}
+        if not candidates:
+            return []
+
+        # One pass over the tastings rather than one per theme
+        theme_of = {w["id"]: w["theme_id"] for w in self.whiskeys.all() if w["theme_id"] in candidates}
+        by_theme: dict[int, list[Document]] = {theme_id: [] for theme_id in candidates}
+        for tasting in self.tastings.all():
+            theme_id = theme_of.get(tasting["whiskey_id"])
+            if theme_id is not None:
+                by_theme[theme_id].append(tasting)
+
+        method = settings.archive_compression
+        now = datetime.now(timezone.utc).isoformat()
+        records = []
+        for theme_id, tastings in sorted(by_theme.items()):
+            name = archive_name(theme_id, method)
+            write_archive(self.archive_dir / name, theme_id, [dict(t) for t in tastings], method)
+            self._forget_archive(theme_id)
+            records.append({"theme_id": theme_id, "file": name, "archived_at": now, **summarize(tastings)})
+        with self.transaction():
+            self.tastings.remove(doc_ids=[t.doc_id for tastings in by_theme.values() for t in tastings])
+            self.archives.insert_multiple(records)
+        archived = sorted(by_theme)
+        metrics.archived_themes_total.inc(len(archived))
+        return archived
+
+    @traced
+    def restore_theme(self, theme_id: int) -> bool:
+        """Move an archived theme's tastings back into the hot store; False if it is not archived.
+
+        Tastings keep their ids unless a newer tasting took one meanwhile.
+        """
+        archive = self.get_archive(theme_id)
+        if archive is None:
+            return False
+        tastings = self._archived_tastings(archive)
+        with self.transaction():
+            taken = {doc.doc_id for doc in self.tastings.all()}
+            for tasting in tastings:
+                if tasting.get("id") in taken or not isinstance(tasting.get("id"), int):
+                    doc_id = self.tastings.insert(tasting)
+                    self.tastings.update({"id": doc_id}, doc_ids=[doc_id])
+                else:
+                    self.tastings.insert(Document(tasting, doc_id=tasting["id"]))
+            self.archives.remove(doc_ids=[archive.doc_id])
+        self._delete_archive_file(archive)
+        logger.info("Restored %s archived tastings of theme %s", len(tastings), theme_id)
+        return True
+
+    # Notification outbox
+    @traced
+    def enqueue_notification(
+        self,
+        message: str,
+        title: str | None = None,
+        priority: str | None = None,
+        subject: str | None = None,
+    ) -> int:
+        """Persist a notification for background delivery.
+
+        Call inside the same ``transaction()`` as the change it describes so
+        the outbox entry is committed atomically with it.
+        """
+        doc = {
+            "message": message,
+            "title": title,
+            "priority": priority,
+            "subject": subject,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "attempts": 0,
+        }
+        return self.outbox.insert(doc)
+
+    @traced
+    def pending_notifications(self, limit: int) -> list[dict[str, Any]]:
+        """Oldest undelivered outbox entries, at most ``limit``."""
+        pending = sorted(self.outbox.all(), key=lambda doc: doc.doc_id)
+        return pending[:limit]
+
+    @traced
+    def ack_notifications(self, entry_ids: list[int]) -> None:
+        """Remove delivered outbox entries in a single write."""
+        if entry_ids:
+            self.outbox.remove(doc_ids=entry_ids)
+
+    @traced
+    def record_failed_notifications(self, entry_ids: list[int]) -> None:
+        """Count a failed delivery round against outbox entries in a single write."""
+        if not entry_ids:
+            return
+
+        def count_attempt(doc: dict[str, Any]) -> None:
+            doc["attempts"] = doc.get("attempts", 0) + 1
+
+        self.outbox.update(count_attempt, doc_ids=entry_ids)
+
     # Stats
+    def check_storage(self) -> dict[str, bool]:
+        """Cheap readiness checks that never parse the database file."""
+        if self.in_memory:
+            return {"directory_writable": True, "database_accessible": True}
+        directory = self.db_path.parent
+        exists = self.db_path.exists()
+        return {
+            "directory_writable": directory.is_dir() and os.access(directory, os.W_OK),
+            "database_accessible": not exists or os.access(self.db_path, os.R_OK | os.W_OK),
+        }
+
+    @traced
     def get_stats(self) -> dict[str, Any]:
-        """Get database statistics."""
+        """Get database statistics.
+
+        Table sizes are cached and kept current by every write, so only the
+        first call after startup reads the file.
+        """
+        archives = self._archive_records()
+        if self.sharded:
+            # Counts of closed shards are remembered, so only the first
+            # call after startup opens every shard
+            whiskeys = len(self.whiskey_index)
+            tastings = sum(self._tasting_count(theme_id) for theme_id in self._theme_ids())
+        else:
+            whiskeys = len(self.whiskeys)
+            tastings = len(self.tastings)
         return {
             "total_themes": len(self.themes),
-            "total_whiskeys": len(self.whiskeys),
+            "total_whiskeys": whiskeys,
             "total_users": len(self.users),
-            "total_tastings": len(self.tastings),
+            "total_tastings": tastings + sum(archive["tastings"] for archive in archives),
+            "archived_themes": len(archives),
         }
 
+    @traced
     def reset_database(self) -> None:
         """Reset the database by truncating all tables."""
         self.themes.truncate()
-        self.whiskeys.truncate()
         self.users.truncate()
-        self.tastings.truncate()
-
+        if self.sharded:
+            self.whiskey_index.truncate()
+            for theme_id in self._shards.keys() | self._shard_files().keys():
+                self._drop_shard(theme_id)
+        else:
+            self.whiskeys.truncate()
+            self.tastings.truncate()
+        for archive in self._archive_records():
+            self._delete_archive_file(archive)
+        self.archives.truncate()
 
-# Global database instance
-db = Database()
@@ -0,0 +1,66 @@
+"""FastAPI dependencies shared by the routers."""
+
+from typing import Annotated, AsyncIterator
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from app.backups import BackupManager
+from app.database import Database
+from app.notifications import NotificationDispatcher
+from app.responses import prefers_msgpack
+from app.tenants import Tenant, TenantError, requested_tenant
+
+
+async def get_tenant(request: Request) -> AsyncIterator[Tenant | None]:
+    """Tenant serving the request in multi-tenant mode, otherwise None."""
+    registry = getattr(request.app.state, "tenants", None)
+    if registry is None:
+        yield None
+        return
+    name = requested_tenant(request.scope)
+    if not name:
+        raise HTTPException(status_code=400, detail="Tenant required: send an X-Tenant header or use /t/<tenant>/")
+    try:
+        registry.path_for(name)
+    except TenantError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    async with registry.use(name) as tenant:
+        yield tenant
+
+
+async def get_db(request: Request, tenant: Annotated[Tenant | None, Depends(get_tenant)]) -> Database:
+    """Database owned by the app (or tenant) handling the request, opened by the lifespan."""
+    return tenant.db if tenant else request.app.state.db
+
+
+async def get_dispatcher(
+    request: Request, tenant: Annotated[Tenant | None, Depends(get_tenant)]
+) -> NotificationDispatcher:
+    """Notification dispatcher writing to the outbox of the request's database."""
+    return tenant.dispatcher if tenant else request.app.state.dispatcher
+
+
+async def get_backups(request: Request, tenant: Annotated[Tenant | None, Depends(get_tenant)]) -> BackupManager:
+    """Backup manager of the request's database."""
+    return tenant.backups if tenant else request.app.state.backups
+
+
+async def wants_msgpack(request: Request, response: Response) -> bool:
+    """Whether to answer in MessagePack (``Accept: application/msgpack`` and msgpack installed)."""
+    response.headers["Vary"] = "Accept"
+    if not prefers_msgpack(request.headers.get("accept")):
+        return False
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Router parameter types: ``db: DatabaseDep``, ``dispatcher: DispatcherDep``,
+# ``backups: BackupsDep``, ``msgpack: WantsMsgpack = False`` (defaulted so
+# handlers stay callable directly)
+DatabaseDep = Annotated[Database, Depends(get_db)]
+DispatcherDep = Annotated[NotificationDispatcher, Depends(get_dispatcher)]
+BackupsDep = Annotated[BackupManager, Depends(get_backups)]
+WantsMsgpack = Annotated[bool, Depends(wants_msgpack)]
@@ -0,0 +1,113 @@
+"""Non-blocking logging setup with optional JSON output and per-module levels."""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class StdoutHandler(logging.StreamHandler):
+    """Stream handler writing to whatever ``sys.stdout`` is when a record is emitted.
+
+    Holding on to the stream found at setup would keep writing to it
+    after it is replaced and closed, e.g. by pytest's output capture.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value) -> None:
+        pass
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """Parse ``"app.database=WARNING,uvicorn.access=ERROR"`` into a mapping."""
+    levels = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, level = item.partition("=")
+        if not level:
+            raise ValueError(f"Invalid log level override {item!r}, expected module=LEVEL")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = "INFO", fmt: str = "text", module_levels: str = "") -> None:
+    """Route all logging through a queue drained by a background thread.
+
+    Request handlers only put records on an in-memory queue, so a slow
+    stdout never blocks them. Records below the configured level are
+    discarded before any message formatting happens.
+    """
+    global _listener
+
+    handler = StdoutHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    if _listener is not None:
+        _listener.stop()
+    _listener = logging.handlers.QueueListener(queue.SimpleQueue(), handler, respect_handler_level=True)
+    _listener.start()
+
+    _replace_handlers(logging.handlers.QueueHandler(_listener.queue))
+    logging.getLogger().setLevel(level.upper())
+
+    for name, module_level in parse_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+def _replace_handlers(handler: logging.Handler) -> None:
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background thread.
+
+    Records logged afterwards are written directly by the listener's
+    handler rather than queued for a thread that no longer runs.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _replace_handlers(_listener.handlers[0])
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -3,79 +3,149 @@
 import asyncio
 import logging
 import sys
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
+from app import __version__
+from app.backups import BackupManager
+from app.config import settings
+from app.database import Database
+from app.logging_config import configure_logging, shutdown_logging
+from app.metrics import MetricsMiddleware
+from app.notifications import NotificationDispatcher
+from app.profiling import ProfilingMiddleware
+from app.routers import (
+    admin_router,
+    config_router,
+    health_router,
+    metrics_router,
+    tastings_router,
+    themes_router,
+    users_router,
+    whiskeys_router,
 )
+from app.tenants import TenantMiddleware, TenantRegistry
+from app.tracing import TracingMiddleware
 
 # Fix for Windows: Use SelectorEventLoop for Playwright compatibility
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 logger = logging.getLogger(__name__)
-from fastapi.middleware.cors import CORSMiddleware
 
-from app import __version__
-from app.config import settings
-from app.database import db
-from app.routers import config_router, health_router, tastings_router, themes_router, users_router, whiskeys_router
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan manager."""
-    # Startup
-    settings.data_dir.mkdir(parents=True, exist_ok=True)
-    yield
-    # Shutdown
-    try:
-        db.close()
-    except Exception as e:
-        logger.error(f"Error closing database: {e}")
-
-
-app = FastAPI(
-    title="Whiskey Tasting API",
-    description="Whiskey tasting management and scoring system",
-    version=__version__,
-    lifespan=lifespan,
-)
 
-# CORS middleware - origins configurable via CORS_ORIGINS env var
-logger.info(f"CORS origins: {settings.cors_origins}")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def create_app(database: Database | None = None, tenants: TenantRegistry | None = None) -> FastAPI:
+    """Build the application.
+
+    The database is opened by the lifespan, not here, so building (and
+    importing) the app does no filesystem work. Pass ``database`` to serve
+    an existing instance instead of one at ``settings.db_path``, or
+    ``tenants`` to serve one database per tenant (the default when
+    ``TENANT_MODE`` is set).
+    """
+    configure_logging(settings.log_level, settings.log_format, settings.log_levels)
+    if tenants is None and database is None and settings.tenant_mode:
+        tenants = TenantRegistry(settings.tenants_dir, settings.max_open_tenants, settings.tenants)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Application lifespan manager."""
+        # Startup
+        settings.data_dir.mkdir(parents=True, exist_ok=True)
+        if tenants is not None:
+            tenants.directory.mkdir(parents=True, exist_ok=True)
+            app.state.tenants = tenants
+            logger.info("Multi-tenant mode: serving %s (up to %s open)", tenants.directory, tenants.max_open)
+            scheduled = None
+            if settings.backup_interval > 0:
+                scheduled = asyncio.create_task(tenants.run_backups_periodically(settings.backup_interval))
+            yield
+            if scheduled is not None:
+                scheduled.cancel()
+                with suppress(asyncio.CancelledError):
+                    await scheduled
+            await tenants.close()
+            shutdown_logging()
+            return
+
+        db = database or Database()
+        app.state.db = db
+        failed = [name for name, ok in db.check_storage().items() if not ok]
+        if failed:
+            logger.error("Database storage checks failed: %s", ", ".join(failed))
+        dispatcher = app.state.dispatcher = NotificationDispatcher()
+        await dispatcher.start(outbox=db)
+        backups = app.state.backups = BackupManager(settings.backup_dir)
+        scheduled = None
+        if settings.backup_interval > 0:
+            scheduled = asyncio.create_task(backups.run_periodically(db, settings.backup_interval))
+        yield
+        # Shutdown
+        if scheduled is not None:
+            scheduled.cancel()
+            with suppress(asyncio.CancelledError):
+                await scheduled
+        await dispatcher.stop()
+        try:
+            db.close()
+        except Exception as e:
+            logger.error("Error closing database: %s", e)
+        shutdown_logging()
+
+    app = FastAPI(
+        title="Whiskey Tasting API",
+        description="Whiskey tasting management and scoring system",
+        version=__version__,
+        lifespan=lifespan,
+    )
 
-# Include routers
-app.include_router(health_router, prefix="/api/v1")
-app.include_router(config_router, prefix="/api/v1")
-app.include_router(tastings_router, prefix="/api/v1")
-app.include_router(themes_router, prefix="/api/v1")
-app.include_router(users_router, prefix="/api/v1")
-app.include_router(whiskeys_router, prefix="/api/v1")
-
-
-@app.get("/")
-async def root():
-    """Root endpoint."""
-    return {
-        "name": "Whiskey Tasting API",
-        "version": __version__,
-        "docs": "/docs",
-    }
+    # Score and list responses are repetitive JSON (or MessagePack) that
+    # compresses about 9x; small responses are not worth the CPU
+    if settings.gzip_min_size > 0:
+        app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_min_size)
+
+    # CORS middleware - origins configurable via CORS_ORIGINS env var
+    logger.info("CORS origins: %s", settings.cors_origins)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    if tenants is not None:
+        # Outermost, so everything inside sees the path without /t/<tenant>
+        app.add_middleware(TenantMiddleware)
+
+    # Include routers
+    app.include_router(metrics_router)
+    app.include_router(health_router, prefix="/api/v1")
+    app.include_router(config_router, prefix="/api/v1")
+    app.include_router(tastings_router, prefix="/api/v1")
+    app.include_router(themes_router, prefix="/api/v1")
+    app.include_router(users_router, prefix="/api/v1")
+    app.include_router(whiskeys_router, prefix="/api/v1")
+    app.include_router(admin_router, prefix="/api/v1")
+
+    @app.get("/")
+    async def root():
+        """Root endpoint."""
+        return {
+            "name": "Whiskey Tasting API",
+            "version": __version__,
+            "docs": "/docs",
+        }
+
+    return app
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+"""tracemalloc-based memory report for storage loads and heavy endpoints."""
+
+import gc
+import json
+import linecache
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from fastapi.encoders import jsonable_encoder
+
+from app.database import Database
+from app.routers import tastings
+
+
+@dataclass
+class MemoryUsage:
+    """Allocations made by one measured operation.
+
+    ``peak_bytes`` is the high-water mark while it ran; ``retained_bytes``
+    is what was still allocated afterwards while its result was alive (for
+    a storage load, the parsed database itself).
+    """
+
+    name: str
+    peak_bytes: int
+    retained_bytes: int
+    top: list[dict[str, Any]] = field(default_factory=list)
+
+
+async def measure(name: str, func: Callable[[], Awaitable[Any]], top: int = 5) -> MemoryUsage:
+    """Run ``func`` under tracemalloc and report its peak and retained allocations.
+
+    The ``top`` allocation sites still holding memory afterwards are included
+    so a large retained figure can be traced to the line that caused it.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+        result = await func()
+
+        current, peak = tracemalloc.get_traced_memory()
+        # Ignore the snapshots' own bookkeeping
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        before = before.filter_traces(ignore)
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+        sites = [
+            {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "size_bytes": stat.size_diff}
+            for stat in after.compare_to(before, "lineno")[:top]
+            if stat.size_diff > 0
+        ]
+        del result
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+        linecache.clearcache()
+    return MemoryUsage(name=name, peak_bytes=peak - baseline, retained_bytes=current - baseline, top=sites)
+
+
+def max_rss_bytes() -> int | None:
+    """Peak resident set size of this process, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _render(result: Any) -> bytes:
+    """Serialise an endpoint result the way the JSON response would."""
+    return json.dumps(jsonable_encoder(result), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+async def memory_report(
+    database: Database,
+    theme_id: int | None = None,
+    include_all_themes: bool = True,
+) -> list[MemoryUsage]:
+    """Measure loading the database and building the heavy score responses.
+
+    ``theme_id`` selects the theme for the single-theme scoreboard; the
+    active theme is used when omitted. The all-themes scoreboard is slow on
+    large databases and can be left out with ``include_all_themes``.
+    """
+    if theme_id is None:
+        active = database.get_active_theme()
+        theme_id = active["id"] if active else None
+
+    async def load() -> Any:
+        return database.db.storage.read()
+
+    async def theme_scores() -> Any:
+        result = await tastings.get_theme_scores(theme_id, database)
+        return result, _render(result)
+
+    async def all_themes_scores() -> Any:
+        result = await tastings.get_all_themes_scores(database)
+        return result, _render(result)
+
+    usages = [await measure("load_database", load)]
+    if theme_id is not None:
+        usages.append(await measure("get_theme_scores", theme_scores))
+    if include_all_themes:
+        usages.append(await measure("get_all_themes_scores", all_themes_scores))
+    return usages
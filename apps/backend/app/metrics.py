@@ -0,0 +1,260 @@
+"""In-process metrics exposed in Prometheus text format."""
+
+import threading
+import time
+from typing import Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    """Base class for a metric family with optional labels."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._series: dict[tuple[str, ...], tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._series[key] = (counts, total + value)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series[0][-1] if series else 0
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        inf = 'le="+Inf"'
+        for key, (counts, total) in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {counts[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# HTTP metrics
+http_requests_total = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.",
+    ("method", "route", "status"),
+))
+http_request_duration_seconds = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template.",
+    ("method", "route"),
+))
+http_requests_in_flight = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed.",
+    ("method",),
+))
+
+# Database metrics
+db_file_reads_total = REGISTRY.register(Counter(
+    "db_file_reads_total", "Full reads and parses of the database file.",
+))
+db_file_writes_total = REGISTRY.register(Counter(
+    "db_file_writes_total", "Full rewrites of the database file.",
+))
+db_bytes_written_total = REGISTRY.register(Counter(
+    "db_bytes_written_total", "Bytes written to the database file.",
+))
+db_commit_seconds = REGISTRY.register(Histogram(
+    "db_commit_seconds", "Time to write and rename the database file, by durability mode.",
+    ("durability",),
+))
+db_writes_coalesced_total = REGISTRY.register(Counter(
+    "db_writes_coalesced_total", "Writes superseded in memory by a later one before a group commit.",
+))
+db_table_scans_total = REGISTRY.register(Counter(
+    "db_table_scans_total", "Full-table loads (uncached searches, listings and counts) per table.",
+    ("table",),
+))
+
+# Archive metrics
+archived_themes_total = REGISTRY.register(Counter(
+    "archived_themes_total", "Themes whose tastings were moved to archive files.",
+))
+archive_loads_total = REGISTRY.register(Counter(
+    "archive_loads_total", "Archive files read because an archived theme was queried.",
+))
+
+# Backup metrics
+backups_total = REGISTRY.register(Counter(
+    "backups_total", "Backups written, by kind (full or delta).",
+    ("kind",),
+))
+backup_failures_total = REGISTRY.register(Counter(
+    "backup_failures_total", "Backups that failed.",
+))
+backup_last_success_timestamp_seconds = REGISTRY.register(Gauge(
+    "backup_last_success_timestamp_seconds", "Unix time of the last successful backup.",
+))
+
+# Multi-tenant metrics
+tenants_open = REGISTRY.register(Gauge(
+    "tenants_open", "Tenant databases currently open.",
+))
+tenant_evictions_total = REGISTRY.register(Counter(
+    "tenant_evictions_total", "Idle tenant databases closed to stay within MAX_OPEN_TENANTS.",
+))
+
+
+# Sharded layout metrics
+db_shards_open = REGISTRY.register(Gauge(
+    "db_shards_open", "Theme shard files currently open (DB_LAYOUT=sharded).",
+))
+db_shard_evictions_total = REGISTRY.register(Counter(
+    "db_shard_evictions_total", "Idle theme shards closed to stay within DB_OPEN_SHARDS.",
+))
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that handled a request, or ``unmatched``.
+
+    Newer FastAPI versions keep included routes un-prefixed and record the
+    full path on an effective route context; older ones prefix the route.
+    """
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests.
+
+    Requests are labelled with the matched route template (for example
+    ``/api/v1/themes/{theme_id}``) rather than the raw path, so label
+    cardinality stays bounded; unmatched paths share one ``unmatched`` label.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            http_requests_in_flight.dec(method=method)
+            template = route_template(scope)
+            http_requests_total.inc(method=method, route=template, status=str(status))
+            http_request_duration_seconds.observe(duration, method=method, route=template)
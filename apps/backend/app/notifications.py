@@ -1,34 +1,360 @@
-"""Notification utilities using ntfy."""
-import logging
-from typing import Optional
+"""Notification utilities using ntfy.
 
-import requests
+``requests`` is imported on first delivery rather than at import time, so
+startup and deployments without ntfy never pay for it.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
 
 from app.config import settings
 
+if TYPE_CHECKING:
+    import requests
+
+    from app.database import Database
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_TITLE = "Whiskey Tasting Notification"
 
-def send_notification(message: str, title: Optional[str] = None, priority: Optional[str] = None) -> None:
-    """Send a notification via ntfy."""
-    logger.info(f"NTFY Debug - URL: '{settings.ntfy_url}', Topic: '{settings.ntfy_topic}'")
-    if not settings.ntfy_url or not settings.ntfy_topic:
-        logger.info("Ntfy not configured, skipping notification")
-        return
+# ntfy priorities from lowest to highest
+PRIORITIES = ["min", "low", "default", "high", "urgent"]
+
+
+@dataclass(frozen=True)
+class Notification:
+    """A single ntfy message waiting to be delivered.
+
+    ``subject`` names the affected item (e.g. a theme name) so several
+    notifications can be summarised in one digest.
+    """
+
+    message: str
+    title: Optional[str] = None
+    priority: Optional[str] = None
+    subject: Optional[str] = None
+
+
+def build_digest(notifications: list[Notification]) -> Notification:
+    """Merge several notifications into one summary message.
+
+    Events are grouped by title with a count and the subjects they affected;
+    events without a subject are listed by their message. The digest takes
+    the highest priority of its events.
+    """
+    groups: dict[str, list[Notification]] = {}
+    for notification in notifications:
+        groups.setdefault(notification.title or DEFAULT_TITLE, []).append(notification)
+
+    lines = []
+    for title, items in groups.items():
+        subjects = [n.subject for n in items if n.subject]
+        line = f"{title}: {len(items)}"
+        if subjects:
+            line += f" ({', '.join(subjects)})"
+        lines.append(line)
+        lines.extend(f"- {n.message}" for n in items if not n.subject)
 
+    priorities = [n.priority for n in notifications if n.priority in PRIORITIES]
+    priority = max(priorities, key=PRIORITIES.index) if priorities else None
+
+    return Notification(
+        message="\n".join(lines),
+        title=f"Whiskey Tasting: {len(notifications)} events",
+        priority=priority,
+    )
+
+
+def deliver_notification(notification: Notification, session: Optional["requests.Session"] = None) -> None:
+    """POST a notification to ntfy, raising on failure.
+
+    Uses the pooled ``session`` when given so the dispatcher can reuse
+    keep-alive connections; falls back to a one-off request otherwise.
+    """
     url = f"{settings.ntfy_url}/{settings.ntfy_topic}"
 
-    headers = {"Title": title or "Whiskey Tasting Notification"}
-    if priority:
-        headers["Priority"] = priority
+    headers = {"Title": notification.title or DEFAULT_TITLE}
+    if notification.priority:
+        headers["Priority"] = notification.priority
 
     auth = None
     if settings.ntfy_auth_user and settings.ntfy_auth_pass:
         auth = (settings.ntfy_auth_user, settings.ntfy_auth_pass)
 
-    try:
-        response = requests.post(url, headers=headers, data=message.encode('utf-8'), auth=auth, timeout=10)
-        response.raise_for_status()
-        logger.info(f"Notification sent: {message}")
-    except requests.RequestException as e:
-        logger.error(f"Failed to send notification: {e}")
\ No newline at end of file
+    import requests
+
+    post = session.post if session is not None else requests.post
+    response = post(url, headers=headers, data=notification.message.encode('utf-8'), auth=auth, timeout=10)
+    response.raise_for_status()
+
+
+class NotificationDispatcher:
+    """Deliver notifications in the background so ntfy latency never reaches the API path.
+
+    When started with an ``outbox`` database, notifications are persisted to
+    its outbox table (inside the caller's transaction) and a drain task
+    delivers them in batches, removing entries only once ntfy accepted them.
+    Undelivered entries survive restarts and are retried, giving
+    at-least-once delivery. An entry that fails ``max_attempts`` rounds
+    (e.g. one ntfy keeps rejecting) is dropped with an error logged, so it
+    cannot hold back the entries behind it forever.
+
+    Without an outbox, notifications go through a bounded in-memory queue;
+    when it is full new notifications are dropped and counted rather than
+    blocking. Failed deliveries are retried with exponential backoff in
+    both modes.
+
+    With a ``coalesce_window`` (seconds), notifications arriving within the
+    window after the first one are merged into a single digest, so bulk
+    deletes cost one HTTP call per window instead of one per item.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        retry_interval: Optional[float] = None,
+        coalesce_window: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.coalesce_window = coalesce_window
+        self.max_attempts = max_attempts
+        self.dropped = 0
+        self._outbox: Optional["Database"] = None
+        self._wake: asyncio.Event | None = None
+        self._queue: asyncio.Queue[Notification] | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._session: "requests.Session | None" = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the background worker is accepting notifications."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self, outbox: Optional["Database"] = None) -> None:
+        """Start the background worker on the running event loop.
+
+        Pass ``outbox`` to persist notifications in that database and drain
+        any entries left undelivered by a previous run.
+        """
+        if self.running:
+            return
+        if self.max_queue_size is None:
+            self.max_queue_size = settings.ntfy_queue_size
+        if self.max_retries is None:
+            self.max_retries = settings.ntfy_max_retries
+        if self.backoff_base is None:
+            self.backoff_base = settings.ntfy_backoff_base
+        if self.backoff_max is None:
+            self.backoff_max = settings.ntfy_backoff_max
+        if self.batch_size is None:
+            self.batch_size = settings.ntfy_outbox_batch_size
+        if self.retry_interval is None:
+            self.retry_interval = settings.ntfy_outbox_retry_interval
+        if self.coalesce_window is None:
+            self.coalesce_window = settings.ntfy_coalesce_window
+        if self.max_attempts is None:
+            self.max_attempts = settings.ntfy_outbox_max_attempts
+
+        self._loop = asyncio.get_running_loop()
+        self._outbox = outbox
+        if outbox is not None:
+            self._wake = asyncio.Event()
+            self._task = self._loop.create_task(self._drain_outbox())
+        else:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Flush pending notifications (up to ``timeout``) and stop the worker.
+
+        Outbox entries that are still undelivered stay persisted for the
+        next start.
+        """
+        if self._task is None:
+            return
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Dropping %s undelivered notifications on shutdown", self._queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+        self._wake = None
+        self._outbox = None
+        self._loop = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _http_session(self) -> "requests.Session":
+        """Pooled keep-alive session, created on the first delivery."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        return self._session
+
+    def submit(self, notification: Notification) -> bool:
+        """Queue a notification for delivery without blocking.
+
+        With an outbox the notification is written to it (joining any open
+        ``Database.transaction()``) and the drain task is woken. Otherwise
+        returns False if the notification was dropped because the in-memory
+        queue is full. Raises RuntimeError unless the dispatcher was started:
+        each app starts one in its lifespan (see ``app.dependencies``).
+        """
+        if not self.running:
+            raise RuntimeError("Notification dispatcher is not running")
+
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+
+        if self._outbox is not None:
+            self._outbox.enqueue_notification(
+                notification.message, notification.title, notification.priority, notification.subject
+            )
+            if in_loop:
+                self._wake.set()
+            else:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            return True
+
+        if not in_loop:
+            self._loop.call_soon_threadsafe(self._enqueue, notification)
+            return True
+        return self._enqueue(notification)
+
+    def _enqueue(self, notification: Notification) -> bool:
+        try:
+            self._queue.put_nowait(notification)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Notification queue full, dropping notification: %s", notification.message)
+            return False
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                if self.coalesce_window > 0:
+                    await asyncio.sleep(self.coalesce_window)
+                    while not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                notification = build_digest(batch) if len(batch) > 1 else batch[0]
+                await self._deliver_with_retry(notification)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _drain_outbox(self) -> None:
+        while True:
+            self._wake.clear()
+            batch = self._outbox.pending_notifications(self.batch_size)
+            delivered, failed = await self._deliver_entries(batch)
+            self._outbox.ack_notifications(delivered)
+            dropped = self._record_failures(failed)
+
+            if batch and (len(delivered) == len(batch) or dropped):
+                continue  # there may be more pending entries
+            # Nothing pending: sleep until woken. Delivery failing: retry later.
+            timeout = self.retry_interval if batch else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                continue
+            if self.coalesce_window > 0:
+                # Let the rest of a bulk operation land in the outbox first
+                await asyncio.sleep(self.coalesce_window)
+
+    def _record_failures(self, entries: list[dict]) -> bool:
+        """Count a failed round against ``entries``, dropping those out of attempts; True if any were."""
+        dead = [entry.doc_id for entry in entries if entry.get("attempts", 0) + 1 >= self.max_attempts]
+        for entry in entries:
+            if entry.doc_id in dead:
+                logger.error(
+                    "Dropping notification after %s failed delivery rounds: %s", self.max_attempts, entry["message"]
+                )
+        self.dropped += len(dead)
+        self._outbox.ack_notifications(dead)
+        self._outbox.record_failed_notifications([entry.doc_id for entry in entries if entry.doc_id not in dead])
+        return bool(dead)
+
+    async def _deliver_entries(self, entries: list[dict]) -> tuple[list[int], list[dict]]:
+        """Deliver outbox entries in order.
+
+        Returns the ids ntfy accepted and the entries it did not; entries
+        after a failed one are left untried for the next round.
+        """
+        notifications = [
+            Notification(entry["message"], entry.get("title"), entry.get("priority"), entry.get("subject"))
+            for entry in entries
+        ]
+        if self.coalesce_window > 0 and len(notifications) > 1:
+            if await self._deliver_with_retry(build_digest(notifications)):
+                return [entry.doc_id for entry in entries], []
+            return [], entries
+
+        delivered = []
+        for entry, notification in zip(entries, notifications):
+            if not await self._deliver_with_retry(notification):
+                return delivered, [entry]
+            delivered.append(entry.doc_id)
+        return delivered, []
+
+    async def _deliver_with_retry(self, notification: Notification) -> bool:
+        import requests
+
+        session = self._http_session()
+        for attempt in range(self.max_retries + 1):
+            try:
+                await asyncio.to_thread(deliver_notification, notification, session)
+                logger.info("Notification sent: %s", notification.message)
+                return True
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    logger.error("Failed to send notification after %s attempts: %s", attempt + 1, e)
+                    return False
+                delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+                logger.warning("Notification delivery failed (%s), retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+
+
+def send_notification(
+    message: str,
+    title: Optional[str] = None,
+    priority: Optional[str] = None,
+    subject: Optional[str] = None,
+    *,
+    dispatcher: NotificationDispatcher,
+) -> None:
+    """Queue a notification via ntfy on the app's ``dispatcher``, if ntfy is configured."""
+    if not settings.ntfy_url or not settings.ntfy_topic:
+        logger.debug("Ntfy not configured, skipping notification")
+        return
+
+    dispatcher.submit(Notification(message=message, title=title, priority=priority, subject=subject))
@@ -0,0 +1,109 @@
+"""Opt-in per-request profiling for diagnosing slow endpoints in production."""
+
+import cProfile
+import hmac
+import logging
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+# The admin endpoints take the same token as their credential; profiling them
+# would crowd real profiles out and skew the memory report
+UNPROFILED_PREFIX = "/api/v1/admin/"
+
+
+def profiles_dir() -> Path:
+    """Directory where profiles are saved."""
+    return settings.data_dir / "profiles"
+
+
+def _requested_token(scope: Scope) -> str | None:
+    # Header only: a query parameter would write the token into access logs
+    for name, value in scope.get("headers", []):
+        if name.decode("latin-1") == PROFILE_HEADER:
+            return value.decode("latin-1")
+    return None
+
+
+def token_matches(token: str | None) -> bool:
+    """Whether ``token`` is the configured profiling token (never true when unset)."""
+    if not settings.profiling_token or token is None:
+        return False
+    return hmac.compare_digest(token, settings.profiling_token)
+
+
+def prune_profiles(directory: Path, keep: int) -> None:
+    """Delete all but the newest ``keep`` profiles in ``directory``."""
+    profiles = sorted(directory.glob("*.pstats"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in profiles[keep:]:
+        old.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Run a request under cProfile when it carries the admin profiling token.
+
+    Enabled only when ``PROFILING_TOKEN`` is set. A request opts in with an
+    ``X-Profile: <token>`` header; the pstats dump is saved under ``data_dir/profiles/`` (oldest files beyond
+    ``PROFILE_RETENTION`` are deleted) and its file name is returned in the
+    ``X-Profile-File`` response header. Inspect it with
+    ``python -m pstats <file>`` or snakeviz.
+
+    Only one request is profiled at a time; other coroutines running on the
+    event loop while it awaits are included in its profile. Admin endpoints
+    are never profiled.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiled = scope["type"] == "http" and settings.profiling_token and not scope["path"].startswith(UNPROFILED_PREFIX)
+        token = _requested_token(scope) if profiled else None
+        if not token_matches(token):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._lock.acquire(blocking=False):
+            logger.warning("Profiler busy, serving request without profiling")
+            await self.app(scope, receive, send)
+            return
+
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+        filename = f"{timestamp}-{scope['method']}-{slug}.pstats"
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-File", filename)
+            await send(message)
+
+        profiler = cProfile.Profile()
+        try:
+            try:
+                profiler.enable()
+            except ValueError as e:  # another profiler is already active
+                logger.warning("Could not start profiler: %s", e)
+                await self.app(scope, receive, send)
+                return
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+            directory = profiles_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(directory / filename)
+            prune_profiles(directory, settings.profile_retention)
+            logger.info("Saved profile of %s %s to %s", scope["method"], route_template(scope), filename)
+        finally:
+            self._lock.release()
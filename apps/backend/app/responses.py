@@ -0,0 +1,66 @@
+"""MessagePack responses for clients that ask for them with ``Accept``."""
+
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import Response
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+# OpenAPI entry for routes that can also answer in MessagePack
+MSGPACK_RESPONSES: dict[int | str, dict[str, Any]] = {200: {"content": {"application/msgpack": {}}}}
+
+
+def _quality(accept: str) -> dict[str, float]:
+    qualities = {}
+    for item in accept.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        qualities[media_type.lower()] = q
+    return qualities
+
+
+def prefers_msgpack(accept: str | None) -> bool:
+    """Whether an ``Accept`` header ranks MessagePack above JSON.
+
+    Ties go to JSON, so browsers and clients sending ``*/*`` keep getting
+    JSON; only an explicit MessagePack preference switches the format.
+    """
+    if not accept:
+        return False
+    qualities = _quality(accept)
+    msgpack_q = max((qualities.get(t, 0.0) for t in MSGPACK_MEDIA_TYPES), default=0.0)
+    json_q = max(qualities.get("application/json", 0.0), qualities.get("application/*", 0.0), qualities.get("*/*", 0.0))
+    return msgpack_q > json_q
+
+
+def _plain(content: Any) -> Any:
+    if isinstance(content, BaseModel):
+        return content.model_dump(mode="json")
+    if isinstance(content, list):
+        return [_plain(item) for item in content]
+    return jsonable_encoder(content)
+
+
+class MsgpackResponse(Response):
+    """Response rendering pydantic models and plain data as MessagePack."""
+
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        import msgpack
+
+        return msgpack.packb(_plain(content))
+
+
+def negotiated(content: Any, msgpack: bool) -> Any:
+    """``content`` as a MessagePack response when the client asked for it, else unchanged."""
+    if msgpack:
+        return MsgpackResponse(content, headers={"Vary": "Accept"})
+    return content
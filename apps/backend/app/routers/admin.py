@@ -0,0 +1,111 @@
+"""Admin diagnostics endpoints, gated by the profiling token."""
+
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Header, HTTPException, Query
+
+from app.backups import list_backups
+from app.dependencies import BackupsDep, DatabaseDep
+from app.profiling import token_matches
+from app.schemas.models import (
+    ApiResponse,
+    ArchiveListResponse,
+    ArchiveResponse,
+    BackupListResponse,
+    BackupResponse,
+    MemoryReportResponse,
+)
+
+router = APIRouter(tags=["Admin"])
+
+
+@router.get("/admin/memory", response_model=MemoryReportResponse)
+async def get_memory_report(
+    db: DatabaseDep,
+    theme_id: int | None = None,
+    include_all_themes: bool = True,
+    x_profile: str | None = Header(default=None),
+) -> MemoryReportResponse:
+    """Measure peak and retained allocations of a database load and the score endpoints.
+
+    Requires the ``X-Profile`` header to carry ``PROFILING_TOKEN``; answers
+    404 otherwise. Runs under tracemalloc on the event loop, so it blocks
+    other requests while it measures.
+    """
+    if not token_matches(x_profile):
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Diagnostics only: keep tracemalloc and its helpers out of startup
+    from app.memory import max_rss_bytes, memory_report
+
+    usages = await memory_report(db, theme_id=theme_id, include_all_themes=include_all_themes)
+    return MemoryReportResponse(
+        tastings=db.get_stats()["total_tastings"],
+        max_rss_bytes=max_rss_bytes(),
+        operations=[asdict(usage) for usage in usages],
+    )
+
+
+@router.post("/admin/backups", response_model=BackupResponse)
+async def create_backup(
+    db: DatabaseDep,
+    backups: BackupsDep,
+    full: bool = False,
+    x_profile: str | None = Header(default=None),
+) -> BackupResponse:
+    """Take an online backup: a delta against the previous one, or a full snapshot.
+
+    Requires the ``X-Profile`` header to carry ``PROFILING_TOKEN``. The
+    snapshot is taken between two database operations and processed in a
+    worker process, so requests keep being served meanwhile.
+    """
+    if not token_matches(x_profile):
+        raise HTTPException(status_code=404, detail="Not Found")
+    info = await backups.backup(db, full=full)
+    return BackupResponse(**asdict(info))
+
+
+@router.get("/admin/backups", response_model=BackupListResponse)
+async def get_backups(backups: BackupsDep, x_profile: str | None = Header(default=None)) -> BackupListResponse:
+    """List the backups kept on disk, oldest first."""
+    if not token_matches(x_profile):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return BackupListResponse(backups=[asdict(info) for info in list_backups(backups.directory)])
+
+
+@router.post("/admin/archive", response_model=ArchiveResponse)
+async def archive_themes(
+    db: DatabaseDep,
+    older_than_days: int = Query(..., ge=1),
+    x_profile: str | None = Header(default=None),
+) -> ArchiveResponse:
+    """Move the tastings of themes created more than ``older_than_days`` ago into archive files.
+
+    Archived themes keep answering every endpoint; their tastings are
+    loaded from the archive when asked for, and scoring one of them again
+    brings it back into the database file.
+    """
+    if not token_matches(x_profile):
+        raise HTTPException(status_code=404, detail="Not Found")
+    before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    return ArchiveResponse(archived=db.archive_themes(before))
+
+
+@router.get("/admin/archive", response_model=ArchiveListResponse)
+async def list_archived_themes(db: DatabaseDep, x_profile: str | None = Header(default=None)) -> ArchiveListResponse:
+    """List archived themes with their cached per-whiskey aggregates."""
+    if not token_matches(x_profile):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return ArchiveListResponse(themes=db.list_archives())
+
+
+@router.post("/admin/archive/{theme_id}/restore", response_model=ApiResponse)
+async def restore_archived_theme(
+    theme_id: int, db: DatabaseDep, x_profile: str | None = Header(default=None)
+) -> ApiResponse:
+    """Move an archived theme's tastings back into the database file."""
+    if not token_matches(x_profile):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not db.restore_theme(theme_id):
+        raise HTTPException(status_code=404, detail="Theme is not archived")
+    return ApiResponse(message="Theme restored")
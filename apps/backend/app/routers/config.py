@@ -1,45 +1,18 @@
 """Configuration endpoints for whiskey tasting app."""
 
-import json
-from pathlib import Path
-
 from fastapi import APIRouter, HTTPException
 
-from app.config import settings
+from app.config_store import config_store
 from app.schemas.models import (
     LanguageConfigRequest,
     LanguageConfigResponse,
     ResetDatabaseRequest,
 )
-from app.database import db
+from app.dependencies import DatabaseDep
 
 router = APIRouter(prefix="/config", tags=["Configuration"])
 
 
-def _get_config_path() -> Path:
-    """Get path to config storage file."""
-    return settings.data_dir / "config.json"
-
-
-def _load_config() -> dict:
-    """Load config from file."""
-    path = _get_config_path()
-    if path.exists():
-        return json.loads(path.read_text())
-    return {}
-
-
-def _save_config(config: dict) -> None:
-    """Save config to file."""
-    path = _get_config_path()
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(config, indent=2))
-
-
-
-
-
-
 # Supported languages for i18n
 SUPPORTED_LANGUAGES = ["en", "es", "zh", "ja"]
 
@@ -47,7 +20,7 @@ SUPPORTED_LANGUAGES = ["en", "es", "zh", "ja"]
 @router.get("/language", response_model=LanguageConfigResponse)
 async def get_language_config() -> LanguageConfigResponse:
     """Get current language configuration."""
-    stored = _load_config()
+    stored = config_store.get()
 
     # Support legacy single 'language' field migration
     legacy_language = stored.get("language", "en")
@@ -64,7 +37,7 @@ async def update_language_config(
     request: LanguageConfigRequest,
 ) -> LanguageConfigResponse:
     """Update language configuration."""
-    stored = _load_config()
+    changes = {}
 
     # Validate and update UI language
     if request.ui_language is not None:
@@ -73,7 +46,7 @@ async def update_language_config(
                 status_code=400,
                 detail=f"Unsupported UI language: {request.ui_language}. Supported: {SUPPORTED_LANGUAGES}",
             )
-        stored["ui_language"] = request.ui_language
+        changes["ui_language"] = request.ui_language
 
     # Validate and update content language
     if request.content_language is not None:
@@ -82,10 +55,10 @@ async def update_language_config(
                 status_code=400,
                 detail=f"Unsupported content language: {request.content_language}. Supported: {SUPPORTED_LANGUAGES}",
             )
-        stored["content_language"] = request.content_language
+        changes["content_language"] = request.content_language
 
     # Save config
-    _save_config(stored)
+    stored = config_store.update(changes)
 
     # Support legacy single 'language' field migration
     legacy_language = stored.get("language", "en")
@@ -100,7 +73,7 @@ async def update_language_config(
 
 
 @router.post("/reset")
-async def reset_database_endpoint(request: ResetDatabaseRequest) -> dict:
+async def reset_database_endpoint(request: ResetDatabaseRequest, db: DatabaseDep) -> dict:
     """Reset the database and clear all data.
 
     WARNING: This action is irreversible. It will:
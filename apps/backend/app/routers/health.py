@@ -1,35 +1,46 @@
 """Health check and status endpoints."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
-from app.database import db
+from app.dependencies import DatabaseDep, DispatcherDep
 from app.notifications import send_notification
-from app.schemas.models import ApiResponse, HealthResponse
+from app.schemas.models import ApiResponse, HealthResponse, ReadinessResponse
 
 router = APIRouter(tags=["Health"])
 
 
 @router.get("/health", response_model=HealthResponse)
+@router.get("/health/live", response_model=HealthResponse)
 async def health_check() -> HealthResponse:
-    """Basic health check endpoint."""
+    """Liveness probe: the process is up and serving requests.
+
+    Constant time; never touches the database.
+    """
+    return HealthResponse(status="healthy")
+
+
+@router.get("/health/ready", response_model=ReadinessResponse)
+async def readiness_check(response: Response, db: DatabaseDep) -> ReadinessResponse:
+    """Readiness probe: storage can be opened and written.
+
+    Checks permissions only, without reading or parsing the database.
+    """
     try:
-        # Check database connectivity
-        db_stats = db.get_stats()
-        return HealthResponse(
-            status="healthy",
-        )
+        checks = db.check_storage()
     except Exception:
-        return HealthResponse(
-            status="unhealthy",
-        )
+        checks = {"storage": False}
+    ready = all(checks.values())
+    if not ready:
+        response.status_code = 503
+    return ReadinessResponse(status="ready" if ready else "unavailable", checks=checks)
 
 
 @router.get("/status")
-async def get_status() -> dict:
+async def get_status(db: DatabaseDep) -> dict:
     """Get comprehensive application status.
 
     Returns:
-        - Database statistics
+        - Database statistics (cached counters, no full reads after startup)
         - Application readiness
     """
     try:
@@ -46,10 +57,13 @@ async def get_status() -> dict:
 
 
 @router.post("/test-notification", response_model=ApiResponse)
-async def test_notification(message: str = "Test notification from Whiskey Tasting API") -> ApiResponse:
+async def test_notification(
+    dispatcher: DispatcherDep,
+    message: str = "Test notification from Whiskey Tasting API",
+) -> ApiResponse:
     """Send a test notification (if NTFY is configured)."""
     try:
-        send_notification(message, title="Test Notification", priority="default")
+        send_notification(message, title="Test Notification", priority="default", dispatcher=dispatcher)
         return ApiResponse(message="Test notification sent (if configured)")
     except Exception as e:
         return ApiResponse(message=f"Failed to send test notification: {str(e)}")
@@ -1,10 +1,13 @@
 """Tasting management endpoints."""
 
+from array import array
 from typing import Any
 
 from fastapi import APIRouter, HTTPException
 
-from app.database import db
+from app.columns import TastingColumns
+from app.dependencies import DatabaseDep, WantsMsgpack
+from app.responses import MSGPACK_RESPONSES, negotiated
 from app.schemas.models import (
     ApiResponse,
     SubmitTastingRequest,
@@ -15,8 +18,23 @@ from app.schemas.models import (
 router = APIRouter()
 
 
+def _whiskey_scores(columns: TastingColumns, rows: array, user_names: dict[int, str]) -> list[dict[str, Any]]:
+    """Score entries of the tastings in ``rows``."""
+    return [
+        {
+            "user_name": user_names[columns.user_ids[row]],
+            "aroma_score": columns.aroma[row],
+            "flavor_score": columns.flavor[row],
+            "finish_score": columns.finish[row],
+            "average_score": columns.averages[row],
+            "personal_rank": columns.rank[row],
+        }
+        for row in rows
+    ]
+
+
 @router.post("/tastings", response_model=ApiResponse)
-async def submit_tasting(request: SubmitTastingRequest) -> ApiResponse:
+async def submit_tasting(request: SubmitTastingRequest, db: DatabaseDep) -> ApiResponse:
     """Submit tasting scores for a user."""
     try:
         # Get or create user
@@ -38,8 +56,8 @@ async def submit_tasting(request: SubmitTastingRequest) -> ApiResponse:
         raise HTTPException(status_code=500, detail=f"Failed to submit tasting: {str(e)}")
 
 
-@router.get("/tastings/themes/{theme_id}/scores", response_model=ThemeScoresResponse)
-async def get_theme_scores(theme_id: int) -> ThemeScoresResponse:
+@router.get("/tastings/themes/{theme_id}/scores", response_model=ThemeScoresResponse, responses=MSGPACK_RESPONSES)
+async def get_theme_scores(theme_id: int, db: DatabaseDep, msgpack: WantsMsgpack = False) -> ThemeScoresResponse:
     """Get all scores for a theme."""
     try:
         theme = db.get_theme(theme_id)
@@ -47,32 +65,17 @@ async def get_theme_scores(theme_id: int) -> ThemeScoresResponse:
             raise HTTPException(status_code=404, detail="Theme not found")
 
         whiskeys = db.get_whiskeys_by_theme(theme_id)
-        tastings = db.get_tastings_by_theme(theme_id)
-
-        # Group tastings by whiskey
-        whiskey_scores = {}
-        for tasting in tastings:
-            wid = tasting["whiskey_id"]
-            if wid not in whiskey_scores:
-                whiskey_scores[wid] = []
-            user = db.get_user(tasting["user_id"])
-            if user:
-                whiskey_scores[wid].append({
-                    "user_name": user["name"],
-                    "aroma_score": tasting["aroma_score"],
-                    "flavor_score": tasting["flavor_score"],
-                    "finish_score": tasting["finish_score"],
-                    "average_score": round((tasting["aroma_score"] + tasting["flavor_score"] + tasting["finish_score"]) / 3, 1),
-                    "personal_rank": tasting["personal_rank"],
-                })
+        columns = db.get_theme_columns(theme_id)
+        user_names = db.get_user_names()
 
         # Build response
         whiskeys_list = []
         for whiskey in whiskeys:
             wid = whiskey["id"]
-            scores = whiskey_scores.get(wid, [])
+            rows = columns.select(wid, user_names)
+            scores = _whiskey_scores(columns, rows, user_names)
             if scores:
-                avg_score = round(sum(s["average_score"] for s in scores) / len(scores), 1)
+                avg_score = columns.mean_average(rows)
                 rank_by_avg = sorted([w for w in whiskeys_list if w["scores"]], key=lambda x: x["average_score"], reverse=True)
                 rank = next((i+1 for i, w in enumerate(rank_by_avg) if w["whiskey_id"] == wid), len(rank_by_avg)+1)
             else:
@@ -91,7 +94,7 @@ async def get_theme_scores(theme_id: int) -> ThemeScoresResponse:
         # Sort whiskeys by average score descending
         whiskeys_list.sort(key=lambda x: x["average_score"], reverse=True)
 
-        return ThemeScoresResponse(
+        return negotiated(ThemeScoresResponse(
             theme={
                 "id": theme["id"],
                 "name": theme["name"],
@@ -99,51 +102,33 @@ async def get_theme_scores(theme_id: int) -> ThemeScoresResponse:
                 "created_at": theme["created_at"],
             },
             whiskeys=whiskeys_list,
-        )
+        ), msgpack)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get theme scores: {str(e)}")
 
 
-@router.get("/tastings/themes/scores", response_model=list[ThemeScoresResponse])
-async def get_all_themes_scores() -> list[ThemeScoresResponse]:
+@router.get("/tastings/themes/scores", response_model=list[ThemeScoresResponse], responses=MSGPACK_RESPONSES)
+async def get_all_themes_scores(db: DatabaseDep, msgpack: WantsMsgpack = False) -> list[ThemeScoresResponse]:
     """Get scores for all themes."""
     try:
         themes = db.list_themes()
+        user_names = db.get_user_names()
         results = []
         for theme in themes:
             # Reuse the logic from get_theme_scores
             theme_id = theme["id"]
             whiskeys = db.get_whiskeys_by_theme(theme_id)
-            tastings = db.get_tastings_by_theme(theme_id)
-
-            # Group tastings by whiskey
-            whiskey_scores = {}
-            for tasting in tastings:
-                wid = tasting["whiskey_id"]
-                if wid not in whiskey_scores:
-                    whiskey_scores[wid] = []
-                user = db.get_user(tasting["user_id"])
-                if user:
-                    whiskey_scores[wid].append({
-                        "user_name": user["name"],
-                        "aroma_score": tasting["aroma_score"],
-                        "flavor_score": tasting["flavor_score"],
-                        "finish_score": tasting["finish_score"],
-                        "average_score": round((tasting["aroma_score"] + tasting["flavor_score"] + tasting["finish_score"]) / 3, 1),
-                        "personal_rank": tasting["personal_rank"],
-                    })
+            columns = db.get_theme_columns(theme_id)
 
             # Build response
             whiskeys_list = []
             for whiskey in whiskeys:
                 wid = whiskey["id"]
-                scores = whiskey_scores.get(wid, [])
-                if scores:
-                    avg_score = round(sum(s["average_score"] for s in scores) / len(scores), 1)
-                else:
-                    avg_score = 0.0
+                rows = columns.select(wid, user_names)
+                scores = _whiskey_scores(columns, rows, user_names)
+                avg_score = columns.mean_average(rows)
 
                 whiskeys_list.append({
                     "whiskey_id": wid,
@@ -167,13 +152,13 @@ async def get_all_themes_scores() -> list[ThemeScoresResponse]:
                 whiskeys=whiskeys_list,
             ))
 
-        return results
+        return negotiated(results, msgpack)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get all themes scores: {str(e)}")
 
 
 @router.get("/tastings/users/{user_name}/themes/{theme_id}", response_model=UserTastingsResponse)
-async def get_user_tastings_for_theme(user_name: str, theme_id: int) -> UserTastingsResponse:
+async def get_user_tastings_for_theme(user_name: str, theme_id: int, db: DatabaseDep) -> UserTastingsResponse:
     """Get a user's tastings for a specific theme."""
     try:
         theme = db.get_theme(theme_id)
@@ -5,8 +5,9 @@ from typing import Any
 
 from fastapi import APIRouter, HTTPException
 
-from app.database import db
+from app.dependencies import DatabaseDep, DispatcherDep, WantsMsgpack
 from app.notifications import send_notification
+from app.responses import MSGPACK_RESPONSES, negotiated
 from app.schemas.models import (
     ApiResponse,
     CreateThemeRequest,
@@ -22,47 +23,45 @@ router = APIRouter()
 
 
 @router.post("/themes", response_model=ThemeCreateResponse)
-async def create_theme(request: CreateThemeRequest) -> ThemeCreateResponse:
+async def create_theme(request: CreateThemeRequest, db: DatabaseDep) -> ThemeCreateResponse:
     """Create a new tasting theme."""
-    logger.info(f"Received theme creation request: {request.model_dump()}")
+    logger.debug("Received theme creation request: name=%r num_whiskeys=%s", request.name, request.num_whiskeys)
     try:
         theme = db.create_theme(
             name=request.name,
             notes=request.notes,
         )
-        logger.info(f"Theme created: {theme}")
         # Create placeholder whiskeys
         for i in range(1, request.num_whiskeys + 1):
-            logger.info(f"Creating whiskey {i} for theme {theme['id']}")
             db.create_whiskey(
                 theme_id=theme["id"],
                 name=f"Whiskey {i}",
                 proof=None,
             )
-        logger.info(f"Theme creation completed successfully")
+        logger.info("Theme %s created with %s whiskeys", theme["id"], request.num_whiskeys)
         return ThemeCreateResponse(
             message="Theme created successfully",
             theme=ThemeResponse(**theme),
         )
     except Exception as e:
-        logger.error(f"Failed to create theme: {str(e)}", exc_info=True)
+        logger.error("Failed to create theme: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to create theme: {str(e)}")
 
 
-@router.get("/themes", response_model=ThemeListResponse)
-async def list_themes() -> ThemeListResponse:
+@router.get("/themes", response_model=ThemeListResponse, responses=MSGPACK_RESPONSES)
+async def list_themes(db: DatabaseDep, msgpack: WantsMsgpack = False) -> ThemeListResponse:
     """List all themes."""
     try:
         themes = db.list_themes()
-        return ThemeListResponse(
+        return negotiated(ThemeListResponse(
             themes=[ThemeResponse(**theme) for theme in themes]
-        )
+        ), msgpack)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list themes: {str(e)}")
 
 
 @router.get("/themes/active", response_model=ThemeResponse | None)
-async def get_active_theme() -> ThemeResponse | None:
+async def get_active_theme(db: DatabaseDep) -> ThemeResponse | None:
     """Get the active theme."""
     try:
         theme = db.get_active_theme()
@@ -72,7 +71,7 @@ async def get_active_theme() -> ThemeResponse | None:
 
 
 @router.put("/themes/{theme_id}/active")
-async def set_active_theme(theme_id: str) -> ApiResponse:
+async def set_active_theme(theme_id: str, db: DatabaseDep) -> ApiResponse:
     """Set a theme as active."""
     try:
         success = db.set_active_theme(int(theme_id))
@@ -86,7 +85,7 @@ async def set_active_theme(theme_id: str) -> ApiResponse:
 
 
 @router.put("/themes/{theme_id}", response_model=ThemeResponse)
-async def update_theme(theme_id: str, request: ThemeUpdateRequest) -> ThemeResponse:
+async def update_theme(theme_id: str, request: ThemeUpdateRequest, db: DatabaseDep) -> ThemeResponse:
     """Update a theme."""
     try:
         updates = request.model_dump(exclude_unset=True)
@@ -101,7 +100,7 @@ async def update_theme(theme_id: str, request: ThemeUpdateRequest) -> ThemeRespo
 
 
 @router.delete("/themes/{theme_id}")
-async def delete_theme(theme_id: str) -> ApiResponse:
+async def delete_theme(theme_id: str, db: DatabaseDep, dispatcher: DispatcherDep) -> ApiResponse:
     """Delete a theme."""
     try:
         # Get theme info before deletion for notification
@@ -109,16 +108,19 @@ async def delete_theme(theme_id: str) -> ApiResponse:
         if not theme:
             raise HTTPException(status_code=404, detail="Theme not found")
 
-        success = db.delete_theme(int(theme_id))
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete theme")
-
-        # Send notification about theme deletion
-        send_notification(
-            f"Theme '{theme['name']}' (ID: {theme_id}) has been deleted",
-            title="Theme Deleted",
-            priority="default"
-        )
+        # Delete and queue the notification in one commit
+        with db.transaction():
+            success = db.delete_theme(int(theme_id))
+            if not success:
+                raise HTTPException(status_code=500, detail="Failed to delete theme")
+
+            send_notification(
+                f"Theme '{theme['name']}' (ID: {theme_id}) has been deleted",
+                title="Theme Deleted",
+                priority="default",
+                subject=theme['name'],
+                dispatcher=dispatcher,
+            )
 
         return ApiResponse(message="Theme deleted successfully")
     except HTTPException:
@@ -4,7 +4,7 @@ from typing import Any
 
 from fastapi import APIRouter, HTTPException
 
-from app.database import db
+from app.dependencies import DatabaseDep
 from app.schemas.models import (
     ApiResponse,
     UpdateWhiskeysRequest,
@@ -15,7 +15,7 @@ router = APIRouter()
 
 
 @router.get("/themes/{theme_id}/whiskeys", response_model=list[Whiskey])
-async def get_whiskeys_by_theme(theme_id: int) -> list[Whiskey]:
+async def get_whiskeys_by_theme(theme_id: int, db: DatabaseDep) -> list[Whiskey]:
     """Get all whiskeys for a theme."""
     try:
         whiskeys = db.get_whiskeys_by_theme(theme_id)
@@ -25,7 +25,7 @@ async def get_whiskeys_by_theme(theme_id: int) -> list[Whiskey]:
 
 
 @router.put("/themes/{theme_id}/whiskeys", response_model=ApiResponse)
-async def update_whiskeys(theme_id: int, request: UpdateWhiskeysRequest) -> ApiResponse:
+async def update_whiskeys(theme_id: int, request: UpdateWhiskeysRequest, db: DatabaseDep) -> ApiResponse:
     """Update whiskeys for a theme."""
     try:
         # First, delete existing whiskeys for the theme
@@ -133,6 +133,76 @@ class HealthResponse(BaseModel):
     status: str
 
 
+class ReadinessResponse(BaseModel):
+    """Readiness probe response with the result of each check."""
+
+    status: str
+    checks: dict[str, bool]
+
+
+class MemoryUsageResponse(BaseModel):
+    """Peak and retained allocations of one measured operation."""
+
+    name: str
+    peak_bytes: int
+    retained_bytes: int
+    top: list[dict[str, Any]]
+
+
+class MemoryReportResponse(BaseModel):
+    """tracemalloc report for storage loads and heavy endpoints."""
+
+    tastings: int
+    max_rss_bytes: int | None
+    operations: list[MemoryUsageResponse]
+
+
+class ArchivedWhiskeyStats(BaseModel):
+    """Aggregates of one whiskey of an archived theme."""
+
+    tastings: int
+    average_score: float
+
+
+class ArchivedThemeResponse(BaseModel):
+    """An archived theme: where its tastings are and their cached aggregates."""
+
+    theme_id: int
+    file: str
+    archived_at: str
+    tastings: int
+    user_ids: list[int]
+    whiskeys: dict[str, ArchivedWhiskeyStats] = {}
+
+
+class ArchiveListResponse(BaseModel):
+    """Archived themes."""
+
+    themes: list[ArchivedThemeResponse]
+
+
+class ArchiveResponse(BaseModel):
+    """Themes archived by one run."""
+
+    archived: list[int]
+
+
+class BackupResponse(BaseModel):
+    """One backup file; ``documents`` and ``seconds`` are set when it was just taken."""
+
+    name: str
+    kind: str
+    size_bytes: int
+    documents: int = 0
+    seconds: float = 0.0
+
+
+class BackupListResponse(BaseModel):
+    """Backups on disk, oldest first."""
+
+    backups: list[BackupResponse]
+
+
 # API Response Models
 class ApiResponse(BaseModel):
     """Generic API response."""
@@ -0,0 +1,233 @@
+"""Sharded database layout: a small catalog file plus one shard file per theme.
+
+The catalog (``database.json``) keeps users, themes, the outbox and a
+``whiskey_index`` table mapping every whiskey id to its theme. Each
+theme's whiskeys and tastings live in ``database.shards/theme-<id>.json``,
+so a submission rewrites that theme's data only.
+
+Snapshots and backups see a sharded database as a single state in which
+the shard tables are named ``theme-<id>/whiskeys`` and
+``theme-<id>/tastings``; ``split_state`` and ``flatten_state`` turn such a
+state (or a single-file one) into either layout.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, BinaryIO, Callable
+
+from tinydb.storages import Storage
+
+from app.archive import archive_table, decode_archive
+from app.storage import decode_state
+
+SHARD_TABLES = ("whiskeys", "tastings")
+WHISKEY_INDEX = "whiskey_index"
+_SHARD_TABLE = re.compile(r"theme-(\d+)/(whiskeys|tastings)")
+_SHARD_FILE = re.compile(r"theme-(\d+)\.json")
+# Starts a framed snapshot: a JSON header line of blob sizes, then the blobs
+SNAPSHOT_MAGIC = b"WT-SHARDS/1\n"
+
+State = dict[str, Any]
+
+
+def shard_dir(db_path: Path) -> Path:
+    """Directory of the shard files of the catalog at ``db_path``."""
+    return db_path.with_name(f"{db_path.stem}.shards")
+
+
+def shard_name(theme_id: int) -> str:
+    """File name of a theme's shard."""
+    return f"theme-{theme_id}.json"
+
+
+def shard_files(db_path: Path) -> dict[int, Path]:
+    """Shard files next to the catalog at ``db_path``, by theme id."""
+    directory = shard_dir(db_path)
+    if not directory.is_dir():
+        return {}
+    files = {}
+    for path in directory.iterdir():
+        match = _SHARD_FILE.fullmatch(path.name)
+        if match:
+            files[int(match.group(1))] = path
+    return files
+
+
+def merge_state(catalog: State, shards: dict[int, State]) -> State:
+    """One state holding the catalog's tables and every shard's under prefixed names."""
+    state = dict(catalog)
+    for theme_id, shard in sorted(shards.items()):
+        for table, documents in shard.items():
+            state[f"theme-{theme_id}/{table}"] = documents
+    return state
+
+
+def has_shards(state: State) -> bool:
+    """Whether ``state`` is a merged state of a sharded database."""
+    return WHISKEY_INDEX in state or any(_SHARD_TABLE.fullmatch(table) for table in state)
+
+
+def split_state(state: State) -> tuple[State, dict[int, State]]:
+    """Catalog and per-theme shard states of a merged state or a single-file one.
+
+    Whiskeys and tastings of a single-file state go to their theme's shard
+    and the whiskey index is built; whiskeys of deleted themes and
+    tastings of deleted whiskeys are left out.
+    """
+    catalog: State = {}
+    shards: dict[int, State] = {}
+    for table, documents in state.items():
+        match = _SHARD_TABLE.fullmatch(table)
+        if match:
+            shards.setdefault(int(match.group(1)), {})[match.group(2)] = documents
+        elif table not in SHARD_TABLES:
+            catalog[table] = documents
+
+    if "whiskeys" in state:
+        themes = {theme["id"] for theme in state.get("themes", {}).values()}
+        theme_of: dict[int, int] = {}
+        for doc_id, whiskey in state["whiskeys"].items():
+            if whiskey["theme_id"] not in themes:
+                continue
+            theme_of[int(doc_id)] = whiskey["theme_id"]
+            shards.setdefault(whiskey["theme_id"], {}).setdefault("whiskeys", {})[doc_id] = whiskey
+        for doc_id, tasting in state.get("tastings", {}).items():
+            theme_id = theme_of.get(tasting["whiskey_id"])
+            if theme_id is not None:
+                shards[theme_id].setdefault("tastings", {})[doc_id] = tasting
+        index = catalog.setdefault(WHISKEY_INDEX, {})
+        index.update({str(whiskey_id): {"id": whiskey_id, "theme_id": t} for whiskey_id, t in theme_of.items()})
+    return catalog, shards
+
+
+def flatten_state(state: State) -> State:
+    """Single-file state of a merged one: shard tables joined, the whiskey index dropped.
+
+    Tasting ids are only unique within a shard, so colliding ones are
+    renumbered after the highest id in use.
+    """
+    catalog, shards = split_state(state)
+    catalog.pop(WHISKEY_INDEX, None)
+    whiskeys: State = {}
+    tastings: State = {}
+    collisions = []
+    for _, shard in sorted(shards.items()):
+        whiskeys.update(shard.get("whiskeys", {}))
+        for doc_id, tasting in shard.get("tastings", {}).items():
+            if doc_id in tastings:
+                collisions.append(tasting)
+            else:
+                tastings[doc_id] = tasting
+    next_id = max((int(doc_id) for doc_id in tastings), default=0)
+    for tasting in collisions:
+        next_id += 1
+        tastings[str(next_id)] = {**tasting, "id": next_id}
+    return {**catalog, "whiskeys": whiskeys, "tastings": tastings}
+
+
+def write_sharded(
+    state: State, db_path: Path, storage_cls: Callable[..., Storage], options: dict[str, Any]
+) -> int:
+    """Write ``state`` in the sharded layout at ``db_path``; returns the number of shards.
+
+    Shards first, then the catalog; shard files of themes not in
+    ``state`` are removed.
+    """
+    catalog, shards = split_state(state)
+    directory = shard_dir(db_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    for theme_id, shard in shards.items():
+        _write(directory / shard_name(theme_id), shard, storage_cls, options)
+    for theme_id, path in shard_files(db_path).items():
+        if theme_id not in shards:
+            path.unlink()
+    _write(db_path, catalog, storage_cls, options)
+    return len(shards)
+
+
+def read_sharded(db_path: Path) -> State:
+    """Merged state of the sharded database at ``db_path``, read from disk."""
+    catalog = decode_state(db_path.read_bytes())
+    shards = {theme_id: decode_state(path.read_bytes()) for theme_id, path in shard_files(db_path).items()}
+    return merge_state(catalog, shards)
+
+
+def _write(path: Path, state: State, storage_cls: Callable[..., Storage], options: dict[str, Any]) -> None:
+    storage = storage_cls(str(path), **options)
+    try:
+        storage.write(state)
+    finally:
+        storage.close()
+
+
+def decode_snapshot(data: bytes) -> State:
+    """State held by a database snapshot, merged for a framed one (see ``decode_state``).
+
+    Archive files in the snapshot become ``archive-<id>/tastings`` tables.
+    """
+    if not data.startswith(SNAPSHOT_MAGIC):
+        return decode_state(data)
+    header_end = data.index(b"\n", len(SNAPSHOT_MAGIC)) + 1
+    header = json.loads(data[len(SNAPSHOT_MAGIC):header_end])
+    view = memoryview(data)
+    offset = header_end
+    catalog = decode_state(view[offset:offset + header["catalog"]].tobytes())
+    offset += header["catalog"]
+    shards = {}
+    for theme_id, size in header["shards"]:
+        shards[theme_id] = decode_state(view[offset:offset + size].tobytes())
+        offset += size
+    state = merge_state(catalog, shards)
+    for theme_id, size in header.get("archives", []):
+        tastings = decode_archive(view[offset:offset + size].tobytes(), f"archive of theme {theme_id}")
+        state[archive_table(theme_id)] = {str(tasting["id"]): tasting for tasting in tastings}
+        offset += size
+    return state
+
+
+class ShardedSnapshot:
+    """Point-in-time copy of a database spread over several files (see ``decode_snapshot``).
+
+    Holds open handles on the catalog (or single database file), every
+    shard and every archive file, taken together between two database
+    operations; files replaced later do not change what the handles read.
+    ``read()`` only concatenates the raw files, so it does not hold the GIL
+    for long; decoding is left to the reader.
+    """
+
+    def __init__(
+        self, catalog: BinaryIO, shards: dict[int, BinaryIO], archives: dict[int, BinaryIO] | None = None
+    ):
+        self._catalog = catalog
+        self._shards = shards
+        self._archives = archives or {}
+
+    def read(self) -> bytes:
+        """Catalog, shard and archive files framed into one blob."""
+        catalog = self._catalog.read()
+        shards = [(theme_id, handle.read()) for theme_id, handle in self._shards.items()]
+        archives = [(theme_id, handle.read()) for theme_id, handle in self._archives.items()]
+        header = {
+            "catalog": len(catalog),
+            "shards": [[theme_id, len(data)] for theme_id, data in shards],
+            "archives": [[theme_id, len(data)] for theme_id, data in archives],
+        }
+        return b"".join(
+            [
+                SNAPSHOT_MAGIC, json.dumps(header).encode("utf-8"), b"\n", catalog,
+                *(data for _, data in shards), *(data for _, data in archives),
+            ]
+        )
+
+    def close(self) -> None:
+        """Close every handle."""
+        self._catalog.close()
+        for handle in [*self._shards.values(), *self._archives.values()]:
+            handle.close()
+
+    def __enter__(self) -> "ShardedSnapshot":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,520 @@
+"""TinyDB storage, middleware and table classes used by the database layer."""
+
+import io
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, Mapping
+
+from tinydb import TinyDB
+from tinydb.middlewares import Middleware
+from tinydb.storages import Storage, touch
+from tinydb.table import Table
+
+from app import compression, metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+
+def _fsync_directory(directory: Path) -> None:
+    # Persists the rename itself; Windows cannot open directories
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: Path, data: bytes, fsync: bool = True) -> None:
+    """Replace ``path`` with ``data`` so readers see the old or new file, never a mix.
+
+    Writes a temp file in the same directory, optionally fsyncs it, then
+    renames it over the target (and fsyncs the directory, so the rename
+    survives a power loss too).
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+            if fsync:
+                handle.flush()
+                os.fsync(handle.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    if fsync:
+        _fsync_directory(path.parent)
+
+
+DURABILITY_MODES = ("fsync", "group", "os")
+# Temp files younger than this may belong to a write in progress
+STALE_TEMP_SECONDS = 60.0
+
+
+def _remove_stale_temp_files(path: Path) -> None:
+    cutoff = time.time() - STALE_TEMP_SECONDS
+    for stale in path.parent.glob(f".{path.name}.*.tmp"):
+        try:
+            if stale.stat().st_mtime < cutoff:
+                stale.unlink()
+                logger.warning("Removed %s left behind by an interrupted write", stale)
+        except FileNotFoundError:
+            pass
+
+
+class DurableFile:
+    """Crash-safe whole-file writes of the database file at a chosen durability.
+
+    Every write goes to a temp file that is renamed over the target, so a
+    crash at any point leaves the old or the new file, never a truncated
+    one. ``durability`` decides what a returned write guarantees:
+
+    - ``fsync``: data and rename are on disk (the default)
+    - ``group``: the data is held in memory and committed, with fsync,
+      at most ``group_commit_ms`` later; writes in between replace each
+      other, so a burst costs one file write. A crash loses that window.
+    - ``os``: renamed but left in the OS page cache; survives the process
+      crashing, not the machine
+    """
+
+    def __init__(self, path: Path, durability: str = "fsync", group_commit_ms: float = 50.0):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability {durability!r}; expected one of {', '.join(DURABILITY_MODES)}")
+        self.path = path
+        self.durability = durability
+        self._interval = group_commit_ms / 1000
+        self._pending: bytes | None = None
+        self._lock = threading.Lock()
+        # Serialises file writes between the flusher thread and close()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+        _remove_stale_temp_files(path)
+
+    @property
+    def pending(self) -> bytes | None:
+        """Data written but not yet committed to the file (``group`` only)."""
+        return self._pending
+
+    def write(self, data: bytes) -> None:
+        """Replace the file content with ``data`` at the configured durability."""
+        if self.durability != "group" or self._stop.is_set():
+            self._commit(data, fsync=self.durability != "os")
+            return
+        with self._lock:
+            if self._pending is not None:
+                metrics.db_writes_coalesced_total.inc()
+            self._pending = data
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name=f"group-commit:{self.path.name}", daemon=True)
+                self._flusher.start()
+        self._wake.set()
+
+    def flush(self) -> None:
+        """Commit pending data now."""
+        with self._flush_lock:
+            data = self._pending
+            if data is None:
+                return
+            self._commit(data, fsync=True)
+            # Readers use the pending copy until the file holds it
+            with self._lock:
+                if self._pending is data:
+                    self._pending = None
+
+    def close(self) -> None:
+        """Stop the group-commit thread and commit anything pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def _commit(self, data: bytes, fsync: bool) -> None:
+        start = time.perf_counter()
+        atomic_write(self.path, data, fsync=fsync)
+        metrics.db_commit_seconds.observe(time.perf_counter() - start, durability=self.durability)
+        metrics.db_file_writes_total.inc()
+        metrics.db_bytes_written_total.inc(len(data))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            # Let the writes of this window pile up into one commit
+            self._stop.wait(self._interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Group commit of %s failed; retrying", self.path)
+                self._wake.set()
+
+
+class TransactionalMiddleware(Middleware):
+    """Buffer writes between ``begin()`` and ``commit()`` into one storage write.
+
+    TinyDB rewrites the whole file on every table operation. Inside a
+    transaction reads are served from the pending in-memory copy and writes
+    only replace it, so a cascade delete plus its outbox entry land on disk
+    in a single write - or not at all if the transaction is rolled back.
+    Transactions nest; only the outermost ``commit()`` writes.
+    """
+
+    def __init__(self, storage_cls):
+        super().__init__(storage_cls)
+        self._depth = 0
+        self._pending: dict[str, Any] | None = None
+        self._dirty = False
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether writes are currently being buffered."""
+        return self._depth > 0
+
+    def begin(self) -> None:
+        """Start (or nest) a transaction."""
+        self._depth += 1
+
+    def commit(self) -> None:
+        """End a transaction, flushing buffered data if this is the outermost one."""
+        if self._depth == 0:
+            raise RuntimeError("commit() called outside a transaction")
+        self._depth -= 1
+        if self._depth == 0:
+            pending, dirty = self._pending, self._dirty
+            self._pending, self._dirty = None, False
+            if dirty:
+                self.storage.write(pending)
+
+    def rollback(self) -> None:
+        """Abort all nested transactions and discard buffered writes."""
+        self._depth = 0
+        self._pending, self._dirty = None, False
+
+    def read(self) -> dict[str, Any] | None:
+        if self._depth:
+            if self._pending is None:
+                self._pending = self.storage.read()
+            return self._pending
+        return self.storage.read()
+
+    def write(self, data: dict[str, Any]) -> None:
+        if self._depth:
+            self._pending, self._dirty = data, True
+            return
+        self.storage.write(data)
+
+    def close(self) -> None:
+        self.storage.close()
+
+
+class BinaryJSONStorage(Storage):
+    """JSON file storage that works on bytes, optionally compressed.
+
+    Reads detect gzip or zstd by their magic bytes, and MessagePack by its
+    first byte, so any file written by these storages opens regardless of
+    the configured codec and ``compression``; writes use the configured
+    ones. With
+    ``use_mmap`` the file is parsed (or decompressed) straight from a
+    read-only memory map rather than copied into a bytes object first.
+    Writes replace the whole file through ``DurableFile``, so the file is
+    opened afresh by every read. Subclasses swap the codec through
+    ``_loads`` and ``_dumps``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        create_dirs: bool = False,
+        use_mmap: bool = False,
+        compression: str = "none",
+        durability: str = "fsync",
+        group_commit_ms: float = 50.0,
+        **kwargs: Any,
+    ):
+        super().__init__()
+        self._path = Path(path)
+        self._use_mmap = use_mmap
+        self._compression = compression
+        touch(path, create_dirs=create_dirs)
+        self._file = DurableFile(self._path, durability, group_commit_ms)
+
+    def _loads(self, data: bytes | memoryview) -> dict[str, Any]:
+        return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+    def _dumps(self, data: dict[str, Any]) -> bytes:
+        return json.dumps(data).encode("utf-8")
+
+    def _decode(self, data: bytes | memoryview) -> dict[str, Any]:
+        # A file written by MsgpackStorage opens with any codec
+        if is_msgpack(data):
+            return unpack_records(data)
+        return self._loads(data)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def open_snapshot(self) -> BinaryIO:
+        """Open the stored content as of now; later writes do not change what it reads.
+
+        Writes rename a new file into place, so an open handle keeps the
+        version it was opened on. A pending group commit is served from
+        memory.
+        """
+        pending = self._file.pending
+        if pending is not None:
+            return io.BytesIO(pending)
+        return open(self._path, "rb")
+
+    def read(self) -> dict[str, Any] | None:
+        metrics.db_file_reads_total.inc()
+        pending = self._file.pending
+        if pending is not None:
+            return self._decode(compression.decompress(pending))
+        with open(self._path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if not size:
+                return None
+            if self._use_mmap:
+                # Safe to map: writes rename a new file into place instead
+                # of truncating this one
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    with memoryview(mapped) as view:
+                        return self._decode(compression.decompress(view))
+            return self._decode(compression.decompress(handle.read()))
+
+    def write(self, data: dict[str, Any]) -> None:
+        serialized = compression.compress(self._dumps(data), self._compression)
+        self._file.write(serialized)
+        tracing.record_write(len(serialized))
+
+
+class InstrumentedJSONStorage(BinaryJSONStorage):
+    """The default storage: stdlib ``json``, uncompressed unless configured.
+
+    Replaces TinyDB's ``JSONStorage``, which truncates and rewrites the
+    file in place, so a crash mid-write could corrupt the only copy. The
+    file format is the same.
+    """
+
+
+class OrjsonStorage(BinaryJSONStorage):
+    """``BinaryJSONStorage`` using orjson, a drop-in for ``InstrumentedJSONStorage``.
+
+    Reads any file the stdlib storage wrote and writes compact JSON it can
+    read back, so switching back and forth needs no migration. orjson
+    parses and serialises several times faster than ``json`` and writes
+    bytes directly instead of building a str first.
+    """
+
+    def __init__(self, path: str, create_dirs: bool = False, use_mmap: bool = False, **kwargs: Any):
+        import orjson
+
+        super().__init__(path, create_dirs=create_dirs, use_mmap=use_mmap, **kwargs)
+        self._orjson = orjson
+
+    def _loads(self, data: bytes | memoryview) -> dict[str, Any]:
+        return self._orjson.loads(data)
+
+    def _dumps(self, data: dict[str, Any]) -> bytes:
+        # TinyDB stores document ids as string keys; OPT_NON_STR_KEYS keeps
+        # integer ids written by older code paths from raising
+        return self._orjson.dumps(data, option=self._orjson.OPT_NON_STR_KEYS)
+
+
+# Layout marker of MsgpackStorage files
+RECORDS_FORMAT = "wt-records/1"
+
+
+def is_msgpack(data: bytes | memoryview) -> bool:
+    """Whether ``data`` (already decompressed) is MessagePack rather than JSON.
+
+    JSON documents start with ``{`` or whitespace; a MessagePack map starts
+    with a fixmap byte (0x80-0x8f) or map16/map32 (0xde/0xdf).
+    """
+    return len(data) > 0 and (0x80 <= data[0] <= 0x8F or data[0] in (0xDE, 0xDF))
+
+
+def pack_records(data: dict[str, Any]) -> bytes:
+    """Encode a TinyDB state as MessagePack, one array per document.
+
+    Tables hold fixed-shape documents, so each table stores its key names
+    once and every document whose keys match as a positional array; any
+    other document is kept as a map. This halves the file compared with
+    compact JSON, where every tasting repeats nine key names.
+    """
+    import msgpack
+
+    tables = {}
+    for name, documents in data.items():
+        keys: list[str] | None = None
+        rows = {}
+        for doc_id, document in documents.items():
+            if keys is None:
+                keys = list(document)
+            rows[doc_id] = [document[k] for k in keys] if list(document) == keys else document
+        tables[name] = {"keys": keys or [], "rows": rows}
+    return msgpack.packb({"format": RECORDS_FORMAT, "tables": tables})
+
+
+def unpack_records(data: bytes | memoryview) -> dict[str, Any]:
+    """Decode a file written by ``pack_records`` back into a TinyDB state."""
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError("This database file is MessagePack; install msgpack (pip install -e .[fast])") from None
+
+    packed = msgpack.unpackb(data, strict_map_key=False)
+    if packed.get("format") != RECORDS_FORMAT:
+        raise ValueError(f"Unsupported MessagePack database layout: {packed.get('format')!r}")
+    state = {}
+    for name, table in packed["tables"].items():
+        keys = table["keys"]
+        state[name] = {
+            doc_id: dict(zip(keys, row)) if isinstance(row, list) else row for doc_id, row in table["rows"].items()
+        }
+    return state
+
+
+def decode_state(data: bytes) -> dict[str, Any]:
+    """Parse database file content of any codec and compression (empty is ``{}``)."""
+    data = compression.decompress(data)
+    if not data:
+        return {}
+    if is_msgpack(data):
+        return unpack_records(data)
+    return json.loads(data)
+
+
+class MsgpackStorage(BinaryJSONStorage):
+    """``BinaryJSONStorage`` writing the compact MessagePack record layout.
+
+    Existing JSON files still open (and are converted on the next write);
+    switching back to ``json`` or ``orjson`` reads MessagePack files too.
+    """
+
+    def __init__(self, path: str, create_dirs: bool = False, use_mmap: bool = False, **kwargs: Any):
+        import msgpack  # noqa: F401  fail at open rather than on the first write
+
+        super().__init__(path, create_dirs=create_dirs, use_mmap=use_mmap, **kwargs)
+
+    def _dumps(self, data: dict[str, Any]) -> bytes:
+        return pack_records(data)
+
+
+STORAGE_FORMATS = ("json", "orjson", "msgpack")
+
+
+def storage_class(name: str) -> Callable[..., Storage]:
+    """Storage class for the ``DB_STORAGE`` setting, falling back to ``json`` without orjson.
+
+    There is no fallback for ``msgpack``: its files are not JSON, so a
+    missing package must fail loudly instead of silently changing format.
+    """
+    if name == "orjson":
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            logger.warning("DB_STORAGE=orjson but orjson is not installed; using the json storage")
+            return InstrumentedJSONStorage
+        return OrjsonStorage
+    if name == "msgpack":
+        return MsgpackStorage
+    if name != "json":
+        raise ValueError(f"Unknown storage {name!r}; expected one of {', '.join(STORAGE_FORMATS)}")
+    return InstrumentedJSONStorage
+
+
+def storage_for(
+    name: str,
+    compression_method: str = "none",
+    use_mmap: bool = False,
+    durability: str = "fsync",
+    group_commit_ms: float = 50.0,
+) -> tuple[Callable[..., Storage], dict[str, Any]]:
+    """Storage class and the options to open a database file with.
+
+    Every storage reads compressed and MessagePack files whatever the
+    settings say, so an existing file always opens; its next write then
+    uses the settings.
+    """
+    options = {
+        "use_mmap": use_mmap,
+        "compression": compression_method,
+        "durability": durability,
+        "group_commit_ms": group_commit_ms,
+    }
+    return storage_class(name), options
+
+
+class InstrumentedTable(Table):
+    """Table that counts full-table loads and caches its document count.
+
+    Every uncached search, listing, count and id allocation goes through
+    ``_read_table``, which loads and walks the whole table. The document
+    count is refreshed by every load and write, so ``len()`` is answered
+    from memory after the first access. ``version`` changes with every
+    write and invalidation, so copies derived from the table can tell
+    when they are stale.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._doc_count: int | None = None
+        self.version = 0
+
+    def __len__(self) -> int:
+        if self._doc_count is None:
+            self._read_table()
+        return self._doc_count
+
+    @property
+    def cached_len(self) -> int | None:
+        """Document count if known without reading the table."""
+        return self._doc_count
+
+    def invalidate(self) -> None:
+        """Forget cached queries, count and next id (e.g. after a rollback)."""
+        self.clear_cache()
+        self._next_id = None
+        self._doc_count = None
+        self.version += 1
+
+    def raw_items(self) -> Iterator[tuple[int, Mapping]]:
+        """``(doc_id, document)`` pairs in table order, without wrapping them in Documents."""
+        for doc_id, doc in self._read_table().items():
+            yield int(doc_id), doc
+
+    def _read_table(self) -> dict[str, Mapping]:
+        table = super()._read_table()
+        self._doc_count = len(table)
+        metrics.db_table_scans_total.inc(table=self.name)
+        tracing.record_scan(len(table))
+        return table
+
+    def _update_table(self, updater: Callable[[dict[int, Mapping]], None]) -> None:
+        def counting_updater(table: dict[int, Mapping]) -> None:
+            updater(table)
+            self._doc_count = len(table)
+            self.version += 1
+
+        super()._update_table(counting_updater)
+
+
+class InstrumentedTinyDB(TinyDB):
+    """TinyDB whose tables report scan metrics."""
+
+    table_class = InstrumentedTable
@@ -0,0 +1,190 @@
+"""Multi-tenant mode: one database per club, kept open in a bounded LRU."""
+
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.backups import BackupManager
+from app.config import settings
+from app.database import Database
+from app.metrics import tenant_evictions_total, tenants_open
+from app.notifications import NotificationDispatcher
+
+logger = logging.getLogger(__name__)
+
+TENANT_HEADER = "x-tenant"
+# Lowercase letters, digits, "-" and "_": safe as a file name and in a URL
+TENANT_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,62}")
+_PREFIX = re.compile(r"^/t/([^/]+)(/.*)$")
+
+
+class TenantError(Exception):
+    """The request names no tenant, or one this deployment does not serve."""
+
+
+@dataclass
+class Tenant:
+    """An open tenant database, the dispatcher draining its outbox and its backups."""
+
+    name: str
+    db: Database
+    dispatcher: NotificationDispatcher
+    backups: BackupManager
+    in_use: int = 0
+
+
+class TenantRegistry:
+    """Open tenant databases, least recently used first.
+
+    At most ``max_open`` tenants stay open. Opening another closes the
+    least recently used tenant that no request is using; if every open
+    tenant is busy the limit is exceeded until one becomes idle. Opening a
+    tenant is cheap (the file is parsed on first query), and all access
+    happens on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, directory: Path, max_open: int = 16, allowed: list[str] | None = None):
+        self.directory = directory
+        self.max_open = max(1, max_open)
+        self.allowed = set(allowed or ())
+        self._open: OrderedDict[str, Tenant] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._open
+
+    def path_for(self, name: str) -> Path:
+        """Database file of tenant ``name``; raises TenantError for invalid or unknown names."""
+        if not TENANT_NAME.fullmatch(name):
+            raise TenantError(f"Invalid tenant name: {name!r}")
+        if self.allowed and name not in self.allowed:
+            raise TenantError(f"Unknown tenant: {name!r}")
+        return self.directory / f"{name}.json"
+
+    def stored(self) -> list[str]:
+        """Names of the tenants that have a database file, sorted."""
+        if not self.directory.is_dir():
+            return []
+        names = (path.stem for path in self.directory.glob("*.json"))
+        return sorted(n for n in names if TENANT_NAME.fullmatch(n) and (not self.allowed or n in self.allowed))
+
+    async def backup_all(self) -> int:
+        """Back up every stored tenant, one after another; returns how many succeeded.
+
+        Each tenant is opened for its backup like for a request, so at most
+        ``max_open`` stay open afterwards.
+        """
+        done = 0
+        for name in self.stored():
+            try:
+                async with self.use(name) as tenant:
+                    await tenant.backups.backup(tenant.db)
+                done += 1
+            except Exception:
+                logger.exception("Scheduled backup of tenant %s failed", name)
+        return done
+
+    async def run_backups_periodically(self, interval: float) -> None:
+        """Back up every stored tenant every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.backup_all()
+
+    @asynccontextmanager
+    async def use(self, name: str) -> AsyncIterator[Tenant]:
+        """Open (or reuse) tenant ``name`` and keep it from being evicted while in use."""
+        tenant = self._open.get(name)
+        if tenant is None:
+            tenant = await self._open_tenant(name)
+        else:
+            self._open.move_to_end(name)
+        tenant.in_use += 1
+        try:
+            yield tenant
+        finally:
+            tenant.in_use -= 1
+        await self._evict()
+
+    async def _open_tenant(self, name: str) -> Tenant:
+        path = self.path_for(name)
+        logger.info("Opening tenant %s", name)
+        tenant = Tenant(
+            name=name,
+            db=Database(path),
+            dispatcher=NotificationDispatcher(),
+            backups=BackupManager(settings.backup_dir / name),
+        )
+        await tenant.dispatcher.start(outbox=tenant.db)
+        self._open[name] = tenant
+        tenants_open.set(len(self._open))
+        return tenant
+
+    async def _close_tenant(self, tenant: Tenant) -> None:
+        del self._open[tenant.name]
+        tenants_open.set(len(self._open))
+        await tenant.dispatcher.stop()
+        try:
+            tenant.db.close()
+        except Exception as e:
+            logger.error("Error closing tenant %s: %s", tenant.name, e)
+
+    async def _evict(self) -> None:
+        """Close least recently used idle tenants beyond ``max_open``."""
+        while len(self._open) > self.max_open:
+            idle = next((t for t in self._open.values() if not t.in_use), None)
+            if idle is None:
+                return
+            logger.info("Closing idle tenant %s", idle.name)
+            tenant_evictions_total.inc()
+            await self._close_tenant(idle)
+
+    async def close(self) -> None:
+        """Close every open tenant."""
+        for tenant in list(self._open.values()):
+            await self._close_tenant(tenant)
+
+
+def requested_tenant(scope: Scope) -> str | None:
+    """Tenant named by the path prefix (recorded by TenantMiddleware) or the X-Tenant header."""
+    name = scope.get("state", {}).get("tenant")
+    if name:
+        return name
+    for key, value in scope.get("headers", []):
+        if key.decode("latin-1") == TENANT_HEADER:
+            return value.decode("latin-1").strip().lower()
+    return None
+
+
+class TenantMiddleware:
+    """Route ``/t/<tenant>/...`` to ``/...`` and remember the tenant for the request.
+
+    Lets clubs use distinct base URLs without a header, e.g. the frontend
+    of one club talks to ``/t/highland/api/v1``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            match = _PREFIX.match(scope["path"])
+            if match:
+                name, path = match.groups()
+                raw_path = scope.get("raw_path")
+                scope = {
+                    **scope,
+                    "path": path,
+                    # Keep the client's percent-encoding of the remainder
+                    "raw_path": b"/" + raw_path.split(b"/", 3)[3] if raw_path else path.encode("utf-8"),
+                    "state": {**scope.get("state", {}), "tenant": name.lower()},
+                }
+        await self.app(scope, receive, send)
@@ -0,0 +1,140 @@
+"""Per-request database operation tracing and slow-operation logging."""
+
+import functools
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, TypeVar
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class DbOperation:
+    """Cost of one top-level ``Database`` call."""
+
+    name: str
+    duration_ms: float = 0.0
+    rows_scanned: int = 0
+    rows_returned: int = 0
+    bytes_written: int = 0
+
+
+@dataclass
+class RequestTrace:
+    """Database operations performed while handling one request."""
+
+    operations: list[DbOperation] = field(default_factory=list)
+
+    @property
+    def db_time_ms(self) -> float:
+        return sum(op.duration_ms for op in self.operations)
+
+
+_current_trace: ContextVar[RequestTrace | None] = ContextVar("current_trace", default=None)
+_current_op: ContextVar[DbOperation | None] = ContextVar("current_op", default=None)
+
+
+def current_trace() -> RequestTrace | None:
+    """Trace of the request being handled, if any."""
+    return _current_trace.get()
+
+
+def record_scan(rows: int) -> None:
+    """Attribute a full-table load of ``rows`` documents to the running operation."""
+    op = _current_op.get()
+    if op is not None:
+        op.rows_scanned += rows
+
+
+def record_write(nbytes: int) -> None:
+    """Attribute a storage write of ``nbytes`` to the running operation."""
+    op = _current_op.get()
+    if op is not None:
+        op.bytes_written += nbytes
+
+
+def _count_rows(result: Any) -> int:
+    if result is None or isinstance(result, bool):
+        return 0
+    if isinstance(result, dict):
+        return 1
+    if isinstance(result, list):
+        return len(result)
+    return 0
+
+
+def traced(func: F) -> F:
+    """Record duration, rows scanned/returned and bytes written of a Database method.
+
+    Only the outermost traced call is recorded; nested calls (e.g. the
+    cascade inside ``delete_theme``) are counted as part of it.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if _current_op.get() is not None:
+            return func(*args, **kwargs)
+
+        op = DbOperation(name=func.__name__)
+        token = _current_op.set(op)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            op.duration_ms = (time.perf_counter() - start) * 1000
+            _current_op.reset(token)
+        op.rows_returned = _count_rows(result)
+
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.operations.append(op)
+        if op.duration_ms >= settings.slow_db_op_ms:
+            logger.warning(
+                "Slow database operation: op=%s duration_ms=%.1f rows_scanned=%s rows_returned=%s bytes_written=%s",
+                op.name, op.duration_ms, op.rows_scanned, op.rows_returned, op.bytes_written,
+                extra={"db_operation": asdict(op)},
+            )
+        return result
+
+    return wrapper  # type: ignore[return-value]
+
+
+class TracingMiddleware:
+    """ASGI middleware attaching a RequestTrace to each request.
+
+    Adds ``X-DB-Time`` (milliseconds spent in database calls) and a
+    ``Server-Timing`` entry to every response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                db_time = f"{trace.db_time_ms:.1f}"
+                headers.append("X-DB-Time", db_time)
+                headers.append("Server-Timing", f'db;dur={db_time};desc="{len(trace.operations)} ops"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
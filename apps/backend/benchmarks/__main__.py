@@ -0,0 +1,144 @@
+"""Run the database benchmark suite and write the results as JSON.
+
+Usage::
+
+    python -m benchmarks --scales 1k,10k --repeat 5 --output results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from app.compression import COMPRESSIONS
+from app.storage import DURABILITY_MODES, STORAGE_FORMATS
+from benchmarks.database import CASES, BenchContext
+from benchmarks.harness import measure
+from scripts.generate_dataset import parse_count
+
+DEFAULT_SCALES = "1k,10k,100k,1m"
+
+
+def run_suite(
+    scales: list[int],
+    repeat: int = 5,
+    warmup: int = 1,
+    cases: list[str] | None = None,
+    limits: bool = True,
+    memory: bool = True,
+    time_budget: float | None = None,
+    storage: str = "json",
+    use_mmap: bool = False,
+    compression: str = "none",
+    durability: str = "fsync",
+    layout: str = "single",
+) -> dict[str, Any]:
+    """Run the selected cases at every scale and return the JSON-ready report.
+
+    ``storage``, ``use_mmap``, ``compression``, ``durability`` and
+    ``layout`` select the database codec and write path, as the
+    ``DB_STORAGE``, ``DB_MMAP``, ``DB_COMPRESSION``, ``DB_DURABILITY`` and
+    ``DB_LAYOUT`` settings do. Each result records the database size on disk.
+    """
+    selected = [case for case in CASES if not cases or case.name in cases]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="wt-bench-") as workdir:
+        for scale in scales:
+            print(f"Generating {scale} tastings...", file=sys.stderr)
+            ctx = BenchContext(
+                Path(workdir),
+                scale,
+                storage=storage,
+                use_mmap=use_mmap,
+                compression=compression,
+                durability=durability,
+                layout=layout,
+            )
+            try:
+                for case in selected:
+                    entry: dict[str, Any] = {"case": case.name, "tastings": scale}
+                    if limits and case.max_tastings is not None and scale > case.max_tastings:
+                        entry["skipped"] = f"above max_tastings={case.max_tastings}"
+                    else:
+                        start = time.perf_counter()
+                        entry["file_bytes"] = ctx.file_bytes
+                        entry.update(measure(case, ctx, repeat, warmup, memory, time_budget))
+                        print(
+                            f"  {case.name:<36} median {entry['median_ms']:10.2f} ms"
+                            f"  ({time.perf_counter() - start:.1f}s)",
+                            file=sys.stderr,
+                        )
+                    results.append(entry)
+            finally:
+                ctx.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "warmup": warmup,
+            "time_budget": time_budget,
+            "storage": storage,
+            "mmap": use_mmap,
+            "compression": compression,
+            "durability": durability,
+            "layout": layout,
+        },
+        "results": results,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help=f"comma-separated tasting counts (default {DEFAULT_SCALES})")
+    parser.add_argument("--repeat", type=int, default=5, help="timed samples per case (default 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before sampling (default 1)")
+    parser.add_argument("--time-budget", type=float, default=30.0, help="stop sampling a case after this many seconds (default 30)")
+    parser.add_argument("--cases", help="comma-separated case names to run (default all)")
+    parser.add_argument("--no-limits", action="store_true", help="run cases above their max_tastings too")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory run")
+    parser.add_argument("--storage", choices=STORAGE_FORMATS, default="json", help="database codec (default json)")
+    parser.add_argument("--mmap", action="store_true", help="parse the database from a memory map")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="none", help="database file compression (default none)")
+    parser.add_argument("--durability", choices=DURABILITY_MODES, default="fsync", help="database write durability (default fsync)")
+    parser.add_argument("--layout", choices=("single", "sharded"), default="single", help="database layout (default single)")
+    parser.add_argument("--output", type=Path, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Slow-operation warnings are expected at large scales
+    logging.basicConfig(level=logging.ERROR)
+
+    report = run_suite(
+        scales=[parse_count(s) for s in args.scales.split(",")],
+        repeat=args.repeat,
+        warmup=args.warmup,
+        cases=args.cases.split(",") if args.cases else None,
+        limits=not args.no_limits,
+        memory=not args.no_memory,
+        time_budget=args.time_budget,
+        storage=args.storage,
+        use_mmap=args.mmap,
+        compression=args.compression,
+        durability=args.durability,
+        layout=args.layout,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""Compare benchmark results with the committed baseline and fail on regressions.
+
+Runs the suite at the scales and cases recorded in the baseline (or reads
+``--current``), and exits 1 when a case got significantly slower or uses
+more memory::
+
+    python -m benchmarks.compare
+    python -m benchmarks.compare --current results.json --tolerance 0.5
+    python -m benchmarks.compare --update-baseline
+
+Latency is compared relative to the ``storage_read`` case of the same
+run and scale, not in milliseconds: the baseline is recorded on one
+machine and checked on another, and a plain parse of the database file
+scales with the machine about as every other case does. A latency
+regression needs both: a normalised median more than ``--tolerance``
+above the baseline's, and a normalised median confidence interval
+entirely above the baseline's, so noise in a handful of samples does not
+fail the gate. Load on a shared machine also drifts between runs, so when
+the suite runs here a regressed case is measured again (``--confirm``
+times) and fails the gate only if it regresses every time. Peak memory
+does not depend on the machine; it is nearly deterministic and is
+compared with ``--memory-tolerance`` alone.
+
+The suite re-runs with the database configuration stored in the
+baseline's ``meta``. Baselines that do not record it, and results taken
+with a different one, are refused rather than compared.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any
+
+from benchmarks.__main__ import run_suite
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+# Case whose median, at the same scale and in the same run, latencies are divided by
+REFERENCE_CASE = "storage_read"
+# Database configuration a report must record in its meta to be compared
+CONFIG_KEYS = ("storage", "mmap", "compression", "durability", "layout")
+
+
+def config_mismatch(baseline: dict[str, Any], current: dict[str, Any] | None = None) -> str | None:
+    """Why the reports cannot be compared, or None when both record the same configuration."""
+    missing = [key for key in CONFIG_KEYS if key not in baseline["meta"]]
+    if missing:
+        return f"baseline meta lacks {', '.join(missing)}; regenerate it with --update-baseline"
+    if not any(key[0] == REFERENCE_CASE for key in _index(baseline)):
+        return f"baseline has no {REFERENCE_CASE} results; regenerate it with --update-baseline"
+    if current is not None:
+        differing = [key for key in CONFIG_KEYS if current["meta"].get(key) != baseline["meta"][key]]
+        if differing:
+            return f"current results were taken with a different {', '.join(differing)} than the baseline"
+    return None
+
+
+def _index(report: dict[str, Any]) -> dict[tuple[str, int], dict[str, Any]]:
+    return {(r["case"], r["tastings"]): r for r in report["results"] if "skipped" not in r}
+
+
+def _reference_ms(report: dict[str, Any]) -> dict[int, float]:
+    """Median of the reference case at each scale of ``report``."""
+    return {key[1]: r["median_ms"] for key, r in _index(report).items() if key[0] == REFERENCE_CASE}
+
+
+def compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    tolerance: float = 0.2,
+    memory_tolerance: float = 0.1,
+) -> list[dict[str, Any]]:
+    """Classify every baseline case as ``ok``, ``regression``, ``improved`` or ``missing``.
+
+    Latencies are divided by the ``REFERENCE_CASE`` median at the same
+    scale of their own report; where either report lacks it they are
+    compared as measured. The reference itself is only checked for memory.
+    """
+    now = _index(current)
+    base_ref, now_ref = _reference_ms(baseline), _reference_ms(current)
+    rows = []
+    for key, base in _index(baseline).items():
+        row: dict[str, Any] = {"case": key[0], "tastings": key[1], "baseline_ms": base["median_ms"]}
+        cur = now.get(key)
+        if cur is None:
+            rows.append({**row, "status": "missing", "reasons": ["not measured"]})
+            continue
+
+        row["current_ms"] = cur["median_ms"]
+        if key[0] == REFERENCE_CASE or key[1] not in base_ref or key[1] not in now_ref:
+            base_unit = now_unit = 1.0
+        else:
+            base_unit, now_unit = base_ref[key[1]], now_ref[key[1]]
+        base_median, cur_median = base["median_ms"] / base_unit, cur["median_ms"] / now_unit
+        base_low, base_high = base["ci_low_ms"] / base_unit, base["ci_high_ms"] / base_unit
+        cur_low, cur_high = cur["ci_low_ms"] / now_unit, cur["ci_high_ms"] / now_unit
+        row["change"] = cur_median / base_median - 1 if base_median else 0.0
+        judged = key[0] != REFERENCE_CASE
+        reasons = []
+        if judged and cur_median > base_median * (1 + tolerance) and cur_low > base_high:
+            reasons.append(f"latency +{row['change']:.0%}")
+        base_mem, cur_mem = base.get("peak_memory_bytes"), cur.get("peak_memory_bytes")
+        if base_mem and cur_mem and cur_mem > base_mem * (1 + memory_tolerance):
+            reasons.append(f"peak memory +{cur_mem / base_mem - 1:.0%}")
+
+        if reasons:
+            status = "regression"
+        elif judged and cur_median < base_median / (1 + tolerance) and cur_high < base_low:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({**row, "status": status, "reasons": reasons})
+    return rows
+
+
+def format_comparison(rows: list[dict[str, Any]]) -> str:
+    """Render a comparison as a text table."""
+    lines = [f"{'case':<36} {'tastings':>9} {'baseline':>10} {'current':>10} {'change':>8}  status"]
+    for row in rows:
+        current = f"{row['current_ms']:10.2f}" if "current_ms" in row else f"{'-':>10}"
+        change = f"{row['change']:+8.0%}" if "change" in row else f"{'-':>8}"
+        status = row["status"] + (f" ({', '.join(row['reasons'])})" if row["reasons"] else "")
+        lines.append(f"{row['case']:<36} {row['tastings']:>9} {row['baseline_ms']:10.2f} {current} {change}  {status}")
+    lines.append(f"(change is relative to {REFERENCE_CASE} in the same run)")
+    return "\n".join(lines)
+
+
+def _run(meta: dict[str, Any], scales: list[int], cases: list[str], repeat: int) -> dict[str, Any]:
+    """Run ``cases`` and the reference case with the configuration in ``meta``.
+
+    A baseline that records no configuration is regenerated with the defaults.
+    """
+    return run_suite(
+        scales=scales,
+        repeat=repeat,
+        warmup=meta["warmup"],
+        cases=sorted({REFERENCE_CASE, *cases}),
+        time_budget=meta.get("time_budget"),
+        storage=meta.get("storage", "json"),
+        use_mmap=meta.get("mmap", False),
+        compression=meta.get("compression", "none"),
+        durability=meta.get("durability", "fsync"),
+        layout=meta.get("layout", "single"),
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="baseline JSON (default benchmarks/baseline.json)")
+    parser.add_argument("--current", type=Path, help="compare this results file instead of running the suite")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed median slowdown as a fraction (default 0.2)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.1, help="allowed peak-memory growth as a fraction (default 0.1)")
+    parser.add_argument("--repeat", type=int, help="timed samples per case (default: as in the baseline)")
+    parser.add_argument("--confirm", type=int, default=2, help="re-measurements a regression must survive (default 2)")
+    parser.add_argument("--output", type=Path, help="also write the fresh results here")
+    parser.add_argument("--update-baseline", action="store_true", help="run the suite and overwrite the baseline")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    baseline = json.loads(args.baseline.read_text())
+    meta = baseline["meta"]
+    repeat = args.repeat or meta["repeat"]
+
+    if args.current:
+        current = json.loads(args.current.read_text())
+        problem = config_mismatch(baseline, current)
+    else:
+        problem = config_mismatch(baseline)
+    # Regenerating is the way out of an unusable baseline, so it is never refused
+    if problem and not args.update_baseline:
+        parser.error(problem)
+
+    if not args.current:
+        current = _run(
+            meta, sorted({r["tastings"] for r in baseline["results"]}), [r["case"] for r in baseline["results"]], repeat
+        )
+        if args.output:
+            args.output.write_text(json.dumps(current, indent=2) + "\n")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Updated {args.baseline}")
+        return 0
+
+    rows = compare(baseline, current, args.tolerance, args.memory_tolerance)
+    for _ in range(0 if args.current else args.confirm):
+        suspects = [row for row in rows if row["status"] == "regression"]
+        if not suspects:
+            break
+        print(f"Re-measuring {len(suspects)} regressed case(s) to confirm them...", file=sys.stderr)
+        rerun = _run(meta, sorted({row["tastings"] for row in suspects}), [row["case"] for row in suspects], repeat)
+        confirmed = {
+            (row["case"], row["tastings"])
+            for row in compare(baseline, rerun, args.tolerance, args.memory_tolerance)
+            if row["status"] == "regression"
+        }
+        for row in suspects:
+            if (row["case"], row["tastings"]) not in confirmed:
+                row.update(status="ok", reasons=["not reproduced"])
+
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} significant regression(s) against {args.baseline}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
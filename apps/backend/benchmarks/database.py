@@ -0,0 +1,170 @@
+"""Benchmarks for ``Database`` operations and the score routers built on it."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import shutil
+from pathlib import Path
+
+from app.database import Database
+from app.shards import shard_dir, write_sharded
+from app.storage import decode_state, storage_for
+from app.routers import tastings as tastings_router
+from benchmarks.harness import Case
+from scripts.generate_dataset import generate_dataset
+
+
+class BenchContext:
+    """A seeded database at one scale, plus the ids the cases operate on."""
+
+    def __init__(
+        self,
+        workdir: Path,
+        tastings: int,
+        storage: str = "json",
+        use_mmap: bool = False,
+        compression: str = "none",
+        durability: str = "fsync",
+        layout: str = "single",
+    ):
+        self.tastings = tastings
+        self.storage = storage
+        self.use_mmap = use_mmap
+        self.compression = compression
+        self.durability = durability
+        self.layout = layout
+        self.pristine = workdir / f"seed-{tastings}.json"
+        self.rows = generate_dataset(self.pristine, tastings=tastings)
+        if storage != "json" or compression != "none":
+            # Store the seed in the codec under test, so reads parse that format
+            storage_cls, options = storage_for(storage, compression)
+            converter = storage_cls(str(self.pristine), **options)
+            converter.write(converter.read())
+            converter.close()
+        self.file_bytes = self.pristine.stat().st_size
+        if layout == "sharded":
+            write_sharded(decode_state(self.pristine.read_bytes()), self.pristine, *storage_for(storage, compression))
+            # Catalog plus shards: the whole database on disk
+            self.file_bytes = sum(p.stat().st_size for p in [self.pristine, *shard_dir(self.pristine).iterdir()])
+        self.path = workdir / f"bench-{tastings}.json"
+        self.loop = asyncio.new_event_loop()
+        self.db: Database | None = None
+        self._fresh = itertools.count(1)
+        self.snapshot: dict | None = None
+        self.reset()
+
+        # Operate on the newest theme, which is what a tasting night touches
+        self.theme_id = self.rows["themes"]
+        theme_whiskeys = self.db.get_whiskeys_by_theme(self.theme_id)
+        self.whiskey_id = theme_whiskeys[0]["id"]
+        self.user_id = self.db.get_tastings_by_theme(self.theme_id)[0]["user_id"]
+        self.user_name = self.db.get_user(self.user_id)["name"]
+
+    def reset(self) -> None:
+        """Restore the freshly seeded database (used by destructive cases)."""
+        if self.db is not None:
+            self.db.close()
+        shutil.copyfile(self.pristine, self.path)
+        if self.layout == "sharded":
+            shutil.rmtree(shard_dir(self.path), ignore_errors=True)
+            shutil.copytree(shard_dir(self.pristine), shard_dir(self.path))
+        self.db = Database(
+            self.path,
+            storage=self.storage,
+            use_mmap=self.use_mmap,
+            compression=self.compression,
+            durability=self.durability,
+            layout=self.layout,
+        )
+
+    def clear_caches(self) -> None:
+        """Drop TinyDB's query caches so reads measure the uncached path.
+
+        During an event every submission invalidates the tastings cache, so
+        the uncached path is what scoreboard refreshes actually pay.
+        """
+        for db in (self.db.db, *self.db._shards.values()):
+            for table in db._tables.values():
+                table.invalidate()
+
+    def fresh_id(self) -> int:
+        """A counter for names and ids that do not exist yet."""
+        return next(self._fresh)
+
+    def close(self) -> None:
+        self.db.close()
+        self.loop.close()
+
+
+def _update_tasting(ctx: BenchContext) -> None:
+    ctx.db.create_or_update_tasting(ctx.user_id, ctx.whiskey_id, 4.0, 4.5, 3.5, 1)
+
+
+def _insert_tasting(ctx: BenchContext) -> None:
+    # User ids past the seeded range never collide with an existing tasting;
+    # the whiskey must exist for the sharded layout to find its shard
+    ctx.db.create_or_update_tasting(10**9 + ctx.fresh_id(), ctx.whiskey_id, 4.0, 4.5, 3.5, 1)
+
+
+def _tastings_by_theme(ctx: BenchContext) -> None:
+    ctx.db.get_tastings_by_theme(ctx.theme_id)
+
+
+def _theme_scores(ctx: BenchContext) -> None:
+    ctx.loop.run_until_complete(tastings_router.get_theme_scores(ctx.theme_id, ctx.db))
+
+
+def _all_themes_scores(ctx: BenchContext) -> None:
+    ctx.loop.run_until_complete(tastings_router.get_all_themes_scores(ctx.db))
+
+
+def _delete_theme(ctx: BenchContext) -> None:
+    ctx.db.delete_theme(ctx.theme_id)
+
+
+def _existing_user(ctx: BenchContext) -> None:
+    ctx.db.get_or_create_user(ctx.user_name)
+
+
+def _new_user(ctx: BenchContext) -> None:
+    ctx.db.get_or_create_user(f"Bench User {ctx.fresh_id()}")
+
+
+def _storage_read(ctx: BenchContext) -> None:
+    ctx.db.db.storage.read()
+
+
+def _storage_write(ctx: BenchContext) -> None:
+    ctx.db.db.storage.write(ctx.snapshot)
+
+
+def _load_snapshot(ctx: BenchContext) -> None:
+    if ctx.snapshot is None:
+        ctx.snapshot = ctx.db.db.storage.read()
+
+
+def _clear(ctx: BenchContext) -> None:
+    ctx.clear_caches()
+
+
+def _reset(ctx: BenchContext) -> None:
+    ctx.reset()
+
+
+# With the caches cleared, the all-themes scoreboard reads the database file
+# once per theme to find its whiskeys, so its cost grows with themes x file
+# size; the score routers are capped to keep a default run finishing in minutes.
+CASES = [
+    # Raw parse and serialise of the whole file: the floor under every operation
+    Case("storage_read", _storage_read),
+    Case("storage_write", _storage_write, _load_snapshot),
+    Case("create_or_update_tasting[update]", _update_tasting, _clear),
+    Case("create_or_update_tasting[insert]", _insert_tasting, _clear),
+    Case("get_tastings_by_theme", _tastings_by_theme, _clear),
+    Case("get_theme_scores", _theme_scores, _clear, max_tastings=100_000),
+    Case("get_all_themes_scores", _all_themes_scores, _clear, max_tastings=10_000),
+    Case("delete_theme", _delete_theme, _reset),
+    Case("get_or_create_user[existing]", _existing_user, _clear),
+    Case("get_or_create_user[new]", _new_user, _clear),
+]
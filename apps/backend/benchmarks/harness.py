@@ -0,0 +1,115 @@
+"""Timing and memory measurement helpers for the benchmark suite."""
+
+from __future__ import annotations
+
+import gc
+import math
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass
+class Case:
+    """One benchmarked operation.
+
+    ``setup`` runs before every sample and is not timed; use it to restore
+    state that ``run`` destroys. Cases with ``max_tastings`` are skipped at
+    larger scales unless limits are disabled.
+    """
+
+    name: str
+    run: Callable[[Any], Any]
+    setup: Callable[[Any], None] | None = None
+    max_tastings: int | None = None
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank ``q``-th percentile of ``values`` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def median_ci(values: list[float], confidence: float = 0.95) -> tuple[float, float]:
+    """Distribution-free confidence interval for the median of ``values``.
+
+    Uses the order statistics whose ranks bound the median with at least
+    ``confidence`` probability under Binomial(n, 1/2); with few samples the
+    interval widens to the full range.
+    """
+    ordered = sorted(values)
+    n = len(ordered)
+    alpha = (1 - confidence) / 2
+    # Largest k with P(Binomial(n, 1/2) < k) <= alpha
+    k, tail = 0, 0.0
+    while k < n // 2:
+        tail += math.comb(n, k) / 2**n
+        if tail > alpha:
+            break
+        k += 1
+    return ordered[max(k - 1, 0)], ordered[min(n - k, n - 1)]
+
+
+def summarize(samples_ms: list[float]) -> dict[str, float]:
+    """Summary statistics for a list of sample durations."""
+    ordered = sorted(samples_ms)
+    ci_low, ci_high = median_ci(ordered)
+    return {
+        "min_ms": ordered[0],
+        "median_ms": statistics.median(ordered),
+        "ci_low_ms": ci_low,
+        "ci_high_ms": ci_high,
+        "mean_ms": statistics.fmean(ordered),
+        "max_ms": ordered[-1],
+        "stdev_ms": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def measure(
+    case: Case,
+    ctx: Any,
+    repeat: int,
+    warmup: int = 1,
+    memory: bool = True,
+    time_budget: float | None = None,
+) -> dict[str, Any]:
+    """Time ``case`` ``repeat`` times (after ``warmup`` runs) and measure its peak memory.
+
+    Sampling stops early once the timed runs exceed ``time_budget``
+    seconds, keeping at least one sample. Peak memory comes from one extra
+    run under tracemalloc, kept separate so tracing overhead does not
+    distort the timings.
+    """
+    for _ in range(warmup):
+        if case.setup:
+            case.setup(ctx)
+        case.run(ctx)
+
+    samples_ms = []
+    for _ in range(repeat):
+        if case.setup:
+            case.setup(ctx)
+        gc.collect()
+        start = time.perf_counter_ns()
+        case.run(ctx)
+        samples_ms.append((time.perf_counter_ns() - start) / 1e6)
+        if time_budget is not None and sum(samples_ms) / 1000 > time_budget:
+            break
+
+    result: dict[str, Any] = {"samples_ms": samples_ms, **summarize(samples_ms)}
+    if memory:
+        if case.setup:
+            case.setup(ctx)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            case.run(ctx)
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
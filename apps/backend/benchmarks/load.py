@@ -0,0 +1,242 @@
+"""Simulate a tasting night against the API and report per-endpoint latency.
+
+The scenario creates a theme, then N virtual tasters arrive with jittered
+timing, submit their scores and keep refreshing the scoreboard until the
+run ends. Targets the ASGI app in-process by default, or a running server
+with ``--url``::
+
+    python -m benchmarks.load --users 40 --duration 30 --poll-interval 2
+    python -m benchmarks.load --url http://localhost:8010 --users 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import httpx
+
+from benchmarks.harness import percentile
+from scripts.generate_dataset import generate_dataset, parse_count
+
+API = "/api/v1"
+
+
+@dataclass
+class Scenario:
+    """Shape of one simulated event."""
+
+    users: int = 40
+    whiskeys: int = 6
+    duration: float = 30.0
+    arrival_window: float = 10.0
+    poll_interval: float = 2.0
+    resubmit_probability: float = 0.2
+    seed: int = 1
+
+
+@dataclass
+class EndpointStats:
+    """Latencies and failures recorded for one endpoint."""
+
+    latencies_ms: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        requests = len(self.latencies_ms)
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": self.errors / requests if requests else 0.0,
+            "throughput_rps": requests / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(self.latencies_ms, 50),
+            "p95_ms": percentile(self.latencies_ms, 95),
+            "p99_ms": percentile(self.latencies_ms, 99),
+            "max_ms": max(self.latencies_ms, default=0.0),
+        }
+
+
+class Recorder:
+    """Send requests and record their latency under an endpoint label."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.stats: dict[str, EndpointStats] = {}
+
+    async def request(self, label: str, method: str, url: str, **kwargs: Any) -> httpx.Response | None:
+        stats = self.stats.setdefault(label, EndpointStats())
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+            stats.errors += 1
+            return None
+        stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            stats.errors += 1
+        return response
+
+
+def _scores(rng: random.Random, whiskey_ids: list[int]) -> dict[str, dict[str, float]]:
+    ranks = rng.sample(range(1, len(whiskey_ids) + 1), len(whiskey_ids))
+    return {
+        str(wid): {
+            "aroma_score": round(rng.uniform(1, 5), 1),
+            "flavor_score": round(rng.uniform(1, 5), 1),
+            "finish_score": round(rng.uniform(1, 5), 1),
+            "personal_rank": rank,
+        }
+        for wid, rank in zip(whiskey_ids, ranks)
+    }
+
+
+async def _taster(
+    recorder: Recorder,
+    scenario: Scenario,
+    index: int,
+    theme_id: int,
+    whiskey_ids: list[int],
+    deadline: float,
+) -> None:
+    rng = random.Random(scenario.seed * 100_003 + index)
+    name = f"Load Taster {index}"
+    scores_url = f"{API}/tastings/themes/{theme_id}/scores"
+
+    await asyncio.sleep(rng.uniform(0, scenario.arrival_window))
+    submission = {"user_name": name, "whiskey_scores": _scores(rng, whiskey_ids)}
+    await recorder.request("POST /tastings", "POST", f"{API}/tastings", json=submission)
+
+    while True:
+        # Jitter of +-50% keeps pollers from synchronising
+        delay = scenario.poll_interval * rng.uniform(0.5, 1.5)
+        if time.monotonic() + delay >= deadline:
+            return
+        await asyncio.sleep(delay)
+        if rng.random() < scenario.resubmit_probability:
+            submission = {"user_name": name, "whiskey_scores": _scores(rng, whiskey_ids)}
+            await recorder.request("POST /tastings", "POST", f"{API}/tastings", json=submission)
+        else:
+            await recorder.request("GET /tastings/themes/{theme_id}/scores", "GET", scores_url)
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario) -> dict[str, Any]:
+    """Run ``scenario`` through ``client`` and return the per-endpoint report."""
+    recorder = Recorder(client)
+    start = time.monotonic()
+
+    response = await recorder.request(
+        "POST /themes", "POST", f"{API}/themes",
+        json={"name": f"Load Test {int(time.time())}", "num_whiskeys": scenario.whiskeys},
+    )
+    if response is None or response.status_code >= 400:
+        raise RuntimeError(f"Could not create theme: {response.text if response is not None else 'no response'}")
+    theme_id = response.json()["theme"]["id"]
+    await recorder.request("PUT /themes/{theme_id}/active", "PUT", f"{API}/themes/{theme_id}/active")
+    response = await recorder.request("GET /themes/{theme_id}/whiskeys", "GET", f"{API}/themes/{theme_id}/whiskeys")
+    whiskey_ids = [w["id"] for w in response.json()]
+
+    deadline = start + scenario.duration
+    await asyncio.gather(*(
+        _taster(recorder, scenario, i, theme_id, whiskey_ids, deadline)
+        for i in range(1, scenario.users + 1)
+    ))
+    elapsed = time.monotonic() - start
+
+    return {
+        "scenario": vars(scenario),
+        "theme_id": theme_id,
+        "elapsed_s": elapsed,
+        "endpoints": {label: stats.summary(elapsed) for label, stats in sorted(recorder.stats.items())},
+    }
+
+
+@asynccontextmanager
+async def in_process_client() -> AsyncIterator[httpx.AsyncClient]:
+    """Client calling the ASGI app directly, with its lifespan running."""
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            yield client
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Render the per-endpoint report as a text table."""
+    lines = [
+        f"{report['scenario']['users']} tasters over {report['elapsed_s']:.1f}s",
+        f"{'endpoint':<40} {'reqs':>6} {'err%':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}",
+    ]
+    for label, s in report["endpoints"].items():
+        lines.append(
+            f"{label:<40} {s['requests']:>6} {s['error_rate'] * 100:>5.1f}% {s['throughput_rps']:>7.1f}"
+            f" {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+async def _main(args: argparse.Namespace) -> dict[str, Any]:
+    scenario = Scenario(
+        users=args.users,
+        whiskeys=args.whiskeys,
+        duration=args.duration,
+        arrival_window=args.arrival_window,
+        poll_interval=args.poll_interval,
+        resubmit_probability=args.resubmit_probability,
+        seed=args.seed,
+    )
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await run_scenario(client, scenario)
+    async with in_process_client() as client:
+        return await run_scenario(client, scenario)
+
+
+def main(argv: list[str] | None = None) -> int:
+    defaults = Scenario()
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running server (default: drive the app in-process)")
+    parser.add_argument("--users", type=int, default=defaults.users, help="virtual tasters")
+    parser.add_argument("--whiskeys", type=int, default=defaults.whiskeys, help="whiskeys in the theme")
+    parser.add_argument("--duration", type=float, default=defaults.duration, help="length of the event in seconds")
+    parser.add_argument("--arrival-window", type=float, default=defaults.arrival_window, help="seconds over which tasters submit")
+    parser.add_argument("--poll-interval", type=float, default=defaults.poll_interval, help="mean seconds between scoreboard refreshes")
+    parser.add_argument("--resubmit-probability", type=float, default=defaults.resubmit_probability, help="chance a refresh is a score change instead")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--history", type=parse_count, help="pre-load this many generated tastings (in-process only, e.g. 100k)")
+    parser.add_argument("--json", type=argparse.FileType("w"), help="also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    if args.history and args.url:
+        parser.error("--history pre-loads the in-process app; it cannot fill a server at --url")
+    if args.history and "DATA_DIR" in os.environ:
+        # Never generate over a database someone pointed us at
+        parser.error("--history generates into a fresh temporary DATA_DIR; unset DATA_DIR to use it")
+
+    if not args.url and "DATA_DIR" not in os.environ:
+        # Keep in-process runs away from the real database and the report readable
+        os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="wt-load-")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        if args.history:
+            generate_dataset(Path(os.environ["DATA_DIR"]) / "database.json", tastings=args.history)
+
+    report = asyncio.run(_main(args))
+    print(format_report(report))
+    if args.json:
+        json.dump(report, args.json, indent=2)
+    failed = sum(s["errors"] for s in report["endpoints"].values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
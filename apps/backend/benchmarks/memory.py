@@ -0,0 +1,89 @@
+"""Memory report for a generated database, checked against per-tasting budgets.
+
+    python -m benchmarks.memory --tastings 10k
+    python -m benchmarks.memory --tastings 100k --no-all-themes --json memory.json
+
+Exits 1 when an operation's peak allocation exceeds its budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+
+from app.memory import MemoryUsage, memory_report
+from benchmarks.database import BenchContext
+from scripts.generate_dataset import parse_count
+
+# Peak bytes allowed per tasting in the database, on top of FIXED_ALLOWANCE.
+# Measured at about 0.9 KB per tasting for a full load (the parsed JSON) and
+# 2.5-3 KB for the all-themes scoreboard (dicts, then models, then JSON).
+MEMORY_BUDGETS = {
+    "load_database": 1_200,
+    "get_theme_scores": 1_300,
+    "get_all_themes_scores": 3_500,
+}
+FIXED_ALLOWANCE = 2 * 1024 * 1024
+
+
+def budget_for(name: str, tastings: int) -> int | None:
+    """Peak allocation budget of operation ``name`` at ``tastings`` rows."""
+    per_tasting = MEMORY_BUDGETS.get(name)
+    return None if per_tasting is None else FIXED_ALLOWANCE + per_tasting * tastings
+
+
+def check_budgets(usages: list[MemoryUsage], tastings: int) -> list[str]:
+    """Describe every operation whose peak exceeds its budget."""
+    violations = []
+    for usage in usages:
+        budget = budget_for(usage.name, tastings)
+        if budget is not None and usage.peak_bytes > budget:
+            violations.append(f"{usage.name}: peak {usage.peak_bytes / 2**20:.1f} MiB > budget {budget / 2**20:.1f} MiB")
+    return violations
+
+
+def run_report(tastings: int, include_all_themes: bool = True) -> list[MemoryUsage]:
+    """Generate a database of ``tastings`` rows and measure it."""
+    with tempfile.TemporaryDirectory(prefix="wt-memory-") as workdir:
+        ctx = BenchContext(Path(workdir), tastings)
+        try:
+            return ctx.loop.run_until_complete(
+                memory_report(ctx.db, theme_id=ctx.theme_id, include_all_themes=include_all_themes)
+            )
+        finally:
+            ctx.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.memory", description=__doc__.splitlines()[0])
+    parser.add_argument("--tastings", type=parse_count, default=10_000, help="dataset size (default 10k)")
+    parser.add_argument("--no-all-themes", action="store_true", help="skip the all-themes scoreboard (slow at scale)")
+    parser.add_argument("--json", type=Path, help="also write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    # tracemalloc slows everything down; slow-operation warnings are expected
+    logging.basicConfig(level=logging.ERROR)
+    usages = run_report(args.tastings, include_all_themes=not args.no_all_themes)
+
+    print(f"{'operation':<24} {'peak MiB':>10} {'retained MiB':>13} {'budget MiB':>11}")
+    for usage in usages:
+        budget = budget_for(usage.name, args.tastings)
+        budget_text = f"{budget / 2**20:11.1f}" if budget is not None else f"{'-':>11}"
+        print(f"{usage.name:<24} {usage.peak_bytes / 2**20:10.1f} {usage.retained_bytes / 2**20:13.1f} {budget_text}")
+    if args.json:
+        report = {"tastings": args.tastings, "operations": [asdict(u) for u in usages]}
+        args.json.write_text(json.dumps(report, indent=2) + "\n")
+
+    violations = check_budgets(usages, args.tastings)
+    for violation in violations:
+        print(f"Over budget: {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Disk size versus CPU for every storage codec and compression mode.
+
+    python -m benchmarks.storage --tastings 100k
+    python -m benchmarks.storage --tastings 1m --repeat 3 --json storage.json
+
+For each combination the same generated database is stored, then a full
+read (parse) and a full write (serialise, compress, fsync) are timed. Every
+change rewrites the whole file, so the write column is the per-change cost
+and the size column is what the volume and its backups hold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from app.compression import COMPRESSIONS
+from app.storage import STORAGE_FORMATS, OrjsonStorage, storage_class
+from benchmarks.database import CASES, BenchContext
+from benchmarks.harness import measure
+from scripts.generate_dataset import parse_count
+
+
+def _available(storage: str, compression: str) -> bool:
+    if storage == "orjson" and storage_class("orjson") is not OrjsonStorage:
+        return False
+    if compression == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            return False
+    return True
+
+
+def run_matrix(tastings: int, repeat: int = 5) -> list[dict[str, Any]]:
+    """Measure file size, read and write time of every available combination."""
+    cases = {case.name: case for case in CASES}
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="wt-storage-") as workdir:
+        for storage, compression in itertools.product(STORAGE_FORMATS, COMPRESSIONS):
+            if not _available(storage, compression):
+                rows.append({"storage": storage, "compression": compression, "skipped": "not installed"})
+                continue
+            ctx = BenchContext(Path(workdir), tastings, storage=storage, compression=compression)
+            try:
+                read = measure(cases["storage_read"], ctx, repeat, memory=False)
+                write = measure(cases["storage_write"], ctx, repeat, memory=False)
+                # As written by this codec (orjson output is more compact)
+                file_bytes = ctx.path.stat().st_size
+            finally:
+                ctx.close()
+            rows.append({
+                "storage": storage,
+                "compression": compression,
+                "file_bytes": file_bytes,
+                "read_ms": read["median_ms"],
+                "write_ms": write["median_ms"],
+            })
+    return rows
+
+
+def format_matrix(rows: list[dict[str, Any]]) -> str:
+    """Render the matrix as a text table, sizes relative to plain json."""
+    plain = next((r["file_bytes"] for r in rows if r.get("compression") == "none" and "file_bytes" in r), None)
+    lines = [f"{'storage':<8} {'compression':<12} {'size MiB':>9} {'ratio':>6} {'read ms':>9} {'write ms':>9}"]
+    for row in rows:
+        if "skipped" in row:
+            lines.append(f"{row['storage']:<8} {row['compression']:<12} skipped ({row['skipped']})")
+            continue
+        ratio = f"{row['file_bytes'] / plain:6.2f}" if plain else f"{'-':>6}"
+        lines.append(
+            f"{row['storage']:<8} {row['compression']:<12} {row['file_bytes'] / 2**20:9.1f} {ratio}"
+            f" {row['read_ms']:9.1f} {row['write_ms']:9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.storage", description=__doc__.splitlines()[0])
+    parser.add_argument("--tastings", type=parse_count, default=100_000, help="dataset size (default 100k)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed samples per operation (default 5)")
+    parser.add_argument("--json", type=Path, help="also write the rows as JSON here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    rows = run_matrix(args.tastings, args.repeat)
+    print(format_matrix(rows))
+    if args.json:
+        args.json.write_text(json.dumps({"tastings": args.tastings, "results": rows}, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Move the tastings of old themes out of database.json into archive files.
+
+Archived themes stay listed and their scoreboards keep working: their
+tastings are read from ``database.archive/`` when asked for. Scoring an
+archived theme again, or making it the active one, moves it back. Stop
+the backend first, or use ``POST /api/v1/admin/archive`` while it runs.
+
+    python -m scripts.archive_themes --older-than-days 365
+    python -m scripts.archive_themes --db /tmp/database.json --older-than-days 90
+    python -m scripts.archive_themes --restore 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Allow running as `python scripts/archive_themes.py` from `apps/backend/`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.database import Database  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--db", type=Path, default=None, help="Path to database.json. Defaults to settings.db_path.")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--older-than-days", type=int, help="Archive themes created more than this many days ago.")
+    action.add_argument("--restore", type=int, metavar="THEME_ID", help="Move an archived theme back.")
+    args = parser.parse_args(argv)
+
+    path = args.db or settings.db_path
+    if not path.exists():
+        print(f"{path} does not exist.", file=sys.stderr)
+        return 1
+    db = Database(path)
+    try:
+        before = path.stat().st_size
+        if args.restore is not None:
+            if not db.restore_theme(args.restore):
+                print(f"Theme {args.restore} is not archived.", file=sys.stderr)
+                return 1
+            print(f"Restored theme {args.restore} into {path}")
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+        archived = db.archive_themes(cutoff)
+    finally:
+        db.close()
+    print(f"Archived {len(archived)} themes into {db.archive_dir}")
+    print(f"{path}: {before} -> {path.stat().st_size} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+"""Convert a database file between plain JSON, gzip and zstd.
+
+The input's compression is detected from its magic bytes. The content is
+streamed through without being parsed, so even large files convert in
+constant memory. By default the file is rewritten in place (atomically,
+through a temp file in the same directory); stop the backend first, or it
+may overwrite the result with its next write.
+
+    python -m scripts.convert_database --to zstd                 # default DB
+    python -m scripts.convert_database --db /tmp/database.json --to none
+    python -m scripts.convert_database --db data/database.json --to gzip --output /tmp/db.json.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Allow running as `python scripts/convert_database.py` from `apps/backend/`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.compression import COMPRESSIONS, copy_stream, detect_file, open_reader  # noqa: E402
+from app.config import settings  # noqa: E402
+
+
+def convert(source: Path, destination: Path, method: str, level: int | None = None) -> None:
+    """Write ``source`` to ``destination`` compressed with ``method``, replacing it atomically."""
+    fd, tmp_name = tempfile.mkstemp(dir=destination.parent, prefix=f".{destination.name}.", suffix=".tmp")
+    try:
+        with open_reader(source) as reader, os.fdopen(fd, "wb") as writer:
+            copy_stream(reader, writer, method, level)
+            writer.flush()
+            os.fsync(writer.fileno())
+        os.replace(tmp_name, destination)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--db", type=Path, default=None, help="Path to database.json. Defaults to settings.db_path.")
+    parser.add_argument("--to", choices=COMPRESSIONS, required=True, help="Target compression.")
+    parser.add_argument("--level", type=int, help="Compression level (default 3 for gzip and zstd).")
+    parser.add_argument("--output", type=Path, help="Write here instead of converting in place.")
+    args = parser.parse_args(argv)
+
+    source = args.db or settings.db_path
+    if not source.exists():
+        print(f"{source} does not exist.", file=sys.stderr)
+        return 1
+    current = detect_file(source)
+    destination = args.output or source
+    if current == args.to and destination == source:
+        print(f"{source} is already {args.to}; nothing to do.")
+        return 0
+
+    before = source.stat().st_size
+    convert(source, destination, args.to, args.level)
+    after = destination.stat().st_size
+    print(f"Converted {source} ({current}, {before} bytes) to {destination} ({args.to}, {after} bytes)")
+    print(f"Set DB_COMPRESSION={args.to} so the backend keeps writing this format.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+"""Generate a realistic synthetic database for scale and regression testing.
+
+Writes TinyDB's storage format directly (no Database calls), so millions of
+tastings take seconds. The history is a run of themes every couple of
+weeks. Each theme has 5-20 whiskeys and is attended by a skewed subset of
+a few hundred tasters: a core of regulars plus a long tail of occasional
+guests. Scores combine each whiskey's quality, each taster's personal
+bias and per-tasting noise. Output is deterministic for a given seed.
+
+    python -m scripts.generate_dataset --output /tmp/database.json --years 3
+    python -m scripts.generate_dataset --output /tmp/database.json --tastings 1m
+    python -m scripts.generate_dataset --output data/database.json --force
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+THEMES_PER_YEAR = 26
+MIN_WHISKEYS, MAX_WHISKEYS = 5, 20
+MIN_ATTENDANCE, MAX_ATTENDANCE = 8, 40
+# Participation weight of the i-th most regular taster is 1 / i**ZIPF_EXPONENT
+ZIPF_EXPONENT = 1.1
+DEFAULT_END = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+FIRST_NAMES = [
+    "Alex", "Bailey", "Casey", "Dana", "Eli", "Frankie", "Gray", "Harper", "Indy", "Jordan",
+    "Kai", "Logan", "Morgan", "Noel", "Oakley", "Parker", "Quinn", "Riley", "Sage", "Taylor",
+    "Upton", "Val", "Wren", "Xan", "Yael", "Zion", "Avery", "Blair", "Cameron", "Drew",
+]
+LAST_NAMES = [
+    "Anders", "Brooks", "Carter", "Dalton", "Ellis", "Fischer", "Grant", "Hayes", "Irwin", "Jensen",
+    "Keller", "Lowe", "Mercer", "Nash", "Olsen", "Price", "Quincy", "Reyes", "Stone", "Tate",
+]
+DISTILLERIES = [
+    "Buffalo Trace", "Wild Turkey", "Four Roses", "Maker's Mark", "Heaven Hill", "Woodford Reserve",
+    "Lagavulin", "Laphroaig", "Glenfiddich", "Macallan", "Redbreast", "Yamazaki", "Hakushu",
+    "Balvenie", "Ardbeg", "Talisker", "Knob Creek", "Old Forester", "Booker's", "Westland",
+]
+STYLES = ["Bourbon", "Rye", "Single Malt", "Single Pot Still", "Cask Strength", "Port Finish", "Sherry Cask"]
+THEME_NAMES = ["Bourbon Night", "Islay Smoke", "Rye Revival", "Cask Strength", "Japanese Whisky", "Irish Pot Still",
+               "Sherry Bombs", "Bottled in Bond", "Blind Flight", "Under $40", "Wheated Bourbon", "Speyside"]
+
+
+def parse_count(value: str) -> int:
+    """Parse ``"10k"``/``"1m"``/``"2500"`` into an integer."""
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    number = value[:-1] if multiplier > 1 else value
+    return int(float(number) * multiplier)
+
+
+def _taster_names(count: int) -> list[str]:
+    names = [f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES]
+    if count <= len(names):
+        return names[:count]
+    return [f"{names[i % len(names)]} {i // len(names) + 1}" if i >= len(names) else names[i] for i in range(count)]
+
+
+def _attendees(rng: random.Random, weights: list[float], count: int) -> list[int]:
+    """Pick ``count`` distinct taster indexes, favouring heavy participants."""
+    population = range(len(weights))
+    chosen: dict[int, None] = {}
+    while len(chosen) < count:
+        chosen.update(dict.fromkeys(rng.choices(population, weights, k=count * 2)))
+    return list(chosen)[:count]
+
+
+def generate_dataset(
+    path: Path,
+    tastings: int | None = None,
+    years: float = 3.0,
+    tasters: int = 300,
+    seed: int = 42,
+    end: datetime = DEFAULT_END,
+) -> dict[str, int]:
+    """Write a synthetic database to ``path`` and return rows written per table.
+
+    With ``tastings`` set, themes keep being added (and the history gets
+    longer than ``years``) until exactly that many tastings exist;
+    otherwise ``years`` of fortnightly themes are generated.
+    """
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) ** ZIPF_EXPONENT for i in range(tasters)]
+    rng.shuffle(weights)
+    bias = [rng.gauss(0, 0.4) for _ in range(tasters)]
+    max_attendance = min(MAX_ATTENDANCE, tasters)
+    min_attendance = min(MIN_ATTENDANCE, max_attendance)
+
+    if tastings is not None:
+        per_theme = (MIN_WHISKEYS + MAX_WHISKEYS) / 2 * (min_attendance + max_attendance) / 2
+        num_themes = None
+        expected_themes = max(1, round(tastings / per_theme))
+    else:
+        num_themes = max(1, round(years * THEMES_PER_YEAR))
+        expected_themes = num_themes
+    interval = timedelta(days=365 / THEMES_PER_YEAR)
+    start = end - interval * expected_themes
+
+    themes: dict[str, Any] = {}
+    whiskeys: dict[str, Any] = {}
+    rows: dict[str, Any] = {}
+    first_seen: dict[int, str] = {}
+    whiskey_id = tasting_id = theme_id = 0
+    gauss = rng.gauss
+
+    def score(base: float) -> float:
+        return round(min(5.0, max(1.0, gauss(base, 0.5))), 1)
+
+    while (len(rows) < tastings) if tastings is not None else (theme_id < num_themes):
+        theme_id += 1
+        event = start + interval * (theme_id - 1) + timedelta(hours=rng.uniform(-48, 48))
+        theme_created = event.isoformat()
+        themes[str(theme_id)] = {
+            "id": theme_id,
+            "name": f"{rng.choice(THEME_NAMES)} #{theme_id}",
+            "notes": "",
+            "created_at": theme_created,
+        }
+
+        quality = {}
+        for _ in range(rng.randint(MIN_WHISKEYS, MAX_WHISKEYS)):
+            whiskey_id += 1
+            quality[whiskey_id] = rng.gauss(3.3, 0.6)
+            whiskeys[str(whiskey_id)] = {
+                "id": whiskey_id,
+                "theme_id": theme_id,
+                "name": f"{rng.choice(DISTILLERIES)} {rng.choice(STYLES)}",
+                "proof": round(rng.uniform(80, 140), 1) if rng.random() < 0.9 else None,
+                "created_at": theme_created,
+            }
+
+        for taster in _attendees(rng, weights, rng.randint(min_attendance, max_attendance)):
+            submitted = (event + timedelta(minutes=rng.uniform(30, 180))).isoformat()
+            first_seen.setdefault(taster, submitted)
+            scored = []
+            for wid, q in quality.items():
+                base = q + bias[taster]
+                scored.append((wid, score(base), score(base), score(base - 0.2)))
+            # Personal rank follows the taster's own average, best first
+            ranked = sorted(scored, key=lambda s: s[1] + s[2] + s[3], reverse=True)
+            for rank, (wid, aroma, flavor, finish) in enumerate(ranked, start=1):
+                tasting_id += 1
+                rows[str(tasting_id)] = {
+                    "user_id": taster + 1,
+                    "whiskey_id": wid,
+                    "aroma_score": aroma,
+                    "flavor_score": flavor,
+                    "finish_score": finish,
+                    "personal_rank": rank,
+                    "updated_at": submitted,
+                    "created_at": submitted,
+                    "id": tasting_id,
+                }
+                if tastings is not None and tasting_id == tastings:
+                    break
+            if tastings is not None and tasting_id == tastings:
+                break
+
+    never_attended = start.isoformat()
+    users = {
+        str(i + 1): {"id": i + 1, "name": name, "created_at": first_seen.get(i, never_attended)}
+        for i, name in enumerate(_taster_names(tasters))
+    }
+
+    data = {"themes": themes, "whiskeys": whiskeys, "users": users, "tastings": rows}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # json.dumps uses the C encoder; json.dump streams through the pure-Python one
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return {name: len(table) for name, table in data.items()}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--output", type=Path, required=True, help="Path of the database.json to write.")
+    parser.add_argument("--tastings", type=parse_count, help="Exact number of tastings (e.g. 100k, 1m). Overrides --years.")
+    parser.add_argument("--years", type=float, default=3.0, help="Years of fortnightly themes (default 3).")
+    parser.add_argument("--tasters", type=int, default=300, help="Size of the taster pool (default 300).")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default 42).")
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing file.")
+    args = parser.parse_args(argv)
+
+    if args.output.exists() and not args.force:
+        print(f"{args.output} already exists; pass --force to overwrite it.", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    counts = generate_dataset(args.output, tastings=args.tastings, years=args.years, tasters=args.tasters, seed=args.seed)
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{count} {table}" for table, count in counts.items())
+    print(f"Wrote {summary} to {args.output} in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
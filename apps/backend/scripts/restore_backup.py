@@ -0,0 +1,142 @@
+"""Restore the database from the online backups in data/backups.
+
+Rebuilds the state from the last full backup and the deltas after it (up
+to ``--at``), checking that each delta continues the one before, and writes
+it with the configured DB_STORAGE, DB_COMPRESSION and DB_LAYOUT. Archived
+themes get their archive files back; in the sharded layout their tastings
+return to the theme files instead. Restoring in place keeps the current
+file as ``database.json.pre-restore`` (and the shards and archives as
+``database.shards.pre-restore`` and ``database.archive.pre-restore``); stop
+the backend first, or it may overwrite the result with its next write.
+
+    python -m scripts.restore_backup --list
+    python -m scripts.restore_backup                                  # newest backup
+    python -m scripts.restore_backup --at 20261019T130000000000Z-delta.json.gz
+    python -m scripts.restore_backup --backups data/backups/highland --db data/tenants/highland.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# Allow running as `python scripts/restore_backup.py` from `apps/backend/`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.archive import archive_dir, archive_method, split_archives, write_archive  # noqa: E402
+from app.backups import BackupError, list_backups, restore_state  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.shards import flatten_state, has_shards, shard_dir, write_sharded  # noqa: E402
+from app.storage import storage_for  # noqa: E402
+
+
+def write_state(state: dict, destination: Path) -> None:
+    """Write a restored state to ``destination`` with the configured storage and layout."""
+    storage_cls, options = storage_for(settings.db_storage, settings.db_compression)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    state, archives = split_archives(state)
+    if settings.db_layout == "sharded":
+        write_sharded(unarchive(state, archives), destination, storage_cls, options)
+        return
+    if has_shards(state):
+        state = flatten_state(state)
+    state = write_archives(state, archives, destination)
+    storage = storage_cls(str(destination), **options)
+    try:
+        storage.write(state)
+    finally:
+        storage.close()
+
+
+def write_archives(state: dict, archives: dict[int, list[dict]], destination: Path) -> dict:
+    """Write the archive files of ``state`` next to ``destination``; returns the state to write.
+
+    A record whose tastings are not in the backup keeps the file already
+    there; without one the record is dropped, with a warning. Files no
+    record names are removed.
+    """
+    directory = archive_dir(destination)
+    records = {}
+    for doc_id, record in state.get("archives", {}).items():
+        path = directory / record["file"]
+        if record["theme_id"] in archives:
+            write_archive(path, record["theme_id"], archives[record["theme_id"]], archive_method(record["file"]))
+        elif not path.exists():
+            print(f"No archive of theme {record['theme_id']} in the backup or at {path}; "
+                  "dropping its archive record", file=sys.stderr)
+            continue
+        records[doc_id] = record
+    if directory.is_dir():
+        kept = {record["file"] for record in records.values()}
+        for path in directory.iterdir():
+            if path.name not in kept:
+                path.unlink()
+    return {**state, "archives": records} if "archives" in state else state
+
+
+def unarchive(state: dict, archives: dict[int, list[dict]]) -> dict:
+    """``state`` with its archived tastings back among the others and no archive records.
+
+    Tastings keep their ids unless another tasting has the same one.
+    """
+    if not archives and "archives" not in state:
+        return state
+    tastings = dict(state.get("tastings", {}))
+    archived = [tasting for _, theme_tastings in sorted(archives.items()) for tasting in theme_tastings]
+    next_id = max([*(int(doc_id) for doc_id in tastings), *(t["id"] for t in archived)], default=0)
+    for tasting in archived:
+        if str(tasting["id"]) in tastings:
+            next_id += 1
+            tasting = {**tasting, "id": next_id}
+        tastings[str(tasting["id"])] = tasting
+    state = {table: documents for table, documents in state.items() if table != "archives"}
+    return {**state, "tastings": tastings}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--backups", type=Path, default=None, help="Backup directory. Defaults to settings.backup_dir.")
+    parser.add_argument("--db", type=Path, default=None, help="Database to restore. Defaults to settings.db_path.")
+    parser.add_argument("--at", help="Restore as of this backup (default the newest).")
+    parser.add_argument("--output", type=Path, help="Write here instead of replacing the database.")
+    parser.add_argument("--list", action="store_true", help="List the backups and exit.")
+    args = parser.parse_args(argv)
+
+    backups = args.backups or settings.backup_dir
+    if args.list:
+        for info in list_backups(backups):
+            print(f"{info.name}  {info.kind:<5}  {info.size_bytes:>12} bytes")
+        return 0
+
+    try:
+        state = restore_state(backups, args.at)
+    except BackupError as e:
+        print(f"Restore failed: {e}", file=sys.stderr)
+        return 1
+
+    destination = args.output or args.db or settings.db_path
+    if args.output is None and destination.exists():
+        keep = destination.with_name(destination.name + ".pre-restore")
+        shutil.copy2(destination, keep)
+        print(f"Kept the current database as {keep}")
+        shards = shard_dir(destination)
+        if shards.is_dir():
+            kept_shards = shards.with_name(shards.name + ".pre-restore")
+            shutil.rmtree(kept_shards, ignore_errors=True)
+            shutil.copytree(shards, kept_shards)
+        archives = archive_dir(destination)
+        if archives.is_dir():
+            kept_archives = archives.with_name(archives.name + ".pre-restore")
+            shutil.rmtree(kept_archives, ignore_errors=True)
+            shutil.copytree(archives, kept_archives)
+    write_state(state, destination)
+    documents = sum(len(table) for table in state.values())
+    print(f"Restored {documents} documents from {backups} to {destination} ({os.path.getsize(destination)} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,82 @@
+"""Convert a database between the single-file and the sharded layout.
+
+Splitting moves each theme's whiskeys and tastings into
+``database.shards/theme-<id>.json`` and leaves users, themes and a
+whiskey index in ``database.json``; ``--merge`` joins them back into one
+file. Both write with the configured DB_STORAGE and DB_COMPRESSION and
+can be re-run if interrupted. Stop the backend first, then set DB_LAYOUT
+to match.
+
+    python -m scripts.shard_database                        # split data/database.json
+    python -m scripts.shard_database --merge
+    python -m scripts.shard_database --db data/tenants/highland.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+from pathlib import Path
+
+# Allow running as `python scripts/shard_database.py` from `apps/backend/`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.shards import (  # noqa: E402
+    SHARD_TABLES,
+    flatten_state,
+    read_sharded,
+    shard_dir,
+    split_state,
+    write_sharded,
+)
+from app.storage import decode_state, storage_for  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--db", type=Path, default=None, help="Path to database.json. Defaults to settings.db_path.")
+    parser.add_argument("--merge", action="store_true", help="Join the shards back into a single file.")
+    args = parser.parse_args(argv)
+
+    path = args.db or settings.db_path
+    if not path.exists():
+        print(f"{path} does not exist.", file=sys.stderr)
+        return 1
+    storage_cls, options = storage_for(settings.db_storage, settings.db_compression)
+    state = decode_state(path.read_bytes())
+    single = any(table in state for table in SHARD_TABLES)
+
+    if args.merge:
+        if single:
+            print(f"{path} is already a single file; nothing to do.")
+            return 0
+        flat = flatten_state(read_sharded(path))
+        storage = storage_cls(str(path), **options)
+        try:
+            storage.write(flat)
+        finally:
+            storage.close()
+        shutil.rmtree(shard_dir(path), ignore_errors=True)
+        print(f"Merged {len(flat.get('themes', {}))} themes into {path} ({path.stat().st_size} bytes)")
+        print("Set DB_LAYOUT=single so the backend reads this file.")
+        return 0
+
+    if not single:
+        print(f"{path} is already sharded; nothing to do.")
+        return 0
+    before = path.stat().st_size
+    tastings = len(state.get("tastings", {}))
+    shards = write_sharded(state, path, storage_cls, options)
+    kept = sum(len(shard.get("tastings", {})) for shard in split_state(state)[1].values())
+    print(f"Split {path} ({before} bytes) into {shards} theme shards in {shard_dir(path)}")
+    print(f"{path}: {before} -> {path.stat().st_size} bytes")
+    if kept != tastings:
+        print(f"Left out {tastings - kept} tastings of deleted whiskeys.")
+    print("Set DB_LAYOUT=sharded so the backend keeps this layout.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
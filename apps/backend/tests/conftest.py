@@ -10,7 +10,7 @@ from fastapi.testclient import TestClient
 import httpx
 
 from app.database import Database
-from app.main import app as fastapi_app
+from app.main import create_app
 
 
 @pytest.fixture
@@ -65,9 +65,8 @@ def sample_users(test_db):
 @pytest.fixture
 def test_client():
     """FastAPI test client with test database and sample data."""
-    # Create test database
-    temp_db_path = Path(tempfile.NamedTemporaryFile(suffix=".json", delete=False).name)
-    test_db = Database(temp_db_path)
+    # In-memory store: nothing shared between tests, so they can run in parallel
+    test_db = Database(in_memory=True)
 
     # Create sample data
     sample_theme = test_db.create_theme("Test Theme", "A theme for testing")
@@ -85,25 +84,13 @@ def test_client():
         user = test_db.get_or_create_user(name)
         sample_users.append(user)
 
-    # Override the global db with test db
-    import app.database
-    original_db = app.database.db
-    app.database.db = test_db
-
-    # Make sample data available as attributes on the client
-    with TestClient(fastapi_app) as client:
+    # Serve the test db from a fresh app instance
+    with TestClient(create_app(database=test_db)) as client:
         client.sample_theme = sample_theme
         client.sample_whiskeys = sample_whiskeys
         client.sample_users = sample_users
         yield client
 
-    # Restore original db
-    app.database.db = original_db
-
-    # Cleanup
-    if temp_db_path.exists():
-        temp_db_path.unlink()
-
 
 @pytest.fixture
 def sample_theme(test_client):
@@ -1,5 +1,7 @@
 """API endpoint tests."""
 
+from unittest.mock import patch
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -16,6 +18,30 @@ class TestHealthAPI:
         data = response.json()
         assert data["status"] == "healthy"
 
+    def test_liveness_does_not_touch_database(self, test_client):
+        """Test the liveness probe never reads the database."""
+        with patch("app.database.Database.get_stats") as get_stats:
+            response = test_client.get("/api/v1/health/live")
+        assert response.status_code == 200
+        assert response.json()["status"] == "healthy"
+        get_stats.assert_not_called()
+
+    def test_readiness(self, test_client):
+        """Test the readiness probe reports each storage check."""
+        response = test_client.get("/api/v1/health/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert all(data["checks"].values())
+
+    def test_readiness_unavailable(self, test_client):
+        """Test the readiness probe fails when storage is not writable."""
+        checks = {"directory_writable": False, "database_accessible": True}
+        with patch("app.database.Database.check_storage", return_value=checks):
+            response = test_client.get("/api/v1/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "unavailable"
+
     def test_status_endpoint(self, test_client):
         """Test status endpoint."""
         response = test_client.get("/api/v1/status")
@@ -0,0 +1,161 @@
+"""Tests for archiving cold themes into separate files and loading them on demand."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.config import settings
+from app.database import Database
+from app.main import create_app
+from app.routers import tastings as tastings_router
+from scripts.archive_themes import main as archive_main
+
+LONG_AGO = "2020-01-01T00:00:00+00:00"
+
+
+def _scores(db: Database, theme_id: int) -> dict:
+    return asyncio.run(tastings_router.get_theme_scores(theme_id, db)).model_dump()
+
+
+@pytest.fixture
+def seeded(test_db):
+    """An old theme with two tasters, and a current one."""
+    old = test_db.create_theme("Old Speyside")
+    test_db.update_theme(old["id"], {"created_at": LONG_AGO})
+    whiskeys = [test_db.create_whiskey(old["id"], f"Cask {i}", 46.0) for i in range(2)]
+    for name in ("Ada", "Grace"):
+        user = test_db.get_or_create_user(name)
+        for whiskey in whiskeys:
+            test_db.create_or_update_tasting(user["id"], whiskey["id"], 4.0, 3.5, 3.0, 1)
+    current = test_db.create_theme("Tonight")
+    test_db.create_whiskey(current["id"], "New Make", 63.5)
+    return old, whiskeys, current
+
+
+def _archive(db: Database) -> list[int]:
+    return db.archive_themes(datetime.now(timezone.utc) - timedelta(days=30))
+
+
+class TestArchiveThemes:
+    """Test moving tastings out of the hot file and reading them back."""
+
+    def test_archived_theme_reads_the_same(self, test_db, seeded):
+        """Test scoreboards and stats are unchanged while the hot file loses the tastings."""
+        old, _, current = seeded
+        before_scores = _scores(test_db, old["id"])
+        before_stats = test_db.get_stats()
+        size = test_db.db_path.stat().st_size
+
+        assert _archive(test_db) == [old["id"]]
+        assert _archive(test_db) == []
+        assert len(test_db.tastings) == 0
+        assert test_db.db_path.stat().st_size < size
+        assert (test_db.archive_dir / "theme-1.json.gz").exists()
+        assert _scores(test_db, old["id"]) == before_scores
+        assert test_db.get_stats() == {**before_stats, "archived_themes": 1}
+        assert test_db.get_archive(current["id"]) is None
+
+        archive = test_db.list_archives()[0]
+        assert archive["tastings"] == 4
+        assert archive["user_ids"] == [1, 2]
+        assert archive["whiskeys"]["1"] == {"tastings": 2, "average_score": 3.5}
+
+    def test_archive_caches_are_bounded(self, test_db, seeded, monkeypatch):
+        """Test scoreboards reuse an archive read once, yet keep at most ARCHIVE_CACHE_SIZE themes in memory."""
+        old, _, current = seeded
+        monkeypatch.setattr(settings, "archive_cache_size", 1)
+        second = test_db.create_theme("Old Islay")
+        test_db.update_theme(second["id"], {"created_at": LONG_AGO})
+        whiskey = test_db.create_whiskey(second["id"], "Cask 9", 46.0)
+        test_db.create_or_update_tasting(1, whiskey["id"], 2.0, 2.0, 2.0, 1)
+        test_db.set_active_theme(current["id"])
+        assert len(_archive(test_db)) == 2
+
+        loads = metrics.archive_loads_total.value()
+        for _ in range(3):
+            _scores(test_db, old["id"])
+        assert metrics.archive_loads_total.value() == loads + 1
+        asyncio.run(tastings_router.get_all_themes_scores(test_db))
+        assert list(test_db._archive_columns) == [second["id"]]
+        assert len(test_db._archive_cache) == 0
+
+        test_db.delete_user(2)
+        assert sum(len(w["scores"]) for w in _scores(test_db, old["id"])["whiskeys"]) == 2
+        assert test_db.get_archive(old["id"])["whiskeys"]["1"]["tastings"] == 1
+
+    def test_writes_bring_a_theme_back(self, test_db, seeded):
+        """Test scoring an archived theme restores its tastings with their ids first."""
+        old, whiskeys, _ = seeded
+        ids = sorted(t["id"] for t in test_db.get_tastings_by_theme(old["id"]))
+        _archive(test_db)
+
+        user = test_db.get_user_by_name("Ada")
+        test_db.create_or_update_tasting(user["id"], whiskeys[0]["id"], 5.0, 5.0, 5.0, 1)
+        assert test_db.get_archive(old["id"]) is None
+        assert not (test_db.archive_dir / "theme-1.json.gz").exists()
+        tastings = test_db.get_tastings_by_theme(old["id"])
+        assert sorted(t["id"] for t in tastings) == ids
+        assert [t.doc_id for t in tastings] == [t["id"] for t in tastings]
+        assert test_db.get_user_tastings_for_theme(user["id"], old["id"])[0]["aroma_score"] == 5.0
+
+    def test_deletes_reach_into_archives(self, test_db, seeded):
+        """Test deleting a user rewrites the archives and deleting a theme removes its file."""
+        old, _, _ = seeded
+        _archive(test_db)
+
+        test_db.delete_user(test_db.get_user_by_name("Ada")["id"])
+        assert test_db.get_archive(old["id"])["tastings"] == 2
+        test_db.close()
+        reopened = Database(test_db.db_path)
+        assert {t["user_id"] for t in reopened.get_tastings_by_theme(old["id"])} == {2}
+
+        reopened.delete_theme(old["id"])
+        assert reopened.list_archives() == []
+        assert not list(reopened.archive_dir.iterdir())
+        reopened.close()
+
+    def test_in_memory_database_refuses(self):
+        """Test archiving needs a database file to sit next to."""
+        with pytest.raises(RuntimeError):
+            _archive(Database(in_memory=True))
+
+
+class TestArchiveAdmin:
+    """Test the archive endpoints."""
+
+    def test_archive_list_and_restore(self, test_db, seeded, monkeypatch, tmp_path):
+        """Test the endpoints are token-gated and archive, list and restore themes."""
+        old, _, _ = seeded
+        monkeypatch.setattr(settings, "data_dir", tmp_path)
+        monkeypatch.setattr(settings, "profiling_token", "secret")
+        headers = {"X-Profile": "secret"}
+        with TestClient(create_app(database=test_db)) as client:
+            assert client.post("/api/v1/admin/archive?older_than_days=30").status_code == 404
+            response = client.post("/api/v1/admin/archive?older_than_days=30", headers=headers)
+            assert response.json() == {"archived": [old["id"]]}
+            themes = client.get("/api/v1/admin/archive", headers=headers).json()["themes"]
+            assert [t["theme_id"] for t in themes] == [old["id"]]
+            scores = client.get(f"/api/v1/tastings/themes/{old['id']}/scores").json()
+            assert sum(len(w["scores"]) for w in scores["whiskeys"]) == 4
+
+            restore = f"/api/v1/admin/archive/{old['id']}/restore"
+            assert client.post(restore, headers=headers).status_code == 200
+            assert client.post(restore, headers=headers).status_code == 404
+        assert len(test_db.tastings) == 4
+
+    def test_cli(self, test_db, seeded, capsys):
+        """Test the script archives and restores a stopped database."""
+        old, _, _ = seeded
+        path = test_db.db_path
+        test_db.close()
+        assert archive_main(["--db", str(path), "--older-than-days", "30"]) == 0
+        assert "Archived 1 themes" in capsys.readouterr().out
+        assert archive_main(["--db", str(path), "--restore", str(old["id"])]) == 0
+        assert archive_main(["--db", str(path), "--restore", str(old["id"])]) == 1
+        assert archive_main(["--db", str(path.with_name("missing.json")), "--older-than-days", "30"]) == 1
+        db = Database(path)
+        assert len(db.tastings) == 4
+        db.close()
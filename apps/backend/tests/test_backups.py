@@ -0,0 +1,198 @@
+"""Tests for online backups, incremental deltas, retention and restore."""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.backups import BackupError, BackupManager, list_backups, read_backup, restore_state
+from app.config import settings
+from app.database import Database
+from app.main import create_app
+from app.shards import decode_snapshot
+from app.storage import decode_state
+from scripts.restore_backup import main as restore_main
+
+
+def _state(db: Database) -> dict:
+    with db.open_snapshot() as handle:
+        return decode_snapshot(handle.read())
+
+
+def _archived_db(path) -> tuple[Database, int]:
+    """A database with an archived theme tasted by two users; returns it and that theme's id."""
+    db = Database(path)
+    old = db.create_theme("Islay")
+    whiskey = db.create_whiskey(old["id"], "Lagavulin 16", 43.0)
+    for name, score in (("Ada", 4.0), ("Grace", 3.0)):
+        db.create_or_update_tasting(db.get_or_create_user(name)["id"], whiskey["id"], score, score, score, 1)
+    db.create_theme("Speyside")
+    assert db.archive_themes(datetime.now(timezone.utc) + timedelta(days=1)) == [old["id"]]
+    return db, old["id"]
+
+
+class TestSnapshot:
+    """Test point-in-time snapshots of a live database."""
+
+    def test_snapshot_unaffected_by_later_writes(self, tmp_path):
+        """Test an opened snapshot keeps reading the data as of when it was opened."""
+        db = Database(tmp_path / "database.json")
+        db.create_theme("Before")
+        with db.open_snapshot() as handle:
+            db.create_theme("After")
+            assert [t["name"] for t in decode_state(handle.read())["themes"].values()] == ["Before"]
+        assert len(_state(db)["themes"]) == 2
+        db.close()
+
+    def test_snapshot_refused_inside_transaction(self):
+        """Test a snapshot cannot capture half of a transaction."""
+        db = Database(in_memory=True)
+        with db.transaction():
+            with pytest.raises(RuntimeError):
+                db.open_snapshot()
+
+
+class TestBackupManager:
+    """Test full and incremental backups and their restore."""
+
+    @pytest.mark.asyncio
+    async def test_deltas_restore_to_current_state(self, tmp_path):
+        """Test a full backup plus deltas restores adds, updates and deletes, at any point."""
+        db = Database(tmp_path / "database.json")
+        backups = BackupManager(tmp_path / "backups", full_every=5, keep_full=2)
+        theme = db.create_theme("Islay")
+        whiskey = db.create_whiskey(theme["id"], "Lagavulin 16", 43.0)
+        first = await backups.backup(db)
+        assert first.kind == "full"
+        state_at_first = _state(db)
+
+        user = db.get_or_create_user("Ada")
+        db.create_or_update_tasting(user["id"], whiskey["id"], 4.0, 4.5, 3.5, 1)
+        second = await backups.backup(db)
+        db.update_theme(theme["id"], {"notes": "Smoky"})
+        other = db.create_theme("Speyside")
+        db.delete_theme(other["id"])
+        third = await backups.backup(db)
+
+        assert second.kind == third.kind == "delta"
+        assert second.documents == 2
+        delta = read_backup(backups.directory / third.name)
+        assert delta["base"] == second.name
+        assert list(delta["tables"]["themes"]["put"]) == [str(theme["id"])]
+        assert restore_state(backups.directory) == _state(db)
+        assert restore_state(backups.directory, until=first.name) == state_at_first
+        db.close()
+
+    @pytest.mark.asyncio
+    async def test_full_every_and_retention(self, tmp_path):
+        """Test a full backup follows every N deltas and only the newest chains are kept."""
+        db = Database(in_memory=True)
+        backups = BackupManager(tmp_path, full_every=1, keep_full=2)
+        kinds = []
+        for i in range(6):
+            db.create_theme(f"Theme {i}")
+            kinds.append((await backups.backup(db)).kind)
+        assert kinds == ["full", "delta"] * 3
+        assert [b.kind for b in list_backups(tmp_path)] == ["full", "delta", "full", "delta"]
+        assert len(restore_state(tmp_path)["themes"]) == 6
+
+    @pytest.mark.asyncio
+    async def test_chain_continues_after_restart(self, tmp_path):
+        """Test a new manager on the same directory keeps adding deltas, unless its digests are gone."""
+        db = Database(in_memory=True)
+        db.create_theme("Highland")
+        await BackupManager(tmp_path).backup(db)
+        db.create_theme("Lowland")
+        assert (await BackupManager(tmp_path).backup(db)).kind == "delta"
+        (tmp_path / ".digests.json").unlink()
+        assert (await BackupManager(tmp_path).backup(db)).kind == "full"
+
+    @pytest.mark.asyncio
+    async def test_broken_chain_is_detected(self, tmp_path):
+        """Test restoring fails loudly when a delta in the chain is missing."""
+        db = Database(in_memory=True)
+        backups = BackupManager(tmp_path)
+        for i in range(3):
+            db.create_theme(f"Theme {i}")
+            await backups.backup(db)
+        (tmp_path / list_backups(tmp_path)[1].name).unlink()
+        with pytest.raises(BackupError):
+            restore_state(tmp_path)
+
+
+class TestArchiveBackups:
+    """Test that archive files are backed up and restored with the database."""
+
+    @pytest.mark.asyncio
+    async def test_archives_round_trip(self, tmp_path, monkeypatch):
+        """Test archived tastings are in backups and deltas, and restore to either layout."""
+        db, theme_id = _archived_db(tmp_path / "live" / "database.json")
+        backups = BackupManager(tmp_path / "backups")
+        await backups.backup(db)
+        db.delete_user(db.get_user_by_name("Grace")["id"])
+        delta = await backups.backup(db)
+        assert delta.kind == "delta"
+        assert sorted(read_backup(backups.directory / delta.name)["tables"]) == [
+            f"archive-{theme_id}/tastings", "archives", "users",
+        ]
+        assert restore_state(backups.directory) == _state(db)
+        expected = db.get_tastings_by_theme(theme_id)
+        assert len(expected) == 1
+
+        single = tmp_path / "single" / "database.json"
+        assert restore_main(["--backups", str(backups.directory), "--output", str(single)]) == 0
+        restored = Database(single)
+        assert restored.get_tastings_by_theme(theme_id) == expected
+        assert [a["theme_id"] for a in restored.list_archives()] == [theme_id]
+
+        monkeypatch.setattr(settings, "db_layout", "sharded")
+        sharded = tmp_path / "sharded" / "database.json"
+        assert restore_main(["--backups", str(backups.directory), "--output", str(sharded)]) == 0
+        restored = Database(sharded)
+        assert restored.list_archives() == []
+        assert restored.get_tastings_by_theme(theme_id) == expected
+        db.close()
+
+    @pytest.mark.asyncio
+    async def test_missing_archive_drops_its_record(self, tmp_path, capsys):
+        """Test an archive file lost before the backup leaves no record pointing at nothing."""
+        db, theme_id = _archived_db(tmp_path / "live" / "database.json")
+        (db.archive_dir / db.get_archive(theme_id)["file"]).unlink()
+        backups = BackupManager(tmp_path / "backups")
+        await backups.backup(db)
+        output = tmp_path / "restored" / "database.json"
+        assert restore_main(["--backups", str(backups.directory), "--output", str(output)]) == 0
+        assert f"No archive of theme {theme_id}" in capsys.readouterr().err
+        restored = Database(output)
+        assert restored.list_archives() == []
+        assert restored.get_tastings_by_theme(theme_id) == []
+        db.close()
+
+
+class TestBackupAdmin:
+    """Test the backup endpoints and the restore script."""
+
+    def test_endpoint_and_restore_cli(self, tmp_path, monkeypatch, capsys):
+        """Test backups taken over the API restore with the CLI, which keeps the old file."""
+        monkeypatch.setattr(settings, "data_dir", tmp_path)
+        monkeypatch.setattr(settings, "profiling_token", "secret")
+        path = tmp_path / "database.json"
+        with TestClient(create_app(database=Database(path))) as client:
+            assert client.post("/api/v1/admin/backups").status_code == 404
+            client.post("/api/v1/themes", json={"name": "Bourbon", "num_whiskeys": 1})
+            response = client.post("/api/v1/admin/backups", headers={"X-Profile": "secret"})
+            assert response.status_code == 200
+            assert response.json()["kind"] == "full"
+            listed = client.get("/api/v1/admin/backups", headers={"X-Profile": "secret"}).json()
+            assert [b["name"] for b in listed["backups"]] == [response.json()["name"]]
+            client.post("/api/v1/themes", json={"name": "Rye", "num_whiskeys": 1})
+
+        assert restore_main(["--list"]) == 0
+        assert response.json()["name"] in capsys.readouterr().out
+        assert restore_main([]) == 0
+        themes = json.loads(path.read_text())["themes"]
+        assert [t["name"] for t in themes.values()] == ["Bourbon"]
+        assert len(json.loads((tmp_path / "database.json.pre-restore").read_text())["themes"]) == 2
+
+        assert restore_main(["--backups", str(tmp_path / "missing")]) == 1
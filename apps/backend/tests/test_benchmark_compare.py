@@ -0,0 +1,127 @@
+"""Benchmark regression gate tests."""
+
+import json
+
+import pytest
+
+from benchmarks.compare import compare, main
+from benchmarks.harness import median_ci, summarize
+
+
+def _result(samples_ms, peak=1_000_000, case="get_theme_scores", tastings=1000):
+    return {"case": case, "tastings": tastings, "samples_ms": samples_ms,
+            "peak_memory_bytes": peak, **summarize(samples_ms)}
+
+
+def _report(samples_ms, peak=1_000_000, case="get_theme_scores", tastings=1000, reference_ms=None):
+    """A one-case report, plus a ``storage_read`` reference taking ``reference_ms`` if given."""
+    results = [_result(samples_ms, peak, case, tastings)]
+    if reference_ms is not None:
+        results.append(_result(reference_ms, case="storage_read", tastings=tastings))
+    return {
+        "meta": {"repeat": len(samples_ms), "warmup": 0, "storage": "json", "mmap": False,
+                 "compression": "none", "durability": "fsync", "layout": "single"},
+        "results": results,
+    }
+
+
+class TestMedianConfidenceInterval:
+    """Test the distribution-free median confidence interval."""
+
+    def test_known_ranks(self):
+        """Test the interval matches the order statistics from binomial tables."""
+        assert median_ci([float(v) for v in range(1, 21)]) == (6.0, 15.0)
+        assert median_ci([float(v) for v in range(1, 101)]) == (40.0, 61.0)
+
+    def test_small_samples_use_full_range(self):
+        """Test few samples widen the interval to min and max."""
+        assert median_ci([3.0, 1.0, 2.0, 5.0, 4.0]) == (1.0, 5.0)
+        assert median_ci([2.0]) == (2.0, 2.0)
+
+
+class TestBenchmarkCompare:
+    """Test regression classification against a baseline."""
+
+    def test_within_noise_is_ok(self):
+        """Test overlapping samples are not a regression."""
+        baseline = _report([10, 11, 12, 13, 14])
+        current = _report([12, 13, 14, 15, 16])
+        assert compare(baseline, current)[0]["status"] == "ok"
+
+    def test_latency_regression(self):
+        """Test a clearly slower case is flagged."""
+        baseline = _report([10, 10.5, 11, 11.5, 12])
+        current = _report([20, 20.5, 21, 21.5, 22])
+        row = compare(baseline, current)[0]
+        assert row["status"] == "regression"
+        assert row["reasons"] == ["latency +91%"]
+
+    def test_memory_regression(self):
+        """Test peak memory growth beyond tolerance is flagged."""
+        baseline = _report([10, 11, 12], peak=1_000_000)
+        current = _report([10, 11, 12], peak=1_500_000)
+        row = compare(baseline, current)[0]
+        assert row["status"] == "regression"
+        assert row["reasons"] == ["peak memory +50%"]
+
+    def test_improvement_and_missing(self):
+        """Test faster cases are reported as improved and absent ones as missing."""
+        baseline = _report([20, 21, 22])
+        assert compare(baseline, _report([5, 6, 7]))[0]["status"] == "improved"
+        assert compare(baseline, _report([5, 6, 7], case="other"))[0]["status"] == "missing"
+
+    def test_latency_relative_to_reference(self, tmp_path):
+        """Test a uniformly slower machine passes while a case slowing against the reference fails."""
+        baseline = _report([10, 10.5, 11, 11.5, 12], reference_ms=[5, 5.1, 5.2, 5.3, 5.4])
+        slower_machine = _report([20, 21, 22, 23, 24], reference_ms=[10, 10.2, 10.4, 10.6, 10.8])
+        rows = compare(baseline, slower_machine)
+        assert [row["status"] for row in rows] == ["ok", "ok"]
+        assert abs(rows[0]["change"]) < 0.01
+        slower_case = _report([20, 21, 22, 23, 24], reference_ms=[5, 5.1, 5.2, 5.3, 5.4])
+        rows = compare(baseline, slower_case)
+        assert rows[0]["status"] == "regression"
+        # The reference itself is never a latency regression
+        assert rows[1]["status"] == "ok"
+
+    def test_cli_exit_code(self, tmp_path, capsys):
+        """Test the CLI exits non-zero only when a regression is found."""
+        baseline, ok, slow = tmp_path / "baseline.json", tmp_path / "ok.json", tmp_path / "slow.json"
+        reference = [5, 5.1, 5.2, 5.3, 5.4]
+        baseline.write_text(json.dumps(_report([10, 10.5, 11, 11.5, 12], reference_ms=reference)))
+        ok.write_text(json.dumps(_report([10, 10.5, 11, 11.5, 12], reference_ms=reference)))
+        slow.write_text(json.dumps(_report([30, 31, 32, 33, 34], reference_ms=reference)))
+        assert main(["--baseline", str(baseline), "--current", str(ok)]) == 0
+        assert main(["--baseline", str(baseline), "--current", str(slow)]) == 1
+        assert "regression" in capsys.readouterr().out
+
+    def test_config_must_be_recorded_and_match(self, tmp_path, capsys):
+        """Test a baseline without its configuration or reference case, or results with another configuration, are refused."""
+        baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+        old = _report([10, 11, 12], reference_ms=[5, 5, 5])
+        del old["meta"]["durability"]
+        baseline.write_text(json.dumps(old))
+        current.write_text(json.dumps(_report([10, 11, 12], reference_ms=[5, 5, 5])))
+        with pytest.raises(SystemExit) as exc:
+            main(["--baseline", str(baseline), "--current", str(current)])
+        assert exc.value.code == 2
+        assert "baseline meta lacks durability" in capsys.readouterr().err
+
+        baseline.write_text(json.dumps(_report([10, 11, 12])))
+        with pytest.raises(SystemExit):
+            main(["--baseline", str(baseline), "--current", str(current)])
+        assert "no storage_read results" in capsys.readouterr().err
+
+        grouped = _report([10, 11, 12], reference_ms=[5, 5, 5])
+        grouped["meta"]["durability"] = "group"
+        baseline.write_text(json.dumps(grouped))
+        with pytest.raises(SystemExit):
+            main(["--baseline", str(baseline), "--current", str(current)])
+        assert "different durability" in capsys.readouterr().err
+
+    def test_update_baseline(self, tmp_path):
+        """Test --update-baseline overwrites the baseline with the current results."""
+        baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+        baseline.write_text(json.dumps(_report([10, 11, 12])))
+        current.write_text(json.dumps(_report([5, 6, 7])))
+        assert main(["--baseline", str(baseline), "--current", str(current), "--update-baseline"]) == 0
+        assert json.loads(baseline.read_text())["results"][0]["median_ms"] == 6
@@ -0,0 +1,35 @@
+"""Benchmark suite smoke tests."""
+
+import json
+
+from benchmarks.__main__ import main, run_suite
+from benchmarks.database import CASES
+
+
+class TestBenchmarkSuite:
+    """Test the database benchmark suite runs and reports JSON."""
+
+    def test_run_suite(self):
+        """Test every case produces timings at a small scale."""
+        report = run_suite([200], repeat=1, warmup=0)
+        assert [r["case"] for r in report["results"]] == [case.name for case in CASES]
+        for result in report["results"]:
+            assert result["tastings"] == 200
+            assert len(result["samples_ms"]) == 1
+            assert result["median_ms"] >= 0
+            assert result["peak_memory_bytes"] > 0
+
+    def test_max_tastings_skips(self):
+        """Test cases above their scale limit are reported as skipped."""
+        report = run_suite([20_000], repeat=1, warmup=0, cases=["get_all_themes_scores"], memory=False)
+        assert report["results"] == [
+            {"case": "get_all_themes_scores", "tastings": 20_000, "skipped": "above max_tastings=10000"}
+        ]
+
+    def test_cli_writes_json(self, tmp_path):
+        """Test the CLI writes a JSON report to the output file."""
+        output = tmp_path / "results.json"
+        assert main(["--scales", "200", "--repeat", "1", "--cases", "get_tastings_by_theme", "--output", str(output)]) == 0
+        report = json.loads(output.read_text())
+        assert report["meta"]["repeat"] == 1
+        assert report["results"][0]["case"] == "get_tastings_by_theme"
@@ -0,0 +1,150 @@
+"""Tests for the columnar copy of the tastings table."""
+
+import asyncio
+import json
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.columns import TastingColumns
+from app.database import Database
+from app.routers import tastings as tastings_router
+
+
+def _rows(db: Database, theme_id: int) -> list[tuple]:
+    """A theme's tastings as read from the row store."""
+    whiskey_ids = {w["id"] for w in db.get_whiskeys_by_theme(theme_id)}
+    return sorted(
+        (t["id"], t["user_id"], t["whiskey_id"], t["aroma_score"], t["flavor_score"], t["finish_score"], t["personal_rank"])
+        for t in db.get_tastings_by_theme(theme_id)
+        if t["whiskey_id"] in whiskey_ids
+    )
+
+
+def _columns(db: Database, theme_id: int) -> list[tuple]:
+    """A theme's tastings as read from its columns."""
+    columns = db.get_theme_columns(theme_id)
+    return sorted(
+        (
+            columns.doc_ids[row], columns.user_ids[row], columns.whiskey_ids[row],
+            columns.aroma[row], columns.flavor[row], columns.finish[row], columns.rank[row],
+        )
+        for whiskey in db.get_whiskeys_by_theme(theme_id)
+        for row in columns.select(whiskey["id"])
+    )
+
+
+@pytest.fixture
+def scored(test_db):
+    """A theme of three whiskeys scored by three tasters."""
+    theme = test_db.create_theme("Islay")
+    whiskeys = [test_db.create_whiskey(theme["id"], f"Cask {i}", 46.0) for i in range(3)]
+    users = [test_db.get_or_create_user(name) for name in ("Ada", "Grace", "Linus")]
+    for u, user in enumerate(users):
+        for w, whiskey in enumerate(whiskeys):
+            test_db.create_or_update_tasting(user["id"], whiskey["id"], 1.0 + u, 2.5 + w / 3, 3.0, w + 1)
+    return theme, whiskeys, users
+
+
+class TestTastingColumns:
+    """Test keeping the columns in step with the row store."""
+
+    def test_follows_writes(self, test_db, scored):
+        """Test submissions patch the columns in place and other writes rebuild them."""
+        theme, whiskeys, users = scored
+        columns = test_db.get_theme_columns(theme["id"])
+        assert _columns(test_db, theme["id"]) == _rows(test_db, theme["id"])
+
+        test_db.create_or_update_tasting(users[0]["id"], whiskeys[1]["id"], 5.0, 5.0, 5.0, 3)
+        newcomer = test_db.get_or_create_user("Edsger")
+        test_db.create_or_update_tasting(newcomer["id"], whiskeys[2]["id"], 2.0, 2.0, 2.0, 1)
+        assert test_db.get_theme_columns(theme["id"]) is columns
+        assert _columns(test_db, theme["id"]) == _rows(test_db, theme["id"])
+
+        test_db.delete_user(users[1]["id"])
+        assert test_db.get_theme_columns(theme["id"]) is not columns
+        assert _columns(test_db, theme["id"]) == _rows(test_db, theme["id"])
+
+    def test_rollback_rebuilds(self, test_db, scored):
+        """Test columns patched inside a failed transaction are not served afterwards."""
+        theme, whiskeys, users = scored
+        before = _columns(test_db, theme["id"])
+        with pytest.raises(RuntimeError):
+            with test_db.transaction():
+                test_db.create_or_update_tasting(users[2]["id"], whiskeys[0]["id"], 1.0, 1.0, 1.0, 3)
+                assert _columns(test_db, theme["id"]) != before
+                raise RuntimeError("abort")
+        assert _columns(test_db, theme["id"]) == before
+
+    def test_scoreboard_unchanged(self, test_db, scored):
+        """Test scoreboards built from columns match the rows, skipping tastings of missing users."""
+        theme, whiskeys, users = scored
+        test_db.create_or_update_tasting(999, whiskeys[0]["id"], 1.0, 1.0, 1.0, 1)  # user never created
+        result = asyncio.run(tastings_router.get_theme_scores(theme["id"], test_db))
+        names = {user["id"]: user["name"] for user in users}
+        for whiskey in result.whiskeys:
+            tastings = [t for t in test_db.get_tastings_by_theme(theme["id"]) if t["whiskey_id"] == whiskey.whiskey_id]
+            tastings = [t for t in tastings if t["user_id"] in names]
+            assert [s.user_name for s in whiskey.scores] == [names[t["user_id"]] for t in tastings]
+            averages = [round((t["aroma_score"] + t["flavor_score"] + t["finish_score"]) / 3, 1) for t in tastings]
+            assert [s.average_score for s in whiskey.scores] == averages
+            assert whiskey.average_score == round(sum(averages) / len(averages), 1)
+        assert result.whiskeys[0].scores[0].personal_rank == 3
+        everything = asyncio.run(tastings_router.get_all_themes_scores(test_db))
+        assert [w.scores for w in everything[0].whiskeys] == [w.scores for w in result.whiskeys]
+
+    def test_sharded_and_archived(self, tmp_path):
+        """Test each shard and each archive has columns of its own."""
+        for layout in ("sharded", "single"):
+            db = Database(tmp_path / layout / "database.json", layout=layout)
+            themes = []
+            for i in range(2):
+                theme = db.create_theme(f"Night {i}")
+                whiskey = db.create_whiskey(theme["id"], f"Cask {i}", 46.0)
+                db.create_or_update_tasting(db.get_or_create_user("Ada")["id"], whiskey["id"], 4.0, 3.5, 3.0, 1)
+                themes.append(theme)
+            if layout == "single":
+                db.update_theme(themes[0]["id"], {"created_at": "2020-01-01T00:00:00+00:00"})
+                assert db.archive_themes(datetime.now(timezone.utc) - timedelta(days=30)) == [themes[0]["id"]]
+            else:
+                assert len(db.get_theme_columns(themes[0]["id"])) == 1
+            for theme in themes:
+                assert _columns(db, theme["id"]) == _rows(db, theme["id"])
+            db.close()
+
+    def test_select_and_mean(self):
+        """Test selection keeps table order, filters by user and survives a row moving whiskey."""
+        tasting = {"aroma_score": 4.0, "flavor_score": 3.0, "finish_score": 3.0, "personal_rank": 1}
+        columns = TastingColumns.from_documents(
+            (doc_id, {**tasting, "user_id": doc_id % 2, "whiskey_id": 1}) for doc_id in range(1, 6)
+        )
+        assert list(columns.select(1)) == [0, 1, 2, 3, 4]
+        assert list(columns.select(1, {1})) == [0, 2, 4]
+        assert list(columns.select(2)) == []
+
+        columns.put(2, {**tasting, "user_id": 0, "whiskey_id": 2, "aroma_score": 1.0})
+        columns.put(4, {**tasting, "user_id": 0, "whiskey_id": 2})
+        columns.put(9, {**tasting, "user_id": 0, "whiskey_id": 2})
+        assert list(columns.select(1)) == [0, 2, 4]
+        assert list(columns.select(2)) == [1, 3, 5]
+        assert columns.mean_average(columns.select(2)) == round((2.3 + 3.3 + 3.3) / 3, 1)
+        assert columns.mean_average(columns.select(3)) == 0.0
+
+    def test_smaller_than_rows(self):
+        """Test the columns take a fraction of the memory of the parsed rows."""
+        tasting = {"user_id": 7, "whiskey_id": 3, "aroma_score": 4.5, "flavor_score": 3.0,
+                   "finish_score": 2.5, "personal_rank": 2, "created_at": "2025-01-01T00:00:00+00:00",
+                   "updated_at": "2025-01-01T00:00:00+00:00"}
+
+        tracemalloc.start()
+        try:
+            # Parsed like the storage does, so no strings are shared between rows
+            rows = json.loads(json.dumps({str(i): {**tasting, "id": i} for i in range(1, 5001)}))
+            row_bytes = tracemalloc.get_traced_memory()[0]
+            columns = TastingColumns.from_documents((int(k), doc) for k, doc in rows.items())
+            column_bytes = tracemalloc.get_traced_memory()[0] - row_bytes
+        finally:
+            tracemalloc.stop()
+        assert len(columns) == 5000
+        assert column_bytes * 3 < row_bytes
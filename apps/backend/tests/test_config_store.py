@@ -0,0 +1,72 @@
+"""Config store tests."""
+
+import json
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.config_store import ConfigStore
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    """Path to a config file in a temporary directory."""
+    return tmp_path / "config.json"
+
+
+class TestConfigStore:
+    """Test the cached config store."""
+
+    def test_missing_file_is_empty(self, config_path):
+        """Test a missing config file reads as empty."""
+        store = ConfigStore(config_path)
+        assert store.get() == {}
+
+    def test_update_persists_and_merges(self, config_path):
+        """Test updates are merged and written to disk."""
+        store = ConfigStore(config_path)
+        store.update({"ui_language": "es"})
+        result = store.update({"content_language": "ja"})
+
+        assert result == {"ui_language": "es", "content_language": "ja"}
+        assert json.loads(config_path.read_text()) == result
+        assert list(config_path.parent.iterdir()) == [config_path]  # no temp files left
+
+    def test_reads_served_from_memory(self, config_path):
+        """Test repeated reads do not touch the disk within the check interval."""
+        config_path.write_text(json.dumps({"ui_language": "zh"}))
+        store = ConfigStore(config_path, check_interval=60)
+        assert store.get()["ui_language"] == "zh"
+
+        with patch("pathlib.Path.stat") as stat, patch("pathlib.Path.read_text") as read_text:
+            for _ in range(10):
+                assert store.get()["ui_language"] == "zh"
+        stat.assert_not_called()
+        read_text.assert_not_called()
+
+    def test_external_change_reloaded_and_notified(self, config_path):
+        """Test edits made outside the store are picked up and announced."""
+        store = ConfigStore(config_path, check_interval=0)
+        store.update({"ui_language": "en"})
+        callback = Mock()
+        store.subscribe(callback)
+
+        config_path.write_text(json.dumps({"ui_language": "ja", "extra": True}))
+        os.utime(config_path, ns=(0, 1))  # guarantee a different mtime
+
+        assert store.get()["ui_language"] == "ja"
+        callback.assert_called_once_with({"ui_language": "ja", "extra": True})
+
+    def test_failed_write_keeps_old_file(self, config_path):
+        """Test a failed write leaves the previous config intact."""
+        store = ConfigStore(config_path)
+        store.update({"ui_language": "es"})
+
+        with patch("app.storage.os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                store.update({"ui_language": "ja"})
+
+        assert json.loads(config_path.read_text()) == {"ui_language": "es"}
+        assert store.get() == {"ui_language": "es"}
+        assert list(config_path.parent.iterdir()) == [config_path]
@@ -1,5 +1,7 @@
 """Unit tests for database operations."""
 
+from unittest.mock import patch
+
 import pytest
 
 from app.database import Database
@@ -360,6 +362,35 @@ class TestDatabaseStats:
         assert stats["total_users"] == 3
         assert stats["total_tastings"] == 0  # No tastings created yet
 
+    def test_get_stats_cached(self, test_db):
+        """Test stats stay current across writes without re-reading the file."""
+        theme = test_db.create_theme("Test Theme")
+        test_db.create_whiskey(theme["id"], "Whiskey 1")
+        test_db.get_or_create_user("Alice")
+        test_db.get_stats()
+
+        storage = test_db.db.storage.storage
+        with patch.object(storage, "read", wraps=storage.read) as read:
+            assert test_db.get_stats()["total_themes"] == 1
+        read.assert_not_called()
+
+        test_db.create_theme("Second Theme")
+        test_db.delete_user(test_db.get_user_by_name("Alice")["id"])
+        test_db.delete_whiskeys_by_theme(theme["id"])
+        stats = test_db.get_stats()
+        assert stats["total_themes"] == 2
+        assert stats["total_users"] == 0
+        assert stats["total_whiskeys"] == 0
+
+    def test_get_stats_after_rollback(self, test_db):
+        """Test cached counts are discarded when a transaction rolls back."""
+        test_db.create_theme("Test Theme")
+        with pytest.raises(RuntimeError):
+            with test_db.transaction():
+                test_db.create_theme("Rolled Back")
+                raise RuntimeError("boom")
+        assert test_db.get_stats()["total_themes"] == 1
+
     def test_reset_database(self, test_db):
         """Test resetting the database."""
         theme = test_db.create_theme("Test Theme", "A theme for testing")
@@ -388,4 +419,57 @@ class TestDatabaseStats:
         assert len(test_db.list_themes()) == 0
         assert len(test_db.get_whiskeys_by_theme(theme["id"])) == 0
         assert len(test_db.list_users()) == 0
-        assert len(test_db.get_tastings_by_theme(theme["id"])) == 0
\ No newline at end of file
+        assert len(test_db.get_tastings_by_theme(theme["id"])) == 0
+
+class TestDatabaseTransactions:
+    """Test grouping operations into a single commit."""
+
+    def test_transaction_writes_once(self, test_db):
+        """Test a cascade delete inside a transaction is a single storage write."""
+        theme = test_db.create_theme("Test Theme")
+        whiskey = test_db.create_whiskey(theme["id"], "Test Whiskey", 45.0)
+        user = test_db.get_or_create_user("Alice")
+        test_db.create_or_update_tasting(user["id"], whiskey["id"], 4.0, 4.0, 4.0, 1)
+
+        storage = test_db.db.storage.storage
+        with patch.object(storage, "write", wraps=storage.write) as write:
+            with test_db.transaction():
+                test_db.delete_theme(theme["id"])
+                test_db.enqueue_notification("Theme deleted")
+        assert write.call_count == 1
+
+        reopened = Database(test_db.db_path)
+        assert reopened.get_theme(theme["id"]) is None
+        assert reopened.get_tastings_by_theme(theme["id"]) == []
+        assert len(reopened.pending_notifications(10)) == 1
+        reopened.close()
+
+    def test_transaction_rollback(self, test_db):
+        """Test an exception inside a transaction discards all its writes."""
+        theme = test_db.create_theme("Test Theme")
+
+        with pytest.raises(RuntimeError):
+            with test_db.transaction():
+                test_db.delete_theme(theme["id"])
+                test_db.enqueue_notification("Theme deleted")
+                raise RuntimeError("boom")
+
+        assert test_db.get_theme(theme["id"]) == theme
+        assert test_db.pending_notifications(10) == []
+
+
+class TestDatabaseOutbox:
+    """Test the notification outbox."""
+
+    def test_pending_in_order_and_ack(self, test_db):
+        """Test outbox entries come back oldest first and ack removes them."""
+        first = test_db.enqueue_notification("first", title="One")
+        second = test_db.enqueue_notification("second")
+        test_db.enqueue_notification("third")
+
+        batch = test_db.pending_notifications(2)
+        assert [entry["message"] for entry in batch] == ["first", "second"]
+        assert batch[0]["title"] == "One"
+
+        test_db.ack_notifications([first, second])
+        assert [entry["message"] for entry in test_db.pending_notifications(10)] == ["third"]
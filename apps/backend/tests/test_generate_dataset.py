@@ -0,0 +1,84 @@
+"""Synthetic dataset generator tests."""
+
+import json
+from collections import Counter, defaultdict
+
+from app.database import Database
+from scripts.generate_dataset import generate_dataset, main, parse_count
+
+
+class TestGenerateDataset:
+    """Test the synthetic database generator."""
+
+    def test_parse_count(self):
+        """Test count suffixes are expanded."""
+        assert parse_count("1k") == 1_000
+        assert parse_count("1M") == 1_000_000
+        assert parse_count("2500") == 2_500
+
+    def test_exact_tastings(self, tmp_path):
+        """Test a tasting target is met exactly."""
+        path = tmp_path / "database.json"
+        counts = generate_dataset(path, tastings=1234)
+        assert counts["tastings"] == 1234
+        assert len(json.loads(path.read_text())["tastings"]) == 1234
+
+    def test_years_of_themes(self, tmp_path):
+        """Test a history length produces fortnightly themes with 5-20 whiskeys."""
+        path = tmp_path / "database.json"
+        counts = generate_dataset(path, years=2)
+        data = json.loads(path.read_text())
+        assert counts["themes"] == 52
+        per_theme = Counter(w["theme_id"] for w in data["whiskeys"].values())
+        assert all(5 <= n <= 20 for n in per_theme.values())
+
+    def test_deterministic(self, tmp_path):
+        """Test the same seed produces the same file."""
+        generate_dataset(tmp_path / "a.json", tastings=500, seed=7)
+        generate_dataset(tmp_path / "b.json", tastings=500, seed=7)
+        assert (tmp_path / "a.json").read_bytes() == (tmp_path / "b.json").read_bytes()
+
+    def test_rows_are_consistent(self, tmp_path):
+        """Test scores are in range, ranks are per-taster permutations and ids resolve."""
+        path = tmp_path / "database.json"
+        generate_dataset(path, years=1, tasters=50)
+        data = json.loads(path.read_text())
+        whiskeys = data["whiskeys"]
+        ranks = defaultdict(list)
+        for tasting in data["tastings"].values():
+            theme_id = whiskeys[str(tasting["whiskey_id"])]["theme_id"]
+            assert str(tasting["user_id"]) in data["users"]
+            for key in ("aroma_score", "flavor_score", "finish_score"):
+                assert 1.0 <= tasting[key] <= 5.0
+            ranks[(tasting["user_id"], theme_id)].append(tasting["personal_rank"])
+        for theme_ranks in ranks.values():
+            assert sorted(theme_ranks) == list(range(1, len(theme_ranks) + 1))
+
+    def test_skewed_participation(self, tmp_path):
+        """Test regulars attend far more often than the long tail."""
+        path = tmp_path / "database.json"
+        generate_dataset(path, years=3, tasters=300)
+        per_user = Counter(t["user_id"] for t in json.loads(path.read_text())["tastings"].values())
+        counts = sorted(per_user.values(), reverse=True)
+        assert counts[0] > 10 * counts[len(counts) // 2]
+
+    def test_readable_by_database(self, tmp_path):
+        """Test the generated file is served by the Database layer."""
+        path = tmp_path / "database.json"
+        counts = generate_dataset(path, tastings=300)
+        db = Database(path)
+        try:
+            assert len(db.list_themes()) == counts["themes"]
+            tastings = db.get_tastings_by_theme(1)
+            assert tastings and db.get_user(tastings[0]["user_id"]) is not None
+        finally:
+            db.close()
+
+    def test_cli_refuses_overwrite(self, tmp_path, capsys):
+        """Test the CLI does not overwrite an existing file without --force."""
+        path = tmp_path / "database.json"
+        path.write_text("{}")
+        assert main(["--output", str(path), "--tastings", "100"]) == 1
+        assert path.read_text() == "{}"
+        assert main(["--output", str(path), "--tastings", "100", "--force"]) == 0
+        assert "100 tastings" in capsys.readouterr().out
@@ -0,0 +1,43 @@
+"""Load simulation smoke tests."""
+
+import pytest
+
+from benchmarks.harness import percentile
+from benchmarks.load import Scenario, format_report, in_process_client, main, run_scenario
+
+
+class TestLoadSimulation:
+    """Test the tasting-night load simulation."""
+
+    def test_history_refused_with_existing_data_dir(self, tmp_path, monkeypatch, capsys):
+        """Test --history exits with an error instead of being ignored when DATA_DIR or --url is given."""
+        monkeypatch.setenv("DATA_DIR", str(tmp_path))
+        with pytest.raises(SystemExit) as exc:
+            main(["--history", "1k"])
+        assert exc.value.code == 2
+        assert "unset DATA_DIR" in capsys.readouterr().err
+        with pytest.raises(SystemExit):
+            main(["--history", "1k", "--url", "http://localhost:8010"])
+        assert not list(tmp_path.iterdir())
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 95) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_run_scenario(self):
+        """Test a short scenario submits, polls and reports per endpoint."""
+        scenario = Scenario(users=3, whiskeys=2, duration=0.6, arrival_window=0.1, poll_interval=0.1)
+        async with in_process_client() as client:
+            report = await run_scenario(client, scenario)
+
+        endpoints = report["endpoints"]
+        assert endpoints["POST /tastings"]["requests"] >= 3
+        assert endpoints["GET /tastings/themes/{theme_id}/scores"]["requests"] > 0
+        for stats in endpoints.values():
+            assert stats["errors"] == 0
+            assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+        assert "POST /tastings" in format_report(report)
@@ -0,0 +1,75 @@
+"""Logging configuration tests."""
+
+import io
+import json
+import logging
+import sys
+
+import pytest
+
+from app import logging_config
+from app.logging_config import JsonFormatter, configure_logging, parse_levels, shutdown_logging
+
+
+class TestJsonFormatter:
+    """Test structured log output."""
+
+    def test_format_includes_extra_fields(self):
+        """Test records render as JSON with lazily formatted message and extras."""
+        record = logging.LogRecord(
+            "app.tracing", logging.WARNING, __file__, 1,
+            "Slow database operation: op=%s", ("list_themes",), None,
+        )
+        record.db_operation = {"name": "list_themes", "duration_ms": 120.5}
+
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry["level"] == "WARNING"
+        assert entry["logger"] == "app.tracing"
+        assert entry["message"] == "Slow database operation: op=list_themes"
+        assert entry["db_operation"] == {"name": "list_themes", "duration_ms": 120.5}
+
+
+class TestParseLevels:
+    """Test per-module level overrides."""
+
+    def test_parse(self):
+        """Test overrides are parsed and upper-cased."""
+        assert parse_levels("app.database=warning, uvicorn.access=ERROR") == {
+            "app.database": "WARNING",
+            "uvicorn.access": "ERROR",
+        }
+        assert parse_levels("") == {}
+
+    def test_invalid(self):
+        """Test malformed overrides are rejected."""
+        with pytest.raises(ValueError, match="expected module=LEVEL"):
+            parse_levels("app.database")
+
+
+class TestQueueListener:
+    """Test the background logging thread and its output stream."""
+
+    def test_follows_replaced_stdout(self, monkeypatch):
+        """Test records go to the current stdout, never one closed since setup."""
+        first = io.StringIO()
+        monkeypatch.setattr(sys, "stdout", first)
+        configure_logging()
+        second = io.StringIO()
+        monkeypatch.setattr(sys, "stdout", second)
+        first.close()
+        logging.getLogger("app.test").warning("after the swap")
+        shutdown_logging()
+        assert "after the swap" in second.getvalue()
+
+    def test_shutdown_stops_thread(self, monkeypatch):
+        """Test shutdown flushes the queue and later records are written directly."""
+        out = io.StringIO()
+        monkeypatch.setattr(sys, "stdout", out)
+        configure_logging()
+        listener = logging_config._listener
+        logging.getLogger("app.test").warning("queued")
+        shutdown_logging()
+        assert listener._thread is None
+        assert "queued" in out.getvalue()
+        logging.getLogger("app.test").warning("direct")
+        assert "direct" in out.getvalue()
@@ -0,0 +1,59 @@
+"""Memory report tests."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.config import Settings
+from app.memory import MemoryUsage, measure
+from benchmarks.memory import check_budgets, run_report
+
+
+class TestMemoryReport:
+    """Test tracemalloc measurements and memory budgets."""
+
+    @pytest.mark.asyncio
+    async def test_measure_retained_and_peak(self):
+        """Test a kept allocation is retained and a temporary one only raises the peak."""
+        async def allocate():
+            scratch = bytearray(4_000_000)
+            del scratch
+            return bytearray(1_000_000)
+
+        usage = await measure("allocate", allocate)
+        assert usage.peak_bytes >= 4_000_000
+        assert 1_000_000 <= usage.retained_bytes < 2_000_000
+
+    def test_report_within_budgets(self):
+        """Test loading and scoring a generated database stays within budget."""
+        usages = run_report(600)
+        assert [u.name for u in usages] == ["load_database", "get_theme_scores", "get_all_themes_scores"]
+        assert all(u.peak_bytes > 0 for u in usages)
+        assert check_budgets(usages, 600) == []
+
+    def test_over_budget_reported(self):
+        """Test an operation above its budget is reported."""
+        usage = MemoryUsage(name="load_database", peak_bytes=50 * 2**20, retained_bytes=0)
+        assert check_budgets([usage], 1_000) == ["load_database: peak 50.0 MiB > budget 3.1 MiB"]
+
+
+class TestMemoryEndpoint:
+    """Test the admin memory report endpoint."""
+
+    def test_hidden_without_token(self, test_client, tmp_path):
+        """Test the endpoint is not found unless the profiling token is sent."""
+        with patch("app.profiling.settings", Settings(data_dir=tmp_path, profiling_token="secret")):
+            assert test_client.get("/api/v1/admin/memory").status_code == 404
+            response = test_client.get("/api/v1/admin/memory", headers={"X-Profile": "guess"})
+        assert response.status_code == 404
+
+    def test_report_with_token(self, test_client, tmp_path):
+        """Test the endpoint reports each operation when authorised."""
+        with patch("app.profiling.settings", Settings(data_dir=tmp_path, profiling_token="secret")):
+            response = test_client.get(
+                "/api/v1/admin/memory?include_all_themes=false", headers={"X-Profile": "secret"}
+            )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["operations"][0]["name"] == "load_database"
+        assert "get_all_themes_scores" not in [op["name"] for op in data["operations"]]
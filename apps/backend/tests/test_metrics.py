@@ -0,0 +1,60 @@
+"""Metrics tests."""
+
+from app import metrics
+from app.metrics import Counter, Histogram
+
+
+class TestMetricTypes:
+    """Test metric primitives and text rendering."""
+
+    def test_counter_render(self):
+        """Test counters render one sample per label set."""
+        counter = Counter("things_total", "Things.", ("kind",))
+        counter.inc(kind="a")
+        counter.inc(2, kind="b")
+        lines = counter.render()
+        assert "# TYPE things_total counter" in lines
+        assert 'things_total{kind="a"} 1' in lines
+        assert 'things_total{kind="b"} 2' in lines
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets count every observation at or below their bound."""
+        histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+        lines = histogram.render()
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+        assert "latency_seconds_count 3" in lines
+
+
+class TestMetricsEndpoint:
+    """Test request and database instrumentation."""
+
+    def test_requests_labelled_by_route_template(self, test_client, sample_theme):
+        """Test requests are counted per route template, not raw path."""
+        route = "/api/v1/themes/{theme_id}/whiskeys"
+        before = metrics.http_requests_total.value(method="GET", route=route, status="200")
+
+        test_client.get(f"/api/v1/themes/{sample_theme['id']}/whiskeys")
+        test_client.get("/api/v1/themes/999/whiskeys")
+
+        assert metrics.http_requests_total.value(method="GET", route=route, status="200") == before + 2
+        body = test_client.get("/metrics").text
+        assert f'http_request_duration_seconds_count{{method="GET",route="{route}"}}' in body
+        assert "http_requests_in_flight" in body
+
+    def test_database_counters(self, test_db):
+        """Test file reads, writes, bytes and table scans are counted."""
+        writes = metrics.db_file_writes_total.value()
+        written = metrics.db_bytes_written_total.value()
+        scans = metrics.db_table_scans_total.value(table="themes")
+
+        theme = test_db.create_theme("Metrics Theme")
+        test_db.list_themes()
+
+        assert metrics.db_file_writes_total.value() > writes
+        assert metrics.db_bytes_written_total.value() > written
+        assert metrics.db_table_scans_total.value(table="themes") > scans
+        assert test_db.get_theme(theme["id"]) is not None
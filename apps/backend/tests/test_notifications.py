@@ -1,97 +1,269 @@
 """Notification system tests."""
 
+import asyncio
+import threading
+
 import pytest
 from unittest.mock import Mock, patch
-from app.notifications import send_notification
+from requests.exceptions import RequestException
+
+from app.database import Database
+from app.notifications import Notification, NotificationDispatcher, build_digest, send_notification
 from app.config import Settings
 
+NTFY_SETTINGS = Settings(ntfy_url="https://ntfy.sh", ntfy_topic="test-topic")
+
+
+async def _send(ntfy_settings: Settings, session_post: Mock, *args, **kwargs) -> None:
+    """Send one notification through a started dispatcher and wait for it to be delivered."""
+    dispatcher = NotificationDispatcher(max_retries=0)
+    with patch('app.notifications.settings', ntfy_settings), \
+            patch('requests.Session.post', session_post):
+        await dispatcher.start()
+        send_notification(*args, dispatcher=dispatcher, **kwargs)
+        await dispatcher.stop()
+
 
 class TestSendNotification:
     """Test notification sending functionality."""
 
-    @patch('app.notifications.requests.post')
-    def test_send_notification_not_configured(self, mock_post):
+    @pytest.mark.asyncio
+    async def test_send_notification_not_configured(self):
         """Test notification is skipped when ntfy is not configured."""
-        # Test with empty settings
-        with patch('app.notifications.settings', Settings(ntfy_url="", ntfy_topic="")):
-            send_notification("Test message")
-            mock_post.assert_not_called()
+        session_post = Mock()
+        await _send(Settings(ntfy_url="", ntfy_topic=""), session_post, "Test message")
+        session_post.assert_not_called()
 
-    @patch('app.notifications.requests.post')
-    def test_send_notification_basic(self, mock_post):
+    @pytest.mark.asyncio
+    async def test_send_notification_basic(self):
         """Test sending a basic notification."""
-        mock_response = Mock()
-        mock_response.raise_for_status.return_value = None
-        mock_post.return_value = mock_response
+        session_post = Mock(return_value=Mock())
+        await _send(NTFY_SETTINGS, session_post, "Test message")
 
-        with patch('app.notifications.settings', Settings(
-            ntfy_url="https://ntfy.sh",
-            ntfy_topic="test-topic",
-            ntfy_auth_user="",
-            ntfy_auth_pass=""
-        )):
-            send_notification("Test message")
-
-        mock_post.assert_called_once()
-        call_args = mock_post.call_args
+        session_post.assert_called_once()
+        call_args = session_post.call_args
         assert call_args[0][0] == "https://ntfy.sh/test-topic"
         assert call_args[1]['headers']['Title'] == "Whiskey Tasting Notification"
         assert call_args[1]['data'] == b"Test message"
         assert call_args[1]['auth'] is None
 
-    @patch('app.notifications.requests.post')
-    def test_send_notification_with_title_and_priority(self, mock_post):
+    @pytest.mark.asyncio
+    async def test_send_notification_with_title_and_priority(self):
         """Test notification with custom title and priority."""
-        mock_response = Mock()
-        mock_response.raise_for_status.return_value = None
-        mock_post.return_value = mock_response
+        session_post = Mock(return_value=Mock())
+        await _send(NTFY_SETTINGS, session_post, "Test message", title="Custom Title", priority="high")
 
-        with patch('app.notifications.settings', Settings(
-            ntfy_url="https://ntfy.sh",
-            ntfy_topic="test-topic",
-            ntfy_auth_user="",
-            ntfy_auth_pass=""
-        )):
-            send_notification("Test message", title="Custom Title", priority="high")
-
-        mock_post.assert_called_once()
-        call_args = mock_post.call_args
+        call_args = session_post.call_args
         assert call_args[1]['headers']['Title'] == "Custom Title"
         assert call_args[1]['headers']['Priority'] == "high"
 
-    @patch('app.notifications.requests.post')
-    def test_send_notification_with_auth(self, mock_post):
+    @pytest.mark.asyncio
+    async def test_send_notification_with_auth(self):
         """Test notification with authentication."""
-        mock_response = Mock()
-        mock_response.raise_for_status.return_value = None
-        mock_post.return_value = mock_response
+        session_post = Mock(return_value=Mock())
+        auth_settings = Settings(
+            ntfy_url="https://ntfy.sh", ntfy_topic="test-topic", ntfy_auth_user="user", ntfy_auth_pass="pass"
+        )
+        await _send(auth_settings, session_post, "Test message")
 
-        with patch('app.notifications.settings', Settings(
-            ntfy_url="https://ntfy.sh",
-            ntfy_topic="test-topic",
-            ntfy_auth_user="user",
-            ntfy_auth_pass="pass"
-        )):
-            send_notification("Test message")
-
-        mock_post.assert_called_once()
-        call_args = mock_post.call_args
-        assert call_args[1]['auth'] == ("user", "pass")
-
-    @patch('app.notifications.requests.post')
-    def test_send_notification_request_exception(self, mock_post):
-        """Test handling of request exceptions."""
-        from requests.exceptions import RequestException
-        mock_post.side_effect = RequestException("Network error")
-
-        with patch('app.notifications.settings', Settings(
-            ntfy_url="https://ntfy.sh",
-            ntfy_topic="test-topic"
-        )):
-            # Should not raise exception, just log error
-            send_notification("Test message")
+        assert session_post.call_args[1]['auth'] == ("user", "pass")
+
+    @pytest.mark.asyncio
+    async def test_send_notification_request_exception(self):
+        """Test a failed delivery is logged rather than raised."""
+        session_post = Mock(side_effect=RequestException("Network error"))
+        await _send(NTFY_SETTINGS, session_post, "Test message")
+
+        session_post.assert_called_once()
+
+    def test_requires_running_dispatcher(self):
+        """Test a stopped dispatcher refuses notifications instead of sending them inline."""
+        with patch('app.notifications.settings', NTFY_SETTINGS):
+            with pytest.raises(RuntimeError, match="not running"):
+                send_notification("Test message", dispatcher=NotificationDispatcher())
+
+
+class TestNotificationDispatcher:
+    """Test background notification delivery."""
+
+    @pytest.mark.asyncio
+    async def test_submit_does_not_wait_for_delivery(self):
+        """Test submit returns while ntfy is still responding."""
+        release = threading.Event()
+        session_post = Mock(side_effect=lambda *args, **kwargs: release.wait(5) and Mock())
+
+        dispatcher = NotificationDispatcher(max_queue_size=10)
+        with patch('app.notifications.settings', NTFY_SETTINGS), \
+                patch('requests.Session.post', session_post):
+            await dispatcher.start()
+            assert dispatcher.submit(Notification("Slow message"))
+            await asyncio.sleep(0.05)
+            assert session_post.call_count == 1
+            release.set()
+            await dispatcher.stop()
+
+        assert session_post.call_args[0][0] == "https://ntfy.sh/test-topic"
+        assert session_post.call_args[1]['data'] == b"Slow message"
+
+    @pytest.mark.asyncio
+    async def test_retries_with_backoff(self):
+        """Test failed deliveries are retried until they succeed."""
+        session_post = Mock(side_effect=[RequestException("down"), RequestException("down"), Mock()])
+
+        dispatcher = NotificationDispatcher(max_retries=3, backoff_base=0.0)
+        with patch('app.notifications.settings', NTFY_SETTINGS), \
+                patch('requests.Session.post', session_post):
+            await dispatcher.start()
+            dispatcher.submit(Notification("Flaky message"))
+            await dispatcher.stop()
+
+        assert session_post.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_drops_when_queue_full(self):
+        """Test notifications are dropped instead of blocking when the queue is full."""
+        release = threading.Event()
+        session_post = Mock(side_effect=lambda *args, **kwargs: release.wait(5) and Mock())
+
+        dispatcher = NotificationDispatcher(max_queue_size=1)
+        with patch('app.notifications.settings', NTFY_SETTINGS), \
+                patch('requests.Session.post', session_post):
+            await dispatcher.start()
+            dispatcher.submit(Notification("first"))
+            await asyncio.sleep(0.05)  # worker picks up "first" and blocks
+            assert dispatcher.submit(Notification("second"))
+            assert not dispatcher.submit(Notification("third"))
+            release.set()
+            await dispatcher.stop()
+
+        assert dispatcher.dropped == 1
+        assert session_post.call_count == 2
+
+
+class TestNotificationOutbox:
+    """Test durable delivery through the database outbox."""
+
+    @pytest.mark.asyncio
+    async def test_outbox_delivered_and_acked(self, test_db):
+        """Test queued outbox entries are delivered and removed."""
+        session_post = Mock(return_value=Mock())
+
+        dispatcher = NotificationDispatcher(backoff_base=0.0)
+        with patch('app.notifications.settings', NTFY_SETTINGS), \
+                patch('requests.Session.post', session_post):
+            await dispatcher.start(outbox=test_db)
+            with test_db.transaction():
+                dispatcher.submit(Notification("Theme deleted", title="Theme Deleted"))
+            await asyncio.sleep(0.05)
+            await dispatcher.stop()
+
+        assert session_post.call_count == 1
+        assert session_post.call_args[1]['headers']['Title'] == "Theme Deleted"
+        assert test_db.pending_notifications(10) == []
+
+    @pytest.mark.asyncio
+    async def test_undelivered_entries_survive_restart(self, test_db):
+        """Test entries that could not be delivered are kept and sent after a restart."""
+        failing_post = Mock(side_effect=RequestException("down"))
+
+        dispatcher = NotificationDispatcher(max_retries=0, retry_interval=60)
+        with patch('app.notifications.settings', NTFY_SETTINGS), \
+                patch('requests.Session.post', failing_post):
+            await dispatcher.start(outbox=test_db)
+            dispatcher.submit(Notification("User deleted"))
+            await asyncio.sleep(0.05)
+            await dispatcher.stop()
+
+        assert failing_post.call_count == 1
+        test_db.close()
+
+        reopened = Database(test_db.db_path)
+        assert [entry["message"] for entry in reopened.pending_notifications(10)] == ["User deleted"]
+
+        session_post = Mock(return_value=Mock())
+        with patch('app.notifications.settings', NTFY_SETTINGS), \
+                patch('requests.Session.post', session_post):
+            await dispatcher.start(outbox=reopened)
+            await asyncio.sleep(0.05)
+            await dispatcher.stop()
+
+        assert session_post.call_count == 1
+        assert reopened.pending_notifications(10) == []
+        reopened.close()
+
+
+    @pytest.mark.asyncio
+    async def test_rejected_entry_dropped_after_max_attempts(self, test_db):
+        """Test an entry ntfy keeps rejecting is dropped and stops holding back the ones behind it."""
+        def post(url, data, **kwargs):
+            if data == b"Poisoned":
+                raise RequestException("400 Bad Request")
+            return Mock()
+
+        session_post = Mock(side_effect=post)
+        dispatcher = NotificationDispatcher(max_retries=0, retry_interval=0.01, max_attempts=3)
+        with patch('app.notifications.settings', NTFY_SETTINGS), \
+                patch('requests.Session.post', session_post):
+            test_db.enqueue_notification("Poisoned")
+            test_db.enqueue_notification("User deleted")
+            await dispatcher.start(outbox=test_db)
+            await asyncio.sleep(0.05)
+            await dispatcher.stop()
+
+        sent = [call.kwargs["data"] for call in session_post.call_args_list]
+        assert sent == [b"Poisoned"] * 3 + [b"User deleted"]
+        assert dispatcher.dropped == 1
+        assert test_db.pending_notifications(10) == []
+
+    @pytest.mark.asyncio
+    async def test_failed_rounds_are_counted(self, test_db):
+        """Test each failed round is recorded on the entry, so the count survives restarts."""
+        dispatcher = NotificationDispatcher(max_retries=0, retry_interval=60, max_attempts=3)
+        with patch('app.notifications.settings', NTFY_SETTINGS), \
+                patch('requests.Session.post', Mock(side_effect=RequestException("down"))):
+            test_db.enqueue_notification("User deleted")
+            await dispatcher.start(outbox=test_db)
+            await asyncio.sleep(0.05)
+            await dispatcher.stop()
+
+        assert test_db.pending_notifications(10)[0]["attempts"] == 1
+
+
+class TestNotificationCoalescing:
+    """Test merging bursts of notifications into digests."""
+
+    def test_build_digest(self):
+        """Test a digest counts events per title and lists their subjects."""
+        digest = build_digest([
+            Notification("Theme 'Islay' deleted", title="Theme Deleted", priority="default", subject="Islay"),
+            Notification("Theme 'Rye' deleted", title="Theme Deleted", priority="high", subject="Rye"),
+            Notification("User 'Bob' deleted", title="User Deleted", subject="Bob"),
+            Notification("Something else happened"),
+        ])
+        assert digest.title == "Whiskey Tasting: 4 events"
+        assert digest.priority == "high"
+        assert "Theme Deleted: 2 (Islay, Rye)" in digest.message
+        assert "User Deleted: 1 (Bob)" in digest.message
+        assert "- Something else happened" in digest.message
+
+    @pytest.mark.asyncio
+    async def test_bulk_deletes_send_one_digest(self, test_db):
+        """Test notifications within the coalescing window cost one HTTP call."""
+        session_post = Mock(return_value=Mock())
+
+        dispatcher = NotificationDispatcher(coalesce_window=0.1)
+        with patch('app.notifications.settings', NTFY_SETTINGS), \
+                patch('requests.Session.post', session_post):
+            await dispatcher.start(outbox=test_db)
+            await asyncio.sleep(0)
+            for name in ["Alice", "Bob", "Charlie"]:
+                dispatcher.submit(Notification(f"User '{name}' deleted", title="User Deleted", subject=name))
+            await asyncio.sleep(0.3)
+            await dispatcher.stop()
 
-        mock_post.assert_called_once()
+        assert session_post.call_count == 1
+        assert session_post.call_args[1]['data'] == b"User Deleted: 3 (Alice, Bob, Charlie)"
+        assert test_db.pending_notifications(10) == []
 
 
 class TestSettingsValidation:
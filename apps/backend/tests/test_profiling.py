@@ -0,0 +1,59 @@
+"""Request profiling tests."""
+
+import os
+from unittest.mock import patch
+
+from app.config import Settings
+from app.profiling import prune_profiles
+
+
+class TestRequestProfiling:
+    """Test the admin-gated request profiler."""
+
+    def test_disabled_without_token(self, test_client, tmp_path):
+        """Test requests are never profiled when no token is configured."""
+        with patch("app.profiling.settings", Settings(data_dir=tmp_path)):
+            response = test_client.get("/api/v1/themes", headers={"X-Profile": ""})
+        assert response.status_code == 200
+        assert "X-Profile-File" not in response.headers
+        assert not (tmp_path / "profiles").exists()
+
+    def test_wrong_token_ignored(self, test_client, tmp_path):
+        """Test a request with the wrong token is served without profiling."""
+        with patch("app.profiling.settings", Settings(data_dir=tmp_path, profiling_token="secret")):
+            response = test_client.get("/api/v1/themes", headers={"X-Profile": "guess"})
+        assert response.status_code == 200
+        assert "X-Profile-File" not in response.headers
+
+    def test_query_token_ignored(self, test_client, tmp_path):
+        """Test the token is only accepted as a header, never from the query string that access logs record."""
+        with patch("app.profiling.settings", Settings(data_dir=tmp_path, profiling_token="secret")):
+            response = test_client.get("/api/v1/themes?profile=secret")
+        assert response.status_code == 200
+        assert "X-Profile-File" not in response.headers
+
+    def test_profile_saved(self, test_client, tmp_path):
+        """Test a request with the token is profiled and the dump saved."""
+        with patch("app.profiling.settings", Settings(data_dir=tmp_path, profiling_token="secret")):
+            response = test_client.get("/api/v1/tastings/themes/scores", headers={"X-Profile": "secret"})
+        assert response.status_code == 200
+        filename = response.headers["X-Profile-File"]
+        assert filename.endswith("-GET-api-v1-tastings-themes-scores.pstats")
+        assert (tmp_path / "profiles" / filename).stat().st_size > 0
+
+    def test_admin_calls_not_profiled(self, test_client, tmp_path):
+        """Test admin endpoints, which take the token as their credential, write no profile."""
+        with patch("app.profiling.settings", Settings(data_dir=tmp_path, profiling_token="secret")):
+            response = test_client.get("/api/v1/admin/archive", headers={"X-Profile": "secret"})
+        assert response.status_code == 200
+        assert "X-Profile-File" not in response.headers
+        assert not (tmp_path / "profiles").exists()
+
+    def test_retention(self, tmp_path):
+        """Test only the newest profiles are kept."""
+        for i in range(5):
+            path = tmp_path / f"{i}.pstats"
+            path.write_bytes(b"")
+            os.utime(path, (i, i))
+        prune_profiles(tmp_path, keep=2)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["3.pstats", "4.pstats"]
@@ -0,0 +1,65 @@
+"""Tests for MessagePack content negotiation and response compression."""
+
+import pytest
+
+from app.responses import prefers_msgpack
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+class TestPrefersMsgpack:
+    """Test reading the client's preference from the Accept header."""
+
+    @pytest.mark.parametrize("accept, expected", [
+        (None, False),
+        ("*/*", False),
+        ("application/json", False),
+        ("application/msgpack", True),
+        ("application/x-msgpack", True),
+        ("application/msgpack, application/json;q=0.5", True),
+        ("application/json, application/msgpack", False),
+        ("application/msgpack;q=0.8, */*;q=0.9", False),
+        ("application/msgpack;q=bogus", False),
+    ])
+    def test_accept_header(self, accept, expected):
+        """Test MessagePack is chosen only when ranked above JSON."""
+        assert prefers_msgpack(accept) is expected
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack not installed")
+class TestMsgpackEndpoints:
+    """Test the large read endpoints answer in MessagePack on request."""
+
+    @pytest.mark.parametrize("path", ["/api/v1/themes", "/api/v1/users", "/api/v1/tastings/themes/scores"])
+    def test_same_content_as_json(self, test_client, path):
+        """Test the MessagePack body decodes to the JSON body."""
+        as_json = test_client.get(path)
+        as_msgpack = test_client.get(path, headers={"Accept": "application/msgpack"})
+        assert as_msgpack.status_code == 200
+        assert as_msgpack.headers["content-type"] == "application/msgpack"
+        assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+        assert "Accept" in as_json.headers["vary"] and "Accept" in as_msgpack.headers["vary"]
+
+    def test_theme_scores(self, test_client, sample_theme):
+        """Test the single-theme scoreboard negotiates too."""
+        path = f"/api/v1/tastings/themes/{sample_theme['id']}/scores"
+        response = test_client.get(path, headers={"Accept": "application/msgpack"})
+        assert msgpack.unpackb(response.content)["theme"]["name"] == "Test Theme"
+
+
+class TestResponseCompression:
+    """Test large responses are gzipped for clients that accept it."""
+
+    def test_large_responses_are_gzipped(self, test_client):
+        """Test a response over the threshold is compressed and small ones are not."""
+        for i in range(40):
+            test_client.post("/api/v1/users", json={"name": f"Taster number {i}"})
+        large = test_client.get("/api/v1/users", headers={"Accept-Encoding": "gzip"})
+        assert large.headers.get("content-encoding") == "gzip"
+        assert len(large.json()["users"]) == 43
+
+        small = test_client.get("/api/v1/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
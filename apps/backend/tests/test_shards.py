@@ -0,0 +1,197 @@
+"""Tests for the sharded layout: a catalog file plus one shard file per theme."""
+
+import asyncio
+import json
+
+import pytest
+
+from app import metrics
+from app.backups import BackupManager, read_backup
+from app.config import settings
+from app.database import Database
+from app.routers import tastings as tastings_router
+from app.shards import decode_snapshot
+from scripts.restore_backup import main as restore_main
+from scripts.shard_database import main as shard_main
+
+
+def _scores(db: Database, theme_id: int) -> dict:
+    return asyncio.run(tastings_router.get_theme_scores(theme_id, db)).model_dump()
+
+
+def _seed(db: Database, themes: int = 2) -> list[dict]:
+    """Themes of two whiskeys each, scored by Ada; Grace scores the first theme only."""
+    ada = db.get_or_create_user("Ada")
+    grace = db.get_or_create_user("Grace")
+    seeded = []
+    for i in range(themes):
+        theme = db.create_theme(f"Night {i}")
+        whiskeys = [db.create_whiskey(theme["id"], f"Cask {i}.{j}", 46.0) for j in range(2)]
+        for whiskey in whiskeys:
+            db.create_or_update_tasting(ada["id"], whiskey["id"], 4.0, 3.5, 3.0, 1)
+        if i == 0:
+            db.create_or_update_tasting(grace["id"], whiskeys[0]["id"], 2.0, 2.5, 3.0, 2)
+        seeded.append({"theme": theme, "whiskeys": whiskeys})
+    return seeded
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    db = Database(tmp_path / "database.json", layout="sharded")
+    yield db
+    db.close()
+
+
+class TestShardedDatabase:
+    """Test routing operations to shards and fanning out across them."""
+
+    def test_writes_touch_one_theme(self, sharded):
+        """Test a submission rewrites its theme's shard only and the catalog holds no tastings."""
+        first, second = _seed(sharded)
+        shard_one = sharded.shard_dir / "theme-1.json"
+        before = shard_one.read_bytes()
+        catalog_mtime = sharded.db_path.stat().st_mtime_ns
+
+        user = sharded.get_user_by_name("Ada")
+        sharded.create_or_update_tasting(user["id"], second["whiskeys"][0]["id"], 5.0, 5.0, 5.0, 1)
+        assert shard_one.read_bytes() == before
+        assert sharded.db_path.stat().st_mtime_ns == catalog_mtime
+        catalog = json.loads(sharded.db_path.read_text())
+        assert set(catalog) == {"themes", "users", "whiskey_index"}
+
+        assert sharded.get_whiskey(second["whiskeys"][1]["id"])["name"] == "Cask 1.1"
+        assert len(sharded.get_tastings_by_theme(first["theme"]["id"])) == 3
+        assert sharded.get_user_tastings_for_theme(user["id"], second["theme"]["id"])[0]["aroma_score"] == 5.0
+        assert sharded.get_stats() == {
+            "total_themes": 2, "total_whiskeys": 4, "total_users": 2, "total_tastings": 5, "archived_themes": 0,
+        }
+
+    def test_unknown_whiskey_rejected(self, sharded):
+        """Test a tasting needs an existing whiskey to find its shard."""
+        user = sharded.get_or_create_user("Ada")
+        with pytest.raises(ValueError):
+            sharded.create_or_update_tasting(user["id"], 99, 4.0, 4.0, 4.0, 1)
+
+    def test_delete_user_fans_out(self, sharded):
+        """Test deleting a user removes their tastings in every shard, writing only those that held some."""
+        seeded = _seed(sharded, themes=3)
+        other = sharded.create_theme("Unscored")
+        sharded.create_whiskey(other["id"], "Untouched", 40.0)
+        untouched = (sharded.shard_dir / f"theme-{other['id']}.json").stat().st_mtime_ns
+
+        assert sharded.delete_user(sharded.get_user_by_name("Ada")["id"])
+        assert [len(sharded.get_tastings_by_theme(s["theme"]["id"])) for s in seeded] == [1, 0, 0]
+        assert (sharded.shard_dir / f"theme-{other['id']}.json").stat().st_mtime_ns == untouched
+
+    def test_transaction_spans_shards(self, sharded):
+        """Test a rolled back transaction leaves catalog and shards as they were, on disk too."""
+        first, _ = _seed(sharded)
+        with pytest.raises(RuntimeError):
+            with sharded.transaction():
+                user = sharded.get_or_create_user("Eve")
+                sharded.create_or_update_tasting(user["id"], first["whiskeys"][0]["id"], 1.0, 1.0, 1.0, 1)
+                sharded.delete_theme(first["theme"]["id"])
+                raise RuntimeError("abort")
+        assert sharded.get_user_by_name("Eve") is None
+        assert len(sharded.get_tastings_by_theme(first["theme"]["id"])) == 3
+        assert (sharded.shard_dir / "theme-1.json").exists()
+
+        sharded.close()
+        reopened = Database(sharded.db_path, layout="sharded")
+        assert reopened.get_stats()["total_tastings"] == 5
+        reopened.close()
+
+    def test_delete_theme_drops_shard(self, sharded):
+        """Test deleting a theme removes its shard and index entries, and a recycled id starts empty."""
+        _, second = _seed(sharded)
+        assert sharded.delete_theme(second["theme"]["id"])
+        assert not (sharded.shard_dir / "theme-2.json").exists()
+        assert sharded.get_whiskey(second["whiskeys"][0]["id"]) is None
+
+        # A crash between catalog commit and unlink leaves the shard behind,
+        # and after a restart TinyDB hands out the deleted id again
+        (sharded.shard_dir / "theme-2.json").write_text('{"whiskeys": {"9": {"id": 9, "theme_id": 2}}}')
+        sharded.close()
+        reopened = Database(sharded.db_path, layout="sharded")
+        assert reopened.create_theme("Recycled")["id"] == 2
+        assert reopened.get_whiskeys_by_theme(2) == []
+        reopened.close()
+
+    def test_open_shards_bounded(self, sharded, monkeypatch):
+        """Test idle shards beyond DB_OPEN_SHARDS are closed and their counts remembered."""
+        monkeypatch.setattr(settings, "db_open_shards", 2)
+        evictions = metrics.db_shard_evictions_total.value()
+        _seed(sharded, themes=4)
+        assert len(sharded._shards) == 2
+        assert metrics.db_shard_evictions_total.value() > evictions
+        assert sharded.get_stats()["total_tastings"] == 9
+        assert len(sharded._shards) == 2
+
+    def test_single_file_refused(self, tmp_path):
+        """Test a sharded Database will not treat an unconverted file as an empty catalog."""
+        single = Database(tmp_path / "database.json")
+        _seed(single)
+        single.close()
+        with pytest.raises(RuntimeError, match="shard_database"):
+            Database(tmp_path / "database.json", layout="sharded").get_stats()
+
+    def test_in_memory(self):
+        """Test the sharded layout works in memory, where shards are never evicted."""
+        db = Database(in_memory=True, layout="sharded")
+        first, _ = _seed(db)
+        assert len(db.get_tastings_by_theme(first["theme"]["id"])) == 3
+        with db.open_snapshot() as handle:
+            assert set(decode_snapshot(handle.read())) >= {"theme-1/tastings", "theme-2/whiskeys"}
+
+
+class TestShardConversion:
+    """Test converting layouts and backing up and restoring a sharded database."""
+
+    def test_split_and_merge(self, tmp_path, capsys):
+        """Test the script splits a single file and merges it back with the same scoreboards."""
+        path = tmp_path / "database.json"
+        single = Database(path)
+        seeded = _seed(single)
+        single.create_or_update_tasting(1, 999, 1.0, 1.0, 1.0, 1)  # orphan, left out
+        scores = [_scores(single, s["theme"]["id"]) for s in seeded]
+        single.close()
+
+        assert shard_main(["--db", str(path)]) == 0
+        assert "Left out 1 tastings" in capsys.readouterr().out
+        assert shard_main(["--db", str(path)]) == 0
+        assert "already sharded" in capsys.readouterr().out
+        sharded = Database(path, layout="sharded")
+        assert [_scores(sharded, s["theme"]["id"]) for s in seeded] == scores
+        sharded.create_whiskey(seeded[1]["theme"]["id"], "Added", 50.0)
+        sharded.close()
+
+        assert shard_main(["--db", str(path), "--merge"]) == 0
+        assert not (tmp_path / "database.shards").exists()
+        merged = Database(path)
+        assert [_scores(merged, s["theme"]["id"]) for s in seeded][0] == scores[0]
+        assert merged.get_stats()["total_whiskeys"] == 5
+        assert len(merged.tastings) == 5
+        merged.close()
+
+    @pytest.mark.asyncio
+    async def test_backup_and_restore(self, tmp_path, monkeypatch):
+        """Test deltas of a sharded database hold the changed shard only and restore into shards."""
+        monkeypatch.setattr(settings, "db_layout", "sharded")
+        path = tmp_path / "database.json"
+        db = Database(path)
+        first, _ = _seed(db)
+        backups = BackupManager(tmp_path / "backups")
+        await backups.backup(db)
+        user = db.get_user_by_name("Grace")
+        db.create_or_update_tasting(user["id"], first["whiskeys"][1]["id"], 3.0, 3.0, 3.0, 1)
+        delta = await backups.backup(db)
+        assert list(read_backup(backups.directory / delta.name)["tables"]) == ["theme-1/tastings"]
+        scores = await tastings_router.get_theme_scores(first["theme"]["id"], db)
+        db.close()
+
+        (path.parent / "database.shards" / "theme-1.json").unlink()
+        assert restore_main(["--backups", str(backups.directory), "--db", str(path)]) == 0
+        assert (tmp_path / "database.shards.pre-restore" / "theme-2.json").exists()
+        restored = Database(path)
+        assert await tastings_router.get_theme_scores(first["theme"]["id"], restored) == scores
+        restored.close()
@@ -0,0 +1,80 @@
+"""Startup cost tests: import-time budget and deferred database construction."""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.database import Database
+from app.main import create_app
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Self time of the app's own modules when importing app.main; FastAPI and
+# pydantic dominate the total and are budgeted separately and loosely.
+OWN_IMPORT_BUDGET_MS = 250
+TOTAL_IMPORT_BUDGET_MS = 2000
+
+
+def _import_app(tmp_path: Path, code: str = "import app.main") -> subprocess.CompletedProcess:
+    env = {**os.environ, "DATA_DIR": str(tmp_path / "data")}
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+class TestStartup:
+    """Test that importing and building the app stays cheap."""
+
+    def test_import_time_budget(self, tmp_path):
+        """Test importing app.main stays within the import-time budget."""
+        own_us = total_us = 0
+        for line in _import_app(tmp_path).stderr.splitlines():
+            match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)", line)
+            if not match:
+                continue
+            module = match.group(3)
+            if module.split(".")[0] == "app":
+                own_us += int(match.group(1))
+            if module == "app.main":
+                total_us = int(match.group(2))
+        assert own_us / 1000 < OWN_IMPORT_BUDGET_MS
+        assert 0 < total_us / 1000 < TOTAL_IMPORT_BUDGET_MS
+
+    def test_import_is_side_effect_free(self, tmp_path):
+        """Test importing app.main neither loads requests nor touches the data directory."""
+        result = _import_app(tmp_path, "import sys, app.main; print('requests loaded:', 'requests' in sys.modules)")
+        # The logging thread may print after us, so find our line rather than the last one
+        assert "requests loaded: False" in result.stdout.splitlines()
+        assert not (tmp_path / "data").exists()
+
+    def test_database_construction_is_lazy(self, tmp_path):
+        """Test constructing a Database does no filesystem work until first use."""
+        path = tmp_path / "nested" / "database.json"
+        database = Database(path)
+        assert not path.parent.exists()
+        database.list_themes()
+        assert path.parent.exists()
+        database.close()
+
+    def test_lifespan_serves_app_database(self, tmp_path):
+        """Test the lifespan opens the app's own database and closes it on shutdown."""
+        database = Database(tmp_path / "database.json")
+        app = create_app(database=database)
+        with TestClient(app) as client:
+            assert app.state.db is database
+            client.post("/api/v1/themes", json={"name": "Lifespan", "num_whiskeys": 1})
+            assert database.list_themes()[0]["name"] == "Lifespan"
+        assert database._db is None
+
+    def test_apps_are_isolated(self):
+        """Test two apps in one process each serve their own in-memory store."""
+        first, second = Database(in_memory=True), Database(in_memory=True)
+        with TestClient(create_app(database=first)) as a, TestClient(create_app(database=second)) as b:
+            a.post("/api/v1/themes", json={"name": "Only in A", "num_whiskeys": 1})
+            assert [t["name"] for t in a.get("/api/v1/themes").json()["themes"]] == ["Only in A"]
+            assert b.get("/api/v1/themes").json()["themes"] == []
@@ -0,0 +1,231 @@
+"""Tests for the selectable database storage codecs."""
+
+import gzip
+import importlib.util
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.compression import detect_file
+from app.database import Database
+from app.storage import (
+    DurableFile,
+    InstrumentedJSONStorage,
+    OrjsonStorage,
+    pack_records,
+    storage_class,
+    unpack_records,
+)
+from scripts.convert_database import main as convert_main
+
+requires_orjson = pytest.mark.skipif(importlib.util.find_spec("orjson") is None, reason="orjson not installed")
+requires_msgpack = pytest.mark.skipif(importlib.util.find_spec("msgpack") is None, reason="msgpack not installed")
+requires_zstd = pytest.mark.skipif(importlib.util.find_spec("zstandard") is None, reason="zstandard not installed")
+
+
+@requires_orjson
+class TestOrjsonStorage:
+    """Test the orjson storage against files written by the stdlib storage."""
+
+    def test_reads_stdlib_files_and_round_trips(self, tmp_path):
+        """Test a database written with json opens with orjson and back again."""
+        path = tmp_path / "database.json"
+        legacy = Database(path, storage="json")
+        theme = legacy.create_theme("Rye Revival", "Spicy – and non-ASCII")
+        legacy.close()
+
+        for use_mmap in (False, True):
+            db = Database(path, storage="orjson", use_mmap=use_mmap)
+            assert db.get_theme(theme["id"])["notes"] == "Spicy – and non-ASCII"
+            db.create_whiskey(theme["id"], f"Whiskey mmap={use_mmap}", 45.0)
+            db.close()
+
+        # Compact orjson output stays readable by the stdlib
+        data = json.loads(path.read_bytes())
+        assert len(data["whiskeys"]) == 2
+        reopened = Database(path, storage="json")
+        assert len(reopened.get_whiskeys_by_theme(theme["id"])) == 2
+        reopened.close()
+
+    def test_empty_file_reads_as_new_database(self, tmp_path):
+        """Test an empty file is treated as a new database, including with mmap."""
+        path = tmp_path / "database.json"
+        path.touch()
+        storage = OrjsonStorage(str(path), use_mmap=True)
+        assert storage.read() is None
+        storage.close()
+
+    def test_storage_class_selection(self):
+        """Test names map to storages, orjson falls back when missing and typos fail."""
+        assert storage_class("json") is InstrumentedJSONStorage
+        assert storage_class("orjson") is OrjsonStorage
+        with patch.dict(sys.modules, {"orjson": None}):
+            assert storage_class("orjson") is InstrumentedJSONStorage
+        with pytest.raises(ValueError):
+            storage_class("yaml")
+
+
+class TestCompressedStorage:
+    """Test gzip/zstd database files, detection on open and conversion."""
+
+    @pytest.mark.parametrize("method", ["gzip", pytest.param("zstd", marks=requires_zstd)])
+    @pytest.mark.parametrize("storage", ["json", pytest.param("orjson", marks=requires_orjson)])
+    def test_round_trip(self, tmp_path, storage, method):
+        """Test a compressed database is written compressed and reads back, with or without mmap."""
+        path = tmp_path / "database.json"
+        db = Database(path, storage=storage, compression=method)
+        theme = db.create_theme("Islay Smoke")
+        db.close()
+        assert detect_file(path) == method
+
+        for use_mmap in (False, True):
+            reopened = Database(path, storage=storage, compression=method, use_mmap=use_mmap)
+            assert reopened.get_theme(theme["id"])["name"] == "Islay Smoke"
+            reopened.close()
+
+    def test_compressed_file_detected_when_compression_off(self, tmp_path):
+        """Test a gzip file opens with compression off and is rewritten plain."""
+        path = tmp_path / "database.json"
+        db = Database(path, compression="gzip")
+        db.create_theme("Speyside")
+        db.close()
+
+        db = Database(path, compression="none")
+        assert db.list_themes()[0]["name"] == "Speyside"
+        db.create_theme("Highland")
+        db.close()
+        assert detect_file(path) == "none"
+        assert len(json.loads(path.read_text())["themes"]) == 2
+
+    def test_convert_cli(self, tmp_path, capsys):
+        """Test the conversion script transcodes in place and to a separate output."""
+        path = tmp_path / "database.json"
+        db = Database(path)
+        db.create_theme("Bourbon Night")
+        db.close()
+        original = path.read_bytes()
+
+        assert convert_main(["--db", str(path), "--to", "gzip"]) == 0
+        assert detect_file(path) == "gzip"
+        assert gzip.decompress(path.read_bytes()) == original
+
+        copy = tmp_path / "plain.json"
+        assert convert_main(["--db", str(path), "--to", "none", "--output", str(copy)]) == 0
+        assert copy.read_bytes() == original
+        assert convert_main(["--db", str(copy), "--to", "none"]) == 0
+        assert "nothing to do" in capsys.readouterr().out
+
+
+@requires_msgpack
+class TestMsgpackStorage:
+    """Test the MessagePack record layout and switching to and from it."""
+
+    def test_records_round_trip_mixed_shapes(self):
+        """Test documents with the table's keys become arrays and odd ones stay maps."""
+        state = {
+            "tastings": {
+                "1": {"user_id": 1, "whiskey_id": 2, "aroma_score": 4.5},
+                "2": {"user_id": 3, "whiskey_id": 4, "aroma_score": 3.0},
+                "3": {"user_id": 5, "notes": "different shape"},
+            },
+            "empty": {},
+        }
+        assert unpack_records(pack_records(state)) == state
+
+    def test_switching_between_json_and_msgpack(self, tmp_path):
+        """Test a JSON database converts on write and stays readable by every codec."""
+        path = tmp_path / "database.json"
+        db = Database(path, storage="json")
+        theme = db.create_theme("Sherry Bombs")
+        for i in range(20):
+            db.create_whiskey(theme["id"], f"Whiskey {i}", 46.0)
+        db.close()
+        json_size = path.stat().st_size
+
+        db = Database(path, storage="msgpack")
+        assert len(db.get_whiskeys_by_theme(theme["id"])) == 20
+        db.create_whiskey(theme["id"], "Whiskey 21", None)
+        db.close()
+        assert path.read_bytes()[:1] != b"{"
+        assert path.stat().st_size < json_size
+
+        storages = ["json", "msgpack"] + (["orjson"] if importlib.util.find_spec("orjson") else [])
+        for storage in storages:
+            reopened = Database(path, storage=storage)
+            assert len(reopened.get_whiskeys_by_theme(theme["id"])) == 21
+            reopened.close()
+
+
+class TestDurableWrites:
+    """Test crash-safe replacement of the database file and the durability modes."""
+
+    def test_failed_write_leaves_previous_file(self, tmp_path):
+        """Test a write dying before the rename keeps the old file whole and removes its temp file."""
+        path = tmp_path / "database.json"
+        db = Database(path)
+        db.create_theme("Before")
+        before = path.read_bytes()
+
+        with patch("app.storage.os.fsync", side_effect=OSError("disk gone")):
+            with pytest.raises(OSError):
+                db.create_theme("Lost")
+        assert path.read_bytes() == before
+        assert [p.name for p in tmp_path.iterdir()] == ["database.json"]
+        db.close()
+
+    def test_fsync_and_os_modes(self, tmp_path):
+        """Test fsync mode syncs every commit and os mode never does."""
+        for durability, expected_syncs in (("fsync", True), ("os", False)):
+            path = tmp_path / f"{durability}.json"
+            db = Database(path, durability=durability)
+            with patch("app.storage.os.fsync", wraps=os.fsync) as fsync:
+                db.create_theme("Peated")
+            assert fsync.called is expected_syncs
+            db.close()
+            assert json.loads(path.read_text())["themes"]["1"]["name"] == "Peated"
+
+    def test_group_commit_coalesces_writes(self, tmp_path):
+        """Test group mode serves reads from memory and commits a burst as one file write."""
+        path = tmp_path / "database.json"
+        durable = DurableFile(path, "group", group_commit_ms=60_000)
+        for i in range(5):
+            durable.write(f"{{\"n\": {i}}}".encode())
+        assert durable.pending == b'{"n": 4}'
+        assert not path.exists()
+        durable.close()
+        assert durable.pending is None
+        assert path.read_bytes() == b'{"n": 4}'
+
+    def test_group_commit_through_database(self, tmp_path):
+        """Test a group-committing database reads its own writes and lands them on disk."""
+        path = tmp_path / "database.json"
+        with patch("app.database.settings.db_group_commit_ms", 10.0):
+            db = Database(path, durability="group")
+            theme = db.create_theme("Wheated")
+            assert db.get_theme(theme["id"])["name"] == "Wheated"
+            deadline = time.monotonic() + 5
+            while db.db.storage.storage._file.pending is not None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert json.loads(path.read_text())["themes"]["1"]["name"] == "Wheated"
+            db.close()
+
+    def test_stale_temp_files_removed_on_open(self, tmp_path):
+        """Test temp files left by a crash are cleaned up, but recent ones are left alone."""
+        path = tmp_path / "database.json"
+        stale = tmp_path / ".database.json.abc123.tmp"
+        recent = tmp_path / ".database.json.def456.tmp"
+        stale.write_bytes(b"{")
+        recent.write_bytes(b"{")
+        os.utime(stale, (time.time() - 3600, time.time() - 3600))
+        DurableFile(path).close()
+        assert not stale.exists()
+        assert recent.exists()
+
+    def test_unknown_durability_rejected(self, tmp_path):
+        """Test a typo in the durability mode fails at open."""
+        with pytest.raises(ValueError):
+            DurableFile(tmp_path / "database.json", "sometimes")
@@ -0,0 +1,88 @@
+"""Tests for multi-tenant mode: per-tenant databases in a bounded LRU."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.backups import list_backups
+from app.config import settings
+from app.main import create_app
+from app.tenants import TenantError, TenantRegistry
+
+THEME = {"name": "Club Night", "num_whiskeys": 2}
+
+
+class TestTenantRegistry:
+    """Test opening, reusing and evicting tenant databases."""
+
+    def test_rejects_invalid_and_unlisted_names(self, tmp_path):
+        """Test names that are not safe file names or not allowlisted are refused."""
+        registry = TenantRegistry(tmp_path, allowed=["highland", "islay"])
+        assert registry.path_for("islay") == tmp_path / "islay.json"
+        for name in ["../etc", "Highland", "a/b", "", "speyside"]:
+            with pytest.raises(TenantError):
+                registry.path_for(name)
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used(self, tmp_path):
+        """Test opening a tenant beyond the limit closes the least recently used one."""
+        registry = TenantRegistry(tmp_path, max_open=2)
+        for name in ["a", "b", "a", "c"]:
+            async with registry.use(name):
+                pass
+        assert "b" not in registry
+        assert "a" in registry and "c" in registry
+        await registry.close()
+        assert len(registry) == 0
+
+    @pytest.mark.asyncio
+    async def test_busy_tenants_are_not_evicted(self, tmp_path):
+        """Test a tenant in use stays open even when over the limit."""
+        registry = TenantRegistry(tmp_path, max_open=1)
+        async with registry.use("a") as a:
+            async with registry.use("b"):
+                assert len(registry) == 2
+            # b is idle once released, so it is closed instead of the in-use a
+            assert "a" in registry and "b" not in registry
+            a.db.create_theme("Still open")
+        assert "a" in registry
+        await registry.close()
+
+    @pytest.mark.asyncio
+    async def test_backup_all_covers_stored_tenants(self, tmp_path, monkeypatch):
+        """Test scheduled backups reach every tenant with a database file, within the open limit."""
+        monkeypatch.setattr(settings, "data_dir", tmp_path)
+        registry = TenantRegistry(tmp_path / "tenants", max_open=1)
+        for name in ["highland", "islay"]:
+            async with registry.use(name) as tenant:
+                tenant.db.create_theme(f"{name} night")
+        (tmp_path / "tenants" / "Not A Tenant.json").write_text("{}")
+        assert registry.stored() == ["highland", "islay"]
+
+        assert await registry.backup_all() == 2
+        for name in ["highland", "islay"]:
+            assert [b.kind for b in list_backups(settings.backup_dir / name)] == ["full"]
+        assert len(registry) == 1
+        await registry.close()
+
+
+class TestTenantApp:
+    """Test tenant selection through the API."""
+
+    def test_header_and_prefix_select_isolated_databases(self, tmp_path):
+        """Test tenants chosen by header or path prefix never see each other's data."""
+        app = create_app(tenants=TenantRegistry(tmp_path))
+        with TestClient(app) as client:
+            created = client.post("/api/v1/themes", json=THEME, headers={"X-Tenant": "highland"})
+            assert created.status_code == 200
+
+            assert len(client.get("/t/highland/api/v1/themes").json()["themes"]) == 1
+            assert client.get("/t/islay/api/v1/themes").json()["themes"] == []
+        assert (tmp_path / "highland.json").exists()
+
+    def test_missing_or_unknown_tenant(self, tmp_path):
+        """Test requests without a tenant get 400 and unlisted tenants 404."""
+        app = create_app(tenants=TenantRegistry(tmp_path, allowed=["highland"]))
+        with TestClient(app) as client:
+            assert client.get("/api/v1/themes").status_code == 400
+            assert client.get("/api/v1/themes", headers={"X-Tenant": "islay"}).status_code == 404
+            assert client.get("/api/v1/health").status_code == 200
@@ -0,0 +1,50 @@
+"""Database tracing tests."""
+
+import logging
+from unittest.mock import patch
+
+from app.config import Settings
+from app.tracing import RequestTrace, _current_trace
+
+
+class TestDatabaseTracing:
+    """Test per-call database tracing."""
+
+    def test_operations_recorded_on_trace(self, test_db):
+        """Test top-level calls are recorded with rows scanned, returned and bytes written."""
+        theme = test_db.create_theme("Traced Theme")
+        for i in range(3):
+            test_db.create_whiskey(theme["id"], f"Whiskey {i}")
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+        try:
+            test_db.get_tastings_by_theme(theme["id"])
+            test_db.get_whiskeys_by_theme(theme["id"])
+            test_db.delete_theme(theme["id"])
+        finally:
+            _current_trace.reset(token)
+
+        # Nested calls are folded into the outer operation
+        assert [op.name for op in trace.operations] == [
+            "get_tastings_by_theme", "get_whiskeys_by_theme", "delete_theme",
+        ]
+        assert trace.operations[0].rows_scanned >= 3
+        # The repeated whiskey search is answered from TinyDB's query cache
+        assert trace.operations[1].rows_returned == 3
+        assert trace.operations[1].rows_scanned == 0
+        assert trace.operations[2].bytes_written > 0
+        assert trace.db_time_ms >= 0
+
+    def test_slow_operation_logged(self, test_db, caplog):
+        """Test calls over the threshold are logged."""
+        with patch("app.tracing.settings", Settings(slow_db_op_ms=0)):
+            with caplog.at_level(logging.WARNING, logger="app.tracing"):
+                test_db.list_themes()
+        assert "Slow database operation: op=list_themes" in caplog.text
+
+    def test_response_headers(self, test_client, sample_theme):
+        """Test responses carry the database time."""
+        response = test_client.get(f"/api/v1/tastings/themes/{sample_theme['id']}/scores")
+        assert float(response.headers["X-DB-Time"]) >= 0
+        assert response.headers["Server-Timing"].startswith("db;dur=")